@@ -16,19 +16,211 @@ Wendy Yang YingTong
 
 #import the modules we need for creating a GUI
 
+import gc
+import io
+import os
+import re
+import abc
+import sys
+import json
+import math
+import time
+import queue
+import sqlite3
+import atexit
+import cProfile
+import contextlib
+import contextvars
+import tracemalloc
+import argparse
+import urllib.parse
+import tempfile
+import importlib
+import collections
+import threading
+import subprocess
+import concurrent.futures
+
 import tkinter as tk
 import tkinter.messagebox
+import tkinter.ttk
 
-import lxml
-from lxml import html
-import requests
-
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import yfinance as yf
 import datetime as dt
 
+# the modules below take most of the start up time, so they are only imported when first
+# used (or warmed up in the background once the window is shown), see LazyModule
+class LazyModule(object):
+    """
+    Stand-in for a module which is imported the first time one of its attributes is used.
+
+    On first use the real module is imported and replaces the stand-in in the globals
+    of this script, so later uses cost nothing extra.
+    """
+
+    def __init__(self, moduleName, globalName):
+        self.moduleName = moduleName
+        self.globalName = globalName
+
+    def Load(self):
+        """import the real module, rebind its global name to it and return it"""
+
+        module = importlib.import_module(self.moduleName)
+        globals()[self.globalName] = module
+        return module
+
+    def __getattr__(self, attribute):
+        return getattr(self.Load(), attribute)
+
+html = LazyModule('lxml.html', 'html')
+etree = LazyModule('lxml.etree', 'etree')
+requests = LazyModule('requests', 'requests')
+np = LazyModule('numpy', 'np')
+pd = LazyModule('pandas', 'pd')
+mplFigure = LazyModule('matplotlib.figure', 'mplFigure')
+backendAgg = LazyModule('matplotlib.backends.backend_agg', 'backendAgg')
+backendTkAgg = LazyModule('matplotlib.backends.backend_tkagg', 'backendTkAgg')
+yf = LazyModule('yfinance', 'yf')
+asyncio = LazyModule('asyncio', 'asyncio') # only the service needs it, so it is not warmed up either
+httpServer = LazyModule('http.server', 'httpServer') # only the local stand-in of yahoo finance of the checks needs it
+
+HEAVY_MODULES = ['html', 'etree', 'requests', 'np', 'pd', 'mplFigure', 'backendAgg', 'backendTkAgg', 'yf']
+
+def WarmUpImports():
+    """import every heavy module not imported yet, run in a background thread after the window is shown"""
+
+    for globalName in HEAVY_MODULES:
+        module = globals()[globalName]
+        if isinstance(module, LazyModule):
+            module.Load()
+
+#---------------start of functions for timing instrumentation------------------
+
+TIMING_LOG_PATH = 'timings.jsonl' # every analysis run appends its stage timings here, one JSON record per line
+
+currentTrace = contextvars.ContextVar('currentTrace', default = None) # trace of the analysis run in this thread, if any
+timingLogLock = threading.Lock()
+profilePath = None # set by --profile, every GUI analysis run is then profiled with cProfile and its statistics written next to it, see RunProfilePath()
+profileLock = threading.Lock() # held by the GUI analysis run being profiled, only one profiler can be active at a time
+
+def NewTrace(**fields):
+    """
+    Start the trace of one analysis run, to be made current with currentTrace.set().
+
+    Args:
+        fields: values written with every record of the run, e.g. run and ticker
+
+    Return:
+        trace: dictionary collecting the timed stages and counters of the run
+    """
+
+    return {'fields': fields,
+            'started': time.perf_counter(),
+            'spans': [],
+            'counters': collections.Counter(),
+            'lock': threading.Lock()}
+
+@contextlib.contextmanager
+def TimedStage(stage):
+    """
+    Time the stage of an analysis run inside the with block and add it to the current trace.
+
+    Nothing is recorded, and almost nothing spent, when no trace is current.
+
+    Args:
+        stage: name of the stage, e.g. 'download prices'
+    """
+
+    trace = currentTrace.get()
+    if trace is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        span = {'stage': stage,
+                'start': started - trace['started'],
+                'seconds': time.perf_counter() - started,
+                'thread': threading.current_thread().name}
+        with trace['lock']:
+            trace['spans'].append(span)
+
+def CountEvent(counter, amount = 1):
+    """add to a counter of the current trace, e.g. 'http requests', nothing is done when no trace is current"""
+
+    trace = currentTrace.get()
+    if trace is not None:
+        with trace['lock']:
+            trace['counters'][counter] += amount
+
+def WriteTrace(trace, status, path = None):
+    """
+    Append the timed stages and counters of a finished run to the timing log as JSON lines.
+
+    One 'span' record is written per timed stage, then one 'run' record with the total
+    time, the counters and the status of the run.
+
+    Args:
+        trace: trace returned by NewTrace()
+        status: how the run ended, e.g. 'done', 'error' or 'cancelled'
+        path: file to append to, TIMING_LOG_PATH if not given
+    """
+
+    with trace['lock']:
+        records = [dict(trace['fields'], kind = 'span', **span) for span in trace['spans']]
+        records.append(dict(trace['fields'], kind = 'run', status = status,
+                            seconds = time.perf_counter() - trace['started'],
+                            counters = dict(trace['counters']),
+                            time = dt.datetime.now().isoformat(timespec = 'seconds')))
+
+    with timingLogLock:
+        with open(path or TIMING_LOG_PATH, 'a') as logFile:
+            for record in records:
+                logFile.write(json.dumps(record) + '\n')
+
+def SummariseTrace(trace):
+    """
+    Summarise a trace in a few lines for the GUI.
+
+    Return:
+        text: seconds spent in every stage, in the order the stages started, then the counters.
+            A stage run several times, possibly at the same time in several threads, shows the
+            sum of its times and how many times it ran.
+    """
+
+    with trace['lock']:
+        spans = sorted(trace['spans'], key = lambda span: span['start'])
+        counters = dict(trace['counters'])
+
+    totals = collections.OrderedDict()
+    for span in spans:
+        (seconds, count) = totals.get(span['stage'], (0, 0))
+        totals[span['stage']] = (seconds + span['seconds'], count + 1)
+
+    lines = []
+    for stage, (seconds, count) in totals.items():
+        lines.append('{}: {:.3f}s'.format(stage, seconds) + (' ({} times)'.format(count) if count > 1 else ''))
+    lines.append('total: {:.3f}s'.format(time.perf_counter() - trace['started']))
+    if counters:
+        lines.append(', '.join('{} {}'.format(counter, count) for counter, count in sorted(counters.items())))
+
+    return '\n'.join(lines)
+
+def DumpProfile(profiler, path):
+    """stop a cProfile.Profile and write its statistics to path, for pstats or snakeviz"""
+
+    profiler.disable()
+    profiler.dump_stats(path)
+
+def RunProfilePath(path, runId):
+    """file the profile of one GUI analysis run is written to, e.g. profile-run3.prof for --profile profile.prof"""
+
+    root, extension = os.path.splitext(path)
+    return '{}-run{}{}'.format(root, runId, extension)
+
+#---------------end of functions for timing instrumentation------------------
+
 #---------------start of functions for GUI------------------
 
 # user guide & clear button & details
@@ -101,308 +293,4330 @@ in stock valuation, in association with other financial ratios.
 
 #---------------end of functions for GUI------------------
 
-#---------------start of functions for Bollinger Band Strategy Output------------------
+#---------------start of functions for ticker index------------------
 
-def ConvertToDatetime(strDate):
+SYMBOL_LIST_PATH = 'symbols.txt' # list of valid tickers, one per line, e.g. exported from the exchanges
+SYMBOL_INDEX_PATH = 'symbol_index.npy' # sorted fixed width array built from SYMBOL_LIST_PATH, memory-mapped when used
+
+symbolIndexes = {} # indexes loaded by GetSymbolIndex() by index file, None when there is none
+symbolIndexLock = threading.Lock()
+
+def BuildSymbolIndex(listPath = SYMBOL_LIST_PATH, indexPath = SYMBOL_INDEX_PATH):
     """
-    Convert string to idealized calendar, the Gregorian calendar.
+    Build the ticker index from a list of tickers.
 
-    The function takes in a date in string format and convert it into an
-    Gregorian calendar format using class datetime.date from datetime library.
-    Class datetime.date takes in arguments in following form: (year, month, day).
+    The first field of every line (separated by a comma or white space) is taken as a
+    ticker. The tickers are upper-cased, deduplicated, sorted and saved as one array of
+    fixed width byte strings, which can be memory-mapped and binary searched.
 
     Args:
-        strDate: A date in string format.
+        listPath: text file listing the tickers
+        indexPath: .npy file the index is written to
 
     Return:
-        The converted date in Gregorian calendar format.
-
-    Raises:
-        ValueError: if the followings are not satisfied:
-            MINYEAR <= year <= MAXYEAR
-            1 <= month <= 12
-            1 <= day <= number of days in the given month and year
+        index: the sorted array of tickers
     """
 
-    listDate = strDate.split("-") # split the string based on this separator
+    symbols = set()
+    with open(listPath) as listFile:
+        for line in listFile:
+            fields = line.replace(',', ' ').split()
+            if fields and not fields[0].startswith('#'):
+                symbols.add(fields[0].upper())
 
-    # convert all strings in the list to int
-    for i in range(len(listDate)):
-        listDate[i] = int(listDate[i])
+    index = np.array(sorted(symbol.encode('ascii', 'ignore') for symbol in symbols))
+    if len(index) == 0:
+        index = np.array([], dtype = 'S1')
 
-    dateTime = dt.date(listDate[0], listDate[1], listDate[2]) # convert to Gregorian datetime format
+    # written next to the final file first so a reader never maps a half written index
+    temporaryPath = indexPath + '.tmp.npy'
+    np.save(temporaryPath, index)
+    os.replace(temporaryPath, indexPath)
 
-    return dateTime
+    return index
 
-def ExecuteBollingerBandStrategy(ticker, startDate, endDate, rolling_period):
+def GetSymbolIndex(listPath = SYMBOL_LIST_PATH, indexPath = SYMBOL_INDEX_PATH):
     """
-    Execute Bollinger Band strategy and compare with buy and hold returns of the stock.
+    Get the ticker index, loading it the first time.
 
-    The function will run Bollinger Band strategy on given ticker based on given
-    start date and end date. It will use a given parameter as rolling period for
-    the Bollinger Band strategy. Finally, the returns from speculating the stock
-    using Bollinger Band is compared with returns result from buying and holding
-    of the stock. It aims to give general sense of returns from different investment
-    approaches.
+    The index is rebuilt when the list of tickers is newer than it, then memory-mapped
+    read only, so loading costs nothing however many tickers it holds.
+
+    Return:
+        index: sorted array of tickers, or None if there is neither a list nor an index of tickers
+    """
+
+    with symbolIndexLock:
+        if indexPath not in symbolIndexes:
+            if os.path.exists(listPath) and (not os.path.exists(indexPath) or os.path.getmtime(listPath) > os.path.getmtime(indexPath)):
+                BuildSymbolIndex(listPath, indexPath)
+            symbolIndexes[indexPath] = np.load(indexPath, mmap_mode = 'r') if os.path.exists(indexPath) else None
+
+        return symbolIndexes[indexPath]
+
+def IsKnownSymbol(index, ticker):
+    """
+    Check whether a ticker is in the index with a binary search.
 
     Args:
-        ticker: stock ticker.
-        startDate: intended start date for Bollinger Band strategy backtest
-        endDate: intended end date for Bollinger Band strategy backtest
-        rolling_period: intended rolling parameter for Bollinger Band strategy backtest
+        index: sorted array of tickers returned by GetSymbolIndex()
+        ticker: ticker to look for, in any case
 
     Return:
-        None. The final graph will be saved as an image to output to GUI.
+        True if the ticker is in the index
     """
-    
-    df = yf.download(ticker, startDate, endDate) # download Open, High, Low, CLose, Adj Close and Volume data, store into dataframe,
 
-    # create the indicators
-    # sma_rolling_period = Simple Moving Average calculated based on "rolling_period" as its lookback parameter
-    # rolling_period_STD = standard deviations calculated based on prices througout the "rolling_period"
-    # BB_upper_band = 2 standard deviations above sma_rolling_period
-    # BB_lower_band = 2 standard deviations below sma_rolling_period
-    df['sma_rolling_period'] = df['Adj Close'].rolling(window = rolling_period).mean()
-    df['rolling_period_STD'] = df['Adj Close'].rolling(window = rolling_period).std()
-    df['BB_upper_band'] = df['sma_rolling_period'] + 2 * df['rolling_period_STD']
-    df['BB_lower_band'] = df['sma_rolling_period'] - 2 * df['rolling_period_STD']
+    symbol = ticker.strip().upper().encode('ascii', 'ignore')
+    if len(symbol) == 0 or len(symbol) > index.dtype.itemsize:
+        return False
 
-    # create signals
+    position = np.searchsorted(index, symbol)
 
-    # buy signals
-    df['signal'] = np.where((df['Adj Close'] < df['BB_lower_band'])
-                              & (df['Adj Close'].shift(1) > df['BB_lower_band'].shift(1)),
-                              1, 0)
-    #sell signals
-    df['signal'] = np.where((df['Adj Close'] > df['BB_upper_band'])
-                              & (df['Adj Close'].shift(1) < df['BB_upper_band'].shift(1)),
-                              -1, df['signal'])
+    return position < len(index) and index[position] == symbol
 
-    # identify positions hold throughout the use of this strategy
-    df['position'] = df['signal'].shift(1) # assume that we only able to get into trade after signal generated
-    df['position'] = df['position'].replace(to_replace = 0, method = 'ffill') # position is closed only when signal for
-    # opposite trading direction is generated
+def SymbolsWithPrefix(index, prefix, limit = 10):
+    """
+    Find the tickers of the index starting with a prefix, for autocompletion.
 
-    # calculate and compare returns resulting from:
-    # (1) buy and hold return
-    # (2) return realized through this strategy
-    df['Buy & Hold Returns'] = df['Adj Close'].pct_change() # buy and hold return, pct_change() is percentage change between
-    # current and previous day's price
-    df['Bollinger Band Strategy Returns'] = df['Buy & Hold Returns'] * df['position'] # the return realized through this strategy
+    Args:
+        index: sorted array of tickers returned by GetSymbolIndex()
+        prefix: start of the ticker typed so far, in any case
+        limit: most tickers returned
 
-    # get return values from respective approach and plot equity curves
-    # df['Buy & Hold Returns'] and df['Bollinger Band Strategy Returns'] refer to return on that day itself, in order to get equity curve we
-    # need to plus one on each of the returns before calculate cumulative product.
-    # Use vectorized operations to carry out calculation of cumulative product
-    buyAndHoldReturn = np.round((1 + df['Buy & Hold Returns']).cumprod()[-1],2)
-    bollingerReturn = np.round((1 + df['Bollinger Band Strategy Returns']).cumprod()[-1],2)
-    (1 + df[['Buy & Hold Returns','Bollinger Band Strategy Returns']]).cumprod().plot(grid = True, figsize = (6,4))
-    plt.title('Bollinger Band Strategy Return: {}  Buy and Hold Return: {}'.format(bollingerReturn,buyAndHoldReturn))
-    
-    plt.savefig('rolling.png') # save the graph as an image
+    Return:
+        symbols: up to limit tickers in alphabetical order
+    """
 
-#---------------end of functions for Bollinger Band Strategy Output------------------
+    symbol = prefix.strip().upper().encode('ascii', 'ignore')
+    if len(symbol) == 0:
+        return []
+    if len(symbol) >= index.dtype.itemsize:
+        return [symbol.decode()] if IsKnownSymbol(index, prefix) else []
 
-#---------------start of functions for financial ratios output------------------
+    # every ticker starting with the prefix sorts between the prefix and the prefix followed by the highest byte
+    first = np.searchsorted(index, symbol, side = 'left')
+    last = np.searchsorted(index, symbol + b'\xff', side = 'left')
 
-# Scraping data from website and building a data frame
-def GetTable(url):
+    return [symbol.decode() for symbol in index[first:min(last, first + limit)]]
+
+#---------------end of functions for ticker index------------------
+
+#---------------start of functions for price history store------------------
+
+PRICE_STORE_DIR = 'price_store' # folder holding the downloaded price history, one sub-folder per ticker
+PRICE_SETTLE_DAYS = 7 # days after which a missing bar is taken as a holiday rather than not yet published
+
+priceStoreLocks = {} # (store folder, ticker) -> lock held by LoadPriceHistory() while it reads, downloads and writes the ticker
+priceStoreLocksLock = threading.Lock()
+
+def DownloadPriceHistory(ticker, startDate, endDate):
     """
-    Fetch the page, parse it - splits the given sequence of characters or values (text) into smaller parts,
-    scrapes data from yahoo finance and build a data frame
+    Download daily price history of a ticker from yahoo finance.
+
+    This is the default price provider used by LoadPriceHistory(). Any function taking
+    the same arguments and returning the same kind of dataframe can be used instead,
+    e.g. the one built by CsvPriceProvider() to work offline.
 
     Args:
-        url: a string of website where the data are extracted from
+        ticker: stock ticker.
+        startDate: first date to download (inclusive)
+        endDate: last date to download (exclusive)
 
     Return:
-        dfOrg: The Original Dataframe
-        dfRot: Transpose Dataframe
+        df: Open, High, Low, Close, Adj Close and Volume data indexed by date
     """
-    
-    # Define request headers to fetch the page by the browser. 
-    headers = {
-    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3',
-    'Accept-Encoding': 'gzip, deflate, br',
-    'Accept-Language': 'en-US,en;q=0.9',
-    'Cache-Control': 'max-age=0',
-    'Pragma': 'no-cache',
-    'Referrer': 'https://google.com',
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/77.0.3865.120 Safari/537.36'
-}
-    
-    # Fetch the page that we're going to parse, using the request headers defined above
-    page = requests.get(url, headers)
-    
-    # Parse the page with LXML, so that we can start doing some XPATH queries
-    # to extract the data that we want
-    tree = html.fromstring(page.content)
 
-    # Smoke test that we fetched the page by fetching and displaying the H1 element
-    tree.xpath("//h1/text()")
-    tableRows = tree.xpath("//div[contains(@class, 'D(tbr)')]")
+    # newer versions of yfinance adjust Close in place by default and leave out Adj Close
+    with TimedStage('yf.download'):
+        df = yf.download(ticker, startDate, endDate, auto_adjust = False)
 
-    # Ensure that some table rows are found; if none are found, then the layout of the website has been changed.
-    parsedRows = []
-    #Start of the loop - this will create the dataframe of the rows parsed  
-    for tableRow in tableRows:
-        parsedRow = []
-        el = tableRow.xpath("./div")
-        noneCount = 0
-        #Start of the loop where each value of a row is checked, if value found, 
-        #the cell value will be replaced with the value found
-        for rs in el:
-            try:
-                (text,) = rs.xpath('.//span/text()[1]')
-                parsedRow.append(text)
-            #If there is no value or there is error, for that particular element parsed, 
-            #it will be replaced with Nan 
-            except ValueError:
-                parsedRow.append(np.NaN)
-                noneCount += 1
-        #The loop would be continued for each instance end ensure it is less than 4 and form the rows
-        if (noneCount < 4):
-            parsedRows.append(parsedRow)
-            
-    # Create a DataFrame of the Parsed rows, set the index to the first column as Period ending
-    # Transpose the DataFrame, so that our header contains the account names
-    df = pd.DataFrame(parsedRows)
-    dfOrg = df
-    df = pd.DataFrame(parsedRows)
-    df = df.set_index(0) 
-    df = df.transpose() 
+    # newer versions of yfinance label the columns with (field, ticker) pairs even for one ticker
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
 
-    # Rename the "Breakdown" column to "Date"
-    cols = list(df.columns)
-    cols[0] = 'Date'
-    df = df.set_axis(cols, axis='columns', inplace=False)
-    dfRot = df
-    
-    return dfOrg, dfRot
+    return df
 
-# Calculate the ratios needed, and build 2 tables for Income Statement and Balance Sheet ratios separately
-def CalculateRatio(ticker):
+def CsvPriceProvider(folder):
     """
-    Calculate the ratios needed from Balance Sheet and Income Statement
+    Build a price provider which reads <folder>/<ticker>.csv instead of going online.
 
     Args:
-        ticker: represents company user is searching for
+        folder: folder containing one csv file per ticker, dates in the first column
 
     Return:
-        Two table containing Income Statement and Balance Sheet Ratios and dates separately
+        a function with the same arguments and return value as DownloadPriceHistory()
+    """
+
+    def ReadCsvPriceHistory(ticker, startDate, endDate):
+        df = pd.read_csv(os.path.join(folder, ticker + '.csv'), index_col = 0, parse_dates = True)
+        return df[(df.index >= pd.Timestamp(startDate)) & (df.index < pd.Timestamp(endDate))]
 
+    return ReadCsvPriceHistory
+
+def ReadStoredPrices(ticker, storeDir = PRICE_STORE_DIR):
     """
-    
-    # Yahoo Finance links
-    urlBs = 'https://sg.finance.yahoo.com/quote/' + ticker + '/balance-sheet?p=' + ticker
-    urlIs = 'https://sg.finance.yahoo.com/quote/' + ticker + '/financials?p=' + ticker
-    urlCf = 'https://sg.finance.yahoo.com/quote/' + ticker + '/cash-flow?p='+ ticker
+    Read the price history of a ticker kept in the local price store.
 
-    # get Balance Sheet
-    bsOrginal, bsTranspose = GetTable(urlBs)
+    Every column is kept in its own .npy file next to a meta.json file recording the
+    column names and the date range which has already been downloaded.
 
-    # get Income Statement
-    isOrginal, isTranspose = GetTable(urlIs)
+    Args:
+        ticker: stock ticker.
+        storeDir: folder of the price store
 
-    # copy columns of dataframe to do BS analysis
-    bsAnalysis = pd.DataFrame(bsTranspose['Date'])
-    year = bsTranspose['Date'].str.replace('/','').astype(int)%10000
-    bsAnalysis['Year'] = year
-    bsAnalysis
+    Return:
+        df: stored price history, None if the ticker has never been stored
+        coverage: (start, end) timestamps of the date range already downloaded
+    """
 
-    #calculation of Current Ratio
-    currentAssets = bsTranspose['Total current assets'].str.replace(',', '').astype(int)
-    currentLiabilities = bsTranspose['Total current liabilities'].str.replace(',', '').astype(int)
-    currentRatio = currentAssets / currentLiabilities
-    bsAnalysis['Current Ratio'] = currentRatio
+    folder = os.path.join(storeDir, ticker)
+    metaPath = os.path.join(folder, 'meta.json')
 
-    # copy columns of dataframe to do income statement analysis
-    isAnalysis = pd.DataFrame(isTranspose['Date'])
-    year = (isTranspose['Date'].str.replace('/','')[1:]).astype(int)%10000
-    isAnalysis['Year'] = year
-    
-    #calculation of Net profit Ratio
-    revenue = isTranspose['Total revenue'].str.replace(',', '').astype(int)
-    netIncome = isTranspose['Net income'].str.replace(',', '').astype(int)
-    netProfitMargin = netIncome / revenue
-    isAnalysis['NPR'] = netProfitMargin
+    if not os.path.exists(metaPath):
+        return None, None
 
-    #calculation of Return on Equity
-    netProfit = isTranspose['Net income available to common shareholders'].str.replace(',', '').astype(int)
-    averageShareholderEquityForThePeriod = bsTranspose['Total stockholders\' equity'].str.replace(',', '').astype(int)
-    returnOnEquity = netProfit / averageShareholderEquityForThePeriod
-    isAnalysis['ROE'] = returnOnEquity
+    with open(metaPath) as metaFile:
+        meta = json.load(metaFile)
 
-    #calculation of Return on Assets
-    averageAssetsForThePeriod = bsTranspose['Total assets'].str.replace(',', '').astype(int)
-    assetsTurnover = revenue / averageAssetsForThePeriod
-    isAnalysis['Asset Turnover'] = assetsTurnover
-    returnOnAssets = netProfitMargin / assetsTurnover
-    isAnalysis['ROA'] = returnOnAssets
-    isAnalysis.drop([1])
+    dates = np.load(os.path.join(folder, 'Date.npy'))
+    columns = {}
+    for name in meta['columns']:
+        columns[name] = np.load(os.path.join(folder, name + '.npy'))
 
-    return isAnalysis,bsAnalysis
+    df = pd.DataFrame(columns, index = pd.DatetimeIndex(dates, name = 'Date'))
+    coverage = (pd.Timestamp(meta['start']), pd.Timestamp(meta['end']))
 
-# Function to print out the ratios as asked by the user or print error message if it is unavailable.
-def GetRatioOutput(symbol,bsAnalysis,isAnalysis,startYear,endYear):
+    return df, coverage
+
+def WriteStoredPrices(ticker, df, coverage, storeDir = PRICE_STORE_DIR):
     """
-    Print out the ratios as asked by the user or print error message if it is unavailable.
+    Write the price history of a ticker into the local price store.
+
+    Each file is written under a unique temporary name and then renamed, and meta.json
+    is written last, so a reader never sees a half written file. Threads writing the same
+    ticker must still take turns, see PriceStoreLock().
 
     Args:
-        symbol: represents company the user is searching for
-        bsAnalysis: table containing balance sheet ratios
-        isAnalysis: table containing income statement ratios
-        startYear: the year of input start date
-        endYear: the year of input end date
+        ticker: stock ticker.
+        df: price history indexed by date
+        coverage: (start, end) timestamps of the date range df was downloaded for
+        storeDir: folder of the price store
+    """
 
-    Return:
-        msg: the balance sheet ratios to be displayed to the users
-        printableIsDf: the income statement ratios to be displayed to the users
-    """ 
+    folder = os.path.join(storeDir, ticker)
+    os.makedirs(folder, exist_ok = True)
 
-    msg = "Company with symbol: {} are to be analysed.".format(symbol) +'\n'
-    userInput = [n for n in range(startYear,endYear+1)]
+    def ReplaceAtomically(fileName, mode, write):
+        handle, temporaryPath = tempfile.mkstemp(prefix = fileName + '.', suffix = '.tmp', dir = folder)
+        try:
+            with os.fdopen(handle, mode) as temporaryFile:
+                write(temporaryFile)
+            os.replace(temporaryPath, os.path.join(folder, fileName))
+        except BaseException:
+            os.remove(temporaryPath)
+            raise
+
+    dates = pd.DatetimeIndex(df.index)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    ReplaceAtomically('Date.npy', 'wb', lambda npyFile: np.save(npyFile, dates.values.astype('datetime64[ns]')))
+    for name in df.columns:
+        ReplaceAtomically(name + '.npy', 'wb', lambda npyFile: np.save(npyFile, df[name].to_numpy()))
+
+    meta = {'columns': list(df.columns), 'start': str(coverage[0]), 'end': str(coverage[1])}
+    ReplaceAtomically('meta.json', 'w', lambda metaFile: json.dump(meta, metaFile))
+
+def PriceStoreLock(ticker, storeDir = PRICE_STORE_DIR):
+    """lock of one ticker of a price store, so that threads loading the same ticker download and write it one at a time"""
+
+    key = (os.path.abspath(storeDir), ticker)
+    with priceStoreLocksLock:
+        return priceStoreLocks.setdefault(key, threading.Lock())
+
+def LoadPriceHistory(ticker, startDate, endDate, storeDir = PRICE_STORE_DIR, provider = DownloadPriceHistory):
+    """
+    Get the price history of a ticker, downloading only what is not stored locally yet.
+
+    If the requested date range overlaps what is already in the price store, only the
+    missing leading and/or trailing part is fetched from the provider and merged into
+    the store. The stored range always stays contiguous. Threads loading the same ticker
+    take turns, so the second one finds what the first one downloaded.
+
+    The store only records a range as downloaded once its bars are surely published: never
+    beyond the start of today, and within the last PRICE_SETTLE_DAYS days only up to the
+    last bar received. Later bars are asked for again on the next call.
+
+    Args:
+        ticker: stock ticker.
+        startDate: first date wanted (inclusive)
+        endDate: last date wanted (exclusive), same convention as yf.download
+        storeDir: folder of the price store
+        provider: function used to fetch missing prices, see DownloadPriceHistory()
+
+    Return:
+        df: price history of the ticker between startDate and endDate
+
+    Raises:
+        ValueError: if the provider returns prices without an 'Adj Close' column, which are not stored
+    """
+
+    start = pd.Timestamp(startDate)
+    end = pd.Timestamp(endDate)
+    today = pd.Timestamp.today().normalize()
+
+    def Fetch(fetchStart, fetchEnd):
+        # every consumer reads Adj Close, prices without it must never reach the store
+        df = provider(ticker, fetchStart, fetchEnd)
+        if 'Adj Close' not in df.columns:
+            raise ValueError('prices of {} have no Adj Close column'.format(ticker))
+        return df
+
+    with PriceStoreLock(ticker, storeDir):
+        stored, coverage = ReadStoredPrices(ticker, storeDir)
+
+        if stored is None:
+            stored = Fetch(start, end)
+            newCoverage = (start, end)
+        else:
+            coveredStart, coveredEnd = coverage
+            pieces = [stored]
+
+            # download the leading gap
+            if start < coveredStart:
+                pieces.insert(0, Fetch(start, coveredStart))
+
+            # download the trailing gap
+            if end > coveredEnd:
+                pieces.append(Fetch(coveredEnd, end))
+
+            if len(pieces) > 1:
+                stored = pd.concat(pieces)
+                stored = stored[~stored.index.duplicated(keep = 'last')].sort_index()
+            newCoverage = (min(start, coveredStart), max(end, coveredEnd))
+
+        # only record as downloaded what has surely been published, never less than was recorded before
+        if len(stored) > 0:
+            published = min(today, max(today - pd.Timedelta(days = PRICE_SETTLE_DAYS), stored.index.max() + pd.Timedelta(days = 1)))
+            coveredUntil = max(min(newCoverage[1], published), newCoverage[0])
+            if coverage is not None:
+                coveredUntil = max(coveredUntil, coverage[1])
+            newCoverage = (newCoverage[0], coveredUntil)
+
+        # nothing downloaded for an unknown ticker, do not record it in the store
+        if newCoverage != coverage and len(stored) > 0:
+            WriteStoredPrices(ticker, stored, newCoverage, storeDir)
+
+        return stored[(stored.index >= start) & (stored.index < end)]
+
+#---------------end of functions for price history store------------------
+
+#---------------start of functions for Bollinger Band Strategy Output------------------
+
+def ConvertToDatetime(strDate):
+    """
+    Convert string to idealized calendar, the Gregorian calendar.
+
+    The function takes in a date in string format and convert it into an
+    Gregorian calendar format using class datetime.date from datetime library.
+    Class datetime.date takes in arguments in following form: (year, month, day).
+
+    Args:
+        strDate: A date in string format.
+
+    Return:
+        The converted date in Gregorian calendar format.
+
+    Raises:
+        ValueError: if the followings are not satisfied:
+            MINYEAR <= year <= MAXYEAR
+            1 <= month <= 12
+            1 <= day <= number of days in the given month and year
+    """
+
+    listDate = strDate.split("-") # split the string based on this separator
+
+    # convert all strings in the list to int
+    for i in range(len(listDate)):
+        listDate[i] = int(listDate[i])
+
+    dateTime = dt.date(listDate[0], listDate[1], listDate[2]) # convert to Gregorian datetime format
+
+    return dateTime
+
+CORE_BLOCK_SIZE = 16384 # prices handled per step by BollingerBandCore(), keeps its temporary arrays small and in cache
+BAND_ANCHOR_PERIOD = 16384 # the running sums of the bands restart from the current price every this many prices, so they never grow large enough to lose precision
+
+def NewCoreState(rolling_period, bandWidth = 2):
+    """
+    Create the state BollingerBandCore() carries from one block of prices to the next.
+
+    Args:
+        rolling_period: rolling period of the bands (at least 2)
+        bandWidth: number of standard deviations between the moving average and the bands
+
+    Return:
+        state: dictionary of the running sums, the last values needed by the next prices and the equity so far
+
+    Raises:
+        ValueError: if rolling_period is smaller than 2
+    """
+
+    if rolling_period < 2:
+        raise ValueError('rolling period must be at least 2')
+
+    return {'window': rolling_period,
+            'bandWidth': bandWidth,
+            'bars': 0,
+            'anchor': None,
+            'cumSums': np.zeros(1), # last rolling_period + 1 running sums, measured from the anchor
+            'cumSumSqs': np.zeros(1),
+            'tail': np.zeros(0), # last rolling_period prices, the running sums are rebuilt from them at every new anchor
+            'previousPrice': np.nan,
+            'previousUpper': np.nan,
+            'previousLower': np.nan,
+            'lastSignal': 0,
+            'buyAndHoldEquity': 1.0,
+            'bollingerEquity': 1.0}
+
+def BollingerBandCore(prices, rolling_period, bandWidth = 2, dtype = 'float64', state = None):
+    """
+    Backtest the Bollinger Band strategy on a NumPy array of prices.
+
+    Bands, signals, carried positions, daily returns and both equity curves are written
+    block by block into arrays allocated once, so no DataFrame columns are created and
+    the temporary arrays never grow beyond CORE_BLOCK_SIZE prices. The bands use the
+    same floating point steps as ComputeBollingerSweep() and UpdateStreamState().
+
+    The running sums behind the bands are measured from an anchor price which moves to the
+    current price every BAND_ANCHOR_PERIOD prices, counted from the first price of the
+    backtest, so the sums stay small and the bands keep their precision on long minute
+    histories. The steps are those of UpdateStreamState().
+
+    Passing back the returned state with the next prices continues the backtest exactly
+    where it stopped: the outputs are bit for bit those of one run over all the prices.
+
+    Args:
+        prices: adjusted close prices in date order
+        rolling_period: rolling period of the bands (at least 2)
+        bandWidth: number of standard deviations between the moving average and the bands
+        dtype: 'float64', or 'float32' to halve the memory of the outputs (sums are always kept in float64)
+        state: state returned by a previous call to continue from, a new backtest if not given
+
+    Return:
+        outputs: dictionary of arrays with one value per price: 'sma', 'upper', 'lower',
+            'signal', 'position', 'buyAndHoldReturns', 'bollingerReturns',
+            'buyAndHoldEquity' and 'bollingerEquity'
+        state: state to pass with the next prices
+    """
+
+    if state is None:
+        state = NewCoreState(rolling_period, bandWidth)
+
+    prices = np.ascontiguousarray(prices, dtype = np.float64)
+    n = len(prices)
+    outputs = {}
+    for name in ['sma', 'upper', 'lower', 'buyAndHoldReturns', 'bollingerReturns', 'buyAndHoldEquity', 'bollingerEquity']:
+        outputs[name] = np.empty(n, dtype = dtype)
+    outputs['signal'] = np.empty(n, dtype = np.int8)
+    outputs['position'] = np.empty(n, dtype = np.int8)
+
+    window = state['window']
+    width = state['bandWidth']
+
+    start = 0
+    while start < n:
+        # blocks never cross a new anchor, which is counted from the first price of the whole backtest
+        sinceAnchor = state['bars'] % BAND_ANCHOR_PERIOD
+        stop = min(start + CORE_BLOCK_SIZE, start + BAND_ANCHOR_PERIOD - sinceAnchor, n)
+        block = prices[start:stop]
+
+        # new anchor: the running sums of the prices still inside the window are rebuilt from it
+        if sinceAnchor == 0:
+            state['anchor'] = block[0]
+            deviation = state['tail'] - block[0]
+            state['cumSums'] = np.cumsum(np.concatenate(([0.0], deviation)))
+            state['cumSumSqs'] = np.cumsum(np.concatenate(([0.0], deviation * deviation)))
+        anchor = state['anchor']
+
+        # running sums continued from the previous block, preceded by the sums still inside the window
+        deviation = block - anchor
+        cumSums = np.concatenate((state['cumSums'][:-1], np.cumsum(np.concatenate((state['cumSums'][-1:], deviation)))))
+        cumSumSqs = np.concatenate((state['cumSumSqs'][:-1], np.cumsum(np.concatenate((state['cumSumSqs'][-1:], deviation * deviation)))))
+
+        # window sums of every price in the block, windows starting before the very first price are incomplete
+        tailLength = len(state['cumSums'])
+        firstComplete = min(max(window - tailLength, 0), len(block))
+        windowSum = np.empty(len(block))
+        windowSumSq = np.empty(len(block))
+        windowSum[:firstComplete] = np.nan
+        windowSumSq[:firstComplete] = np.nan
+        np.subtract(cumSums[tailLength + firstComplete:], cumSums[tailLength + firstComplete - window:len(cumSums) - window],
+                    out = windowSum[firstComplete:])
+        np.subtract(cumSumSqs[tailLength + firstComplete:], cumSumSqs[tailLength + firstComplete - window:len(cumSumSqs) - window],
+                    out = windowSumSq[firstComplete:])
+
+        # bands, in place but with the same floating point steps as ComputeBollingerSweep() and UpdateStreamState()
+        sma = windowSum / window
+        sma += anchor
+        windowSum *= windowSum
+        windowSum /= window
+        variance = np.subtract(windowSumSq, windowSum, out = windowSumSq)
+        variance /= window - 1
+        np.maximum(variance, 0, out = variance)
+        std = np.sqrt(variance, out = variance)
+        std *= width
+        upper = sma + std
+        lower = sma - std
+
+        # signals against the previous price and bands, carried over from the previous block
+        previousPrice = np.concatenate(([state['previousPrice']], block[:-1]))
+        previousUpper = np.concatenate(([state['previousUpper']], upper[:-1]))
+        previousLower = np.concatenate(([state['previousLower']], lower[:-1]))
+        buy = (block < lower) & (previousPrice > previousLower)
+        sell = (block > upper) & (previousPrice < previousUpper)
+        signal = buy.astype(np.int8)
+        signal[sell] = -1
+
+        # carry the latest signal forward and trade one day after it
+        signals = np.concatenate(([state['lastSignal']], signal))
+        latestSignalDay = np.maximum.accumulate(np.where(signals != 0, np.arange(len(signals)), 0))
+        carried = signals[latestSignalDay]
+
+        # daily returns, the very first price has none
+        dailyReturns = block / previousPrice - 1
+        if state['bars'] == 0:
+            dailyReturns[0] = 0
+        bollingerReturns = dailyReturns * carried[:-1]
+        buyAndHoldEquity = np.cumprod(np.concatenate(([state['buyAndHoldEquity']], 1 + dailyReturns)))
+        bollingerEquity = np.cumprod(np.concatenate(([state['bollingerEquity']], 1 + bollingerReturns)))
+
+        outputs['sma'][start:stop] = sma
+        outputs['upper'][start:stop] = upper
+        outputs['lower'][start:stop] = lower
+        outputs['signal'][start:stop] = signal
+        outputs['position'][start:stop] = carried[:-1]
+        outputs['buyAndHoldReturns'][start:stop] = dailyReturns
+        outputs['bollingerReturns'][start:stop] = bollingerReturns
+        outputs['buyAndHoldEquity'][start:stop] = buyAndHoldEquity[1:]
+        outputs['bollingerEquity'][start:stop] = bollingerEquity[1:]
+
+        state['bars'] += len(block)
+        state['cumSums'] = cumSums[-(window + 1):]
+        state['cumSumSqs'] = cumSumSqs[-(window + 1):]
+        state['tail'] = np.concatenate((state['tail'], block))[-window:]
+        state['previousPrice'] = block[-1]
+        state['previousUpper'] = upper[-1]
+        state['previousLower'] = lower[-1]
+        state['lastSignal'] = carried[-1]
+        state['buyAndHoldEquity'] = buyAndHoldEquity[-1]
+        state['bollingerEquity'] = bollingerEquity[-1]
+        start = stop
+
+    return outputs, state
+
+def BacktestBollingerBand(df, rolling_period, dtype = 'float64', ticker = None):
+    """
+    Run Bollinger Band strategy on a price history and compare with buy and hold returns.
+
+    Args:
+        df: price history with an 'Adj Close' column, e.g. from LoadPriceHistory()
+        rolling_period: intended rolling parameter for Bollinger Band strategy backtest
+        dtype: 'float64', or 'float32' for outputs taking half the memory
+        ticker: stock ticker of the prices, when given the backtest goes through
+            IncrementalBollingerBandCore() so that a later end date only computes the new prices;
+            reading the prices and building the dataframe still cost time in proportion to the whole history
+
+    Return:
+        df: new dataframe indexed by date with the price, bands, signal, position, daily
+            returns and equity curves of both approaches
+        bollingerReturn: final equity of the Bollinger Band strategy, rounded to 2 decimals
+        buyAndHoldReturn: final equity of buying and holding the stock, rounded to 2 decimals
+    """
+
+    prices = df['Adj Close'].dropna()
+    if ticker is None:
+        outputs, state = BollingerBandCore(prices.to_numpy(), rolling_period, dtype = dtype)
+    else:
+        outputs, state = IncrementalBollingerBandCore(ticker, prices, rolling_period, dtype = dtype)
+
+    df = BacktestFrame(prices, outputs)
+    bollingerReturn = np.round(state['bollingerEquity'],2)
+    buyAndHoldReturn = np.round(state['buyAndHoldEquity'],2)
+
+    return df, bollingerReturn, buyAndHoldReturn
+
+BACKTEST_CACHE_SIZE = 32 # (ticker, rolling period) backtests kept for IncrementalBollingerBandCore(), least recently used dropped beyond this
+
+backtestCache = collections.OrderedDict() # (ticker, rolling_period, dtype) -> outputs so far and the core state after them
+backtestCacheLock = threading.Lock()
+
+def IncrementalBollingerBandCore(ticker, prices, rolling_period, bandWidth = 2, dtype = 'float64'):
+    """
+    BollingerBandCore() remembering its state per (ticker, rolling period), so a longer history only computes its new prices.
+
+    The outputs and the core state after the last price are kept in backtestCache. When the
+    same ticker and rolling period come back with the same start date and more prices, only
+    the new prices are passed to BollingerBandCore() with the kept state, so the outputs are
+    bit for bit those of a full run. The outputs are kept in buffers with spare room, doubled
+    when full, so an extension costs time in proportion to the new prices.
+
+    The kept history is reused when every one of its dates and prices still matches the
+    start of the prices given, which also catches a history adjusted again for dividends.
+    Comparing them is far cheaper than backtesting them again. Any other history is
+    backtested from scratch and replaces it, except a shorter one, which is backtested from
+    scratch without replacing it. An empty history is never kept.
+
+    backtestCacheLock is only held to look up and publish entries, never while backtesting.
+
+    Args:
+        ticker: stock ticker of the prices
+        prices: adjusted close prices as a pandas Series indexed by date, without gaps
+        rolling_period: rolling period of the bands (at least 2)
+        bandWidth: number of standard deviations between the moving average and the bands
+        dtype: 'float64' or 'float32' for the outputs
+
+    Return:
+        outputs: as returned by BollingerBandCore(), shared with the cache so they must not be modified
+        state: a copy of the core state after the last price
+    """
+
+    key = (ticker, rolling_period, bandWidth, dtype)
+    dates = prices.index.to_numpy()
+    values = prices.to_numpy(dtype = np.float64)
+    n = len(values)
+
+    # an empty history has nothing worth keeping
+    if n == 0:
+        return BollingerBandCore(values, rolling_period, bandWidth, dtype)
+
+    # a kept entry is never changed once in the cache, only replaced, so it is read without the lock
+    with backtestCacheLock:
+        entry = backtestCache.get(key)
+        if entry is not None:
+            backtestCache.move_to_end(key)
+
+    reusable = (entry is not None and entry['length'] <= n
+                and np.array_equal(dates[:entry['length']], entry['dates'])
+                and np.array_equal(values[:entry['length']], entry['values']))
+
+    if entry is not None and not reusable and n < entry['length']:
+        return BollingerBandCore(values, rolling_period, bandWidth, dtype)
+
+    length = entry['length'] if reusable else 0
+    if reusable and n == length:
+        return {name: buffer[:n] for name, buffer in entry['buffers'].items()}, dict(entry['state'])
+
+    # only the prices after the kept ones are backtested, continuing from a copy of the kept state,
+    # outside the lock so that backtests of other tickers and rolling periods run at the same time
+    newOutputs, state = BollingerBandCore(values[length:], rolling_period, bandWidth, dtype,
+                                          dict(entry['state']) if reusable else None)
+
+    # a full backtest becomes the buffers, a longer history than their room gets new buffers of twice the size
+    buffers = entry['buffers'] if reusable else newOutputs
+    if reusable and len(buffers['sma']) < n:
+        capacity = max(n, 2 * length)
+        grown = {}
+        for name, output in newOutputs.items():
+            grown[name] = np.empty(capacity, dtype = output.dtype)
+            grown[name][:length] = buffers[name][:length]
+            grown[name][length:n] = output
+        buffers = grown
+    extendInPlace = reusable and buffers is entry['buffers']
+
+    # copies, so that the history checked next time does not change with the caller's prices
+    keptDates = dates.copy()
+    keptValues = values.copy()
+
+    with backtestCacheLock:
+        # the room after the kept prices can only be written while the entry is still the one in the cache
+        published = backtestCache.get(key) is entry or not extendInPlace
+        if published:
+            if extendInPlace:
+                for name, output in newOutputs.items():
+                    buffers[name][length:n] = output
+            backtestCache[key] = {'length': n, 'state': state, 'buffers': buffers, 'dates': keptDates, 'values': keptValues}
+            backtestCache.move_to_end(key)
+            while len(backtestCache) > BACKTEST_CACHE_SIZE:
+                backtestCache.popitem(last = False)
+
+    # another run replaced the entry meanwhile, its buffers are left alone
+    if not published:
+        return {name: np.concatenate((buffers[name][:length], output)) for name, output in newOutputs.items()}, dict(state)
+
+    return {name: buffer[:n] for name, buffer in buffers.items()}, dict(state)
+
+def BacktestFrame(prices, outputs):
+    """
+    Put the outputs of BollingerBandCore() in one dataframe, built in a single step.
+
+    Args:
+        prices: adjusted close prices as a pandas Series indexed by date
+        outputs: outputs of BollingerBandCore() for those prices
+
+    Return:
+        df: dataframe indexed by date, with the column names of the original pandas backtest
+    """
+
+    return pd.DataFrame({'Adj Close': prices.to_numpy(),
+                         'sma_rolling_period': outputs['sma'],
+                         'BB_upper_band': outputs['upper'],
+                         'BB_lower_band': outputs['lower'],
+                         'signal': outputs['signal'],
+                         'position': outputs['position'],
+                         'Buy & Hold Returns': outputs['buyAndHoldReturns'],
+                         'Bollinger Band Strategy Returns': outputs['bollingerReturns'],
+                         'Buy & Hold Equity': outputs['buyAndHoldEquity'],
+                         'Bollinger Band Strategy Equity': outputs['bollingerEquity']},
+                        index = prices.index)
+
+def BacktestBollingerBandPandas(df, rolling_period):
+    """
+    Run Bollinger Band strategy on a price history with pandas columns, the way it was first written.
+
+    Kept as the reference BacktestBollingerBand() is checked and benchmarked against.
+
+    Args:
+        df: price history with an 'Adj Close' column, e.g. from LoadPriceHistory()
+        rolling_period: intended rolling parameter for Bollinger Band strategy backtest
+
+    Return:
+        df: the price history with indicator, signal, position and daily return columns added
+        bollingerReturn: final equity of the Bollinger Band strategy, rounded to 2 decimals
+        buyAndHoldReturn: final equity of buying and holding the stock, rounded to 2 decimals
+    """
+
+    # create the indicators
+    # sma_rolling_period = Simple Moving Average calculated based on "rolling_period" as its lookback parameter
+    # rolling_period_STD = standard deviations calculated based on prices througout the "rolling_period"
+    # BB_upper_band = 2 standard deviations above sma_rolling_period
+    # BB_lower_band = 2 standard deviations below sma_rolling_period
+    df['sma_rolling_period'] = df['Adj Close'].rolling(window = rolling_period).mean()
+    df['rolling_period_STD'] = df['Adj Close'].rolling(window = rolling_period).std()
+    df['BB_upper_band'] = df['sma_rolling_period'] + 2 * df['rolling_period_STD']
+    df['BB_lower_band'] = df['sma_rolling_period'] - 2 * df['rolling_period_STD']
+
+    # create signals
+
+    # buy signals
+    df['signal'] = np.where((df['Adj Close'] < df['BB_lower_band'])
+                              & (df['Adj Close'].shift(1) > df['BB_lower_band'].shift(1)),
+                              1, 0)
+    #sell signals
+    df['signal'] = np.where((df['Adj Close'] > df['BB_upper_band'])
+                              & (df['Adj Close'].shift(1) < df['BB_upper_band'].shift(1)),
+                              -1, df['signal'])
+
+    # identify positions hold throughout the use of this strategy
+    df['position'] = df['signal'].shift(1) # assume that we only able to get into trade after signal generated
+    df['position'] = df['position'].mask(df['position'] == 0).ffill() # position is closed only when signal for
+    # opposite trading direction is generated
+
+    # calculate and compare returns resulting from:
+    # (1) buy and hold return
+    # (2) return realized through this strategy
+    df['Buy & Hold Returns'] = df['Adj Close'].pct_change() # buy and hold return, pct_change() is percentage change between
+    # current and previous day's price
+    df['Bollinger Band Strategy Returns'] = df['Buy & Hold Returns'] * df['position'] # the return realized through this strategy
+
+    # get return values from respective approach
+    # df['Buy & Hold Returns'] and df['Bollinger Band Strategy Returns'] refer to return on that day itself, in order to get equity curve we
+    # need to plus one on each of the returns before calculate cumulative product.
+    # Use vectorized operations to carry out calculation of cumulative product
+    buyAndHoldReturn = np.round((1 + df['Buy & Hold Returns']).cumprod().iloc[-1],2)
+    bollingerReturn = np.round((1 + df['Bollinger Band Strategy Returns']).cumprod().iloc[-1],2)
+
+    return df, bollingerReturn, buyAndHoldReturn
+
+def ExecuteBollingerBandStrategy(ticker, startDate, endDate, rolling_period, figure = None):
+    """
+    Execute Bollinger Band strategy and compare with buy and hold returns of the stock.
+
+    The function will run Bollinger Band strategy on given ticker based on given
+    start date and end date. It will use a given parameter as rolling period for
+    the Bollinger Band strategy. Finally, the returns from speculating the stock
+    using Bollinger Band is compared with returns result from buying and holding
+    of the stock. It aims to give general sense of returns from different investment
+    approaches.
+
+    Args:
+        ticker: stock ticker.
+        startDate: intended start date for Bollinger Band strategy backtest
+        endDate: intended end date for Bollinger Band strategy backtest
+        rolling_period: intended rolling parameter for Bollinger Band strategy backtest
+        figure: matplotlib Figure to draw the equity curves into, a new one if not given
+
+    Return:
+        figure: the Figure holding the equity curves
+    """
     
-    unavailableYear = [] # build list to record year with unavailable data
+    df = LoadPriceHistory(ticker, startDate, endDate) # get Open, High, Low, CLose, Adj Close and Volume data, store into dataframe,
+    # only the dates not yet in the local price store are downloaded
+
+    df, bollingerReturn, buyAndHoldReturn = BacktestBollingerBand(df, rolling_period, ticker = ticker)
+
+    if figure is None:
+        figure = mplFigure.Figure(figsize = (6,4))
+    DrawEquityCurves(figure, df, bollingerReturn, buyAndHoldReturn)
+
+    return figure
+
+def DecimateMinMax(values, buckets):
+    """
+    Choose the points of a series to plot so that its shape survives at a given width.
+
+    The series is cut into buckets of consecutive points and only the lowest and highest
+    point of every bucket are kept, with the first and last point of the series. With one
+    bucket per pixel column the line drawn looks the same as with every point, while the
+    number of points drawn no longer depends on the length of the series.
+
+    Args:
+        values: values of the series in plotting order
+        buckets: number of buckets, usually the width of the plot in pixels
+
+    Return:
+        positions: sorted positions of the points to keep, every position if the series is short enough
+    """
+
+    values = np.asarray(values)
+    n = len(values)
+    if n <= 2 * buckets + 2:
+        return np.arange(n)
+
+    # pad the last bucket with its last value so that every bucket has the same size
+    size = -(-n // buckets)
+    padded = np.pad(values, (0, size * buckets - n), mode = 'edge').reshape(buckets, size)
+    starts = np.arange(0, size * buckets, size)
+    lowest = starts + np.argmin(padded, axis = 1)
+    highest = starts + np.argmax(padded, axis = 1)
+
+    return np.unique(np.minimum(np.concatenate(([0, n - 1], lowest, highest)), n - 1))
+
+def DrawEquityCurves(figure, df, bollingerReturn, buyAndHoldReturn, decimate = True):
+    """
+    Draw the equity curves of a backtest from BacktestBollingerBand() into a figure.
+
+    The first call adds the axes and lines to the figure, later calls only replace the
+    data of those lines, so the same figure can be reused run after run without
+    building new artists. The Figure is not managed by pyplot, nothing is written to
+    disk and nothing leaks when it is redrawn.
+
+    Long histories are thinned with DecimateMinMax() to about two points per pixel column
+    of the figure, so the time to draw stays the same whatever the length of the history.
+
+    Args:
+        figure: matplotlib Figure to draw into
+        df: backtest returned by BacktestBollingerBand()
+        bollingerReturn: final equity of the Bollinger Band strategy
+        buyAndHoldReturn: final equity of buying and holding the stock
+        decimate: False to draw every point
+    """
+
+    columns = ['Buy & Hold Returns','Bollinger Band Strategy Returns']
+    pixelColumns = int(figure.get_figwidth() * figure.dpi)
+
+    curves = []
+    for column in ['Buy & Hold Equity','Bollinger Band Strategy Equity']:
+        values = df[column].to_numpy()
+        positions = DecimateMinMax(values, pixelColumns) if decimate else np.arange(len(values))
+        curves.append((df.index[positions], values[positions]))
+
+    if len(figure.axes) == 0:
+        axes = figure.add_subplot(1, 1, 1)
+        axes.grid(True)
+        for column, (dates, values) in zip(columns, curves):
+            axes.plot(dates, values, label = column)
+        axes.legend()
+        figure.autofmt_xdate()
+    else:
+        axes = figure.axes[0]
+        for line, (dates, values) in zip(axes.lines, curves):
+            line.set_data(dates, values)
+        axes.relim()
+        axes.autoscale_view()
+
+    axes.set_title('Bollinger Band Strategy Return: {}  Buy and Hold Return: {}'.format(bollingerReturn,buyAndHoldReturn))
+
+def RenderChartPng(figure):
+    """
+    Render a figure into PNG bytes in memory, for use without the GUI.
+
+    Args:
+        figure: matplotlib Figure to render
+
+    Return:
+        the PNG image as bytes
+    """
+
+    buffer = io.BytesIO()
+    backendAgg.FigureCanvasAgg(figure).print_png(buffer)
+
+    return buffer.getvalue()
+
+def ComputeBollingerSweep(prices, rollingPeriods, bandWidths):
+    """
+    Backtest the Bollinger Band strategy for a whole grid of rolling periods and band widths at once.
+
+    The rolling means and standard deviations of every rolling period are taken from one
+    pass of cumulative sums over the prices, so the cost of an extra grid point is a few
+    array operations instead of a full rerun of ExecuteBollingerBandStrategy(). The trading
+    rules are the same: buy when the price crosses below the lower band, sell when it
+    crosses above the upper band, enter on the next day and hold until the opposite signal.
+
+    Args:
+        prices: adjusted close prices in date order
+        rollingPeriods: rolling periods to test (each at least 2)
+        bandWidths: number of standard deviations between the moving average and the bands
+
+    Return:
+        A dictionary of NumPy arrays. 'signal' and 'position' have one row per grid point
+        (rolling period major, band width minor) and one column per day, 'bollingerReturn'
+        has one row per rolling period and one column per band width, 'buyAndHoldReturn'
+        is the single buy and hold return of the prices. Without prices every return is 1.
+
+    Raises:
+        ValueError: if a rolling period is smaller than 2
+    """
+
+    prices = np.asarray(prices, dtype = np.float64)
+    rollingPeriods = np.asarray(rollingPeriods, dtype = np.int64)
+    bandWidths = np.asarray(bandWidths, dtype = np.float64)
+
+    if rollingPeriods.min() < 2:
+        raise ValueError('rolling period must be at least 2')
+
+    n = len(prices)
+    pairs = len(rollingPeriods) * len(bandWidths)
+    days = np.arange(n)
+
+    # cumulative sums of the prices and squared prices, measured from the first price so that
+    # the differences taken below do not lose precision, as BollingerBandCore() does over its
+    # first BAND_ANCHOR_PERIOD prices, which covers any daily history
+    anchor = prices[0] if n > 0 else 0.0
+    deviation = prices - anchor
+    cumSum = np.cumsum(np.concatenate(([0.0], deviation)))
+    cumSumSq = np.cumsum(np.concatenate(([0.0], deviation * deviation)))
+
+    # window sums of every rolling period (rows) ending on every day (columns)
+    windowEnd = days + 1
+    windowStart = windowEnd[np.newaxis, :] - rollingPeriods[:, np.newaxis]
+    incomplete = windowStart < 0
+    windowStart[incomplete] = 0
+    windowSum = cumSum[windowEnd] - cumSum[windowStart]
+    windowSumSq = cumSumSq[windowEnd] - cumSumSq[windowStart]
+
+    # rolling mean and sample standard deviation, same as rolling().mean() and rolling().std()
+    window = rollingPeriods[:, np.newaxis].astype(np.float64)
+    sma = anchor + windowSum / window
+    variance = (windowSumSq - windowSum * windowSum / window) / (window - 1)
+    np.maximum(variance, 0, out = variance)
+    std = np.sqrt(variance)
+    sma[incomplete] = np.nan
+    std[incomplete] = np.nan
+
+    # bands of every (rolling period, band width) pair, one row per pair
+    width = bandWidths[np.newaxis, :, np.newaxis]
+    upperBand = (sma[:, np.newaxis, :] + width * std[:, np.newaxis, :]).reshape(pairs, n)
+    lowerBand = (sma[:, np.newaxis, :] - width * std[:, np.newaxis, :]).reshape(pairs, n)
+
+    # buy and sell signals, comparisons against the missing bands of the first days are False
+    today = prices[np.newaxis, 1:]
+    yesterday = prices[np.newaxis, :-1]
+    buy = (today < lowerBand[:, 1:]) & (yesterday > lowerBand[:, :-1])
+    sell = (today > upperBand[:, 1:]) & (yesterday < upperBand[:, :-1])
+    signal = np.zeros(upperBand.shape, dtype = np.int8)
+    signal[:, 1:] = np.where(sell, -1, np.where(buy, 1, 0))
+
+    # carry the latest signal forward and trade one day after it, as in ExecuteBollingerBandStrategy()
+    latestSignalDay = np.maximum.accumulate(np.where(signal != 0, days.astype(np.int32), 0), axis = 1)
+    carried = np.take_along_axis(signal, latestSignalDay, axis = 1)
+    position = np.zeros(signal.shape, dtype = np.int8)
+    position[:, 1:] = carried[:, :-1]
+
+    # daily returns, the first day has no return
+    dailyReturns = np.zeros(n)
+    dailyReturns[1:] = prices[1:] / prices[:-1] - 1
+    bollingerReturn = np.prod(1 + dailyReturns * position, axis = 1)
+    buyAndHoldReturn = np.prod(1 + dailyReturns)
+
+    return {'signal': signal,
+            'position': position,
+            'bollingerReturn': bollingerReturn.reshape(len(rollingPeriods), len(bandWidths)),
+            'buyAndHoldReturn': buyAndHoldReturn}
+
+def SweepBollingerBandStrategy(ticker, startDate, endDate, rollingPeriods, bandWidths = (2,)):
+    """
+    Rank every (rolling period, band width) pair of the Bollinger Band strategy on a ticker.
+
+    Args:
+        ticker: stock ticker.
+        startDate: intended start date for the backtest
+        endDate: intended end date for the backtest
+        rollingPeriods: rolling periods to test
+        bandWidths: numbers of standard deviations to test
+
+    Return:
+        results: table of every pair with its strategy and buy and hold return, best pair first
+    """
+
+    df = LoadPriceHistory(ticker, startDate, endDate)
+    prices = df['Adj Close'].dropna().to_numpy()
+
+    sweep = ComputeBollingerSweep(prices, rollingPeriods, bandWidths)
+
+    grid = np.meshgrid(rollingPeriods, bandWidths, indexing = 'ij')
+    results = pd.DataFrame({'Rolling Period': grid[0].ravel(),
+                            'Band Width': grid[1].ravel(),
+                            'Bollinger Band Strategy Return': sweep['bollingerReturn'].ravel(),
+                            'Buy and Hold Return': sweep['buyAndHoldReturn']})
+    results = results.sort_values('Bollinger Band Strategy Return', ascending = False, kind = 'stable')
+    results.index = np.arange(1, len(results) + 1) # rank starts from 1
+
+    return results
+
+#---------------end of functions for Bollinger Band Strategy Output------------------
+
+#---------------start of functions for streaming Bollinger Band------------------
+
+def NewStreamState(rolling_period, bandWidth = 2):
+    """
+    Create the state of the streaming Bollinger Band engine for one symbol.
+
+    The state only holds running sums, the last rolling_period + 1 of their values and the
+    last rolling_period prices, so every update costs the same whatever the length of the
+    session.
+
+    Args:
+        rolling_period: rolling period of the bands (at least 2)
+        bandWidth: number of standard deviations between the moving average and the bands
+
+    Return:
+        state: dictionary to pass to UpdateStreamState() with every new price
+
+    Raises:
+        ValueError: if rolling_period is smaller than 2
+    """
+
+    if rolling_period < 2:
+        raise ValueError('rolling period must be at least 2')
+
+    return {'window': rolling_period,
+            'bandWidth': bandWidth,
+            'bars': 0,
+            'anchor': None, # price the sums are measured from, moved every BAND_ANCHOR_PERIOD prices as in BollingerBandCore()
+            'cumSum': 0.0,
+            'cumSumSq': 0.0,
+            'cumSums': collections.deque([0.0], maxlen = rolling_period + 1),
+            'cumSumSqs': collections.deque([0.0], maxlen = rolling_period + 1),
+            'prices': collections.deque(maxlen = rolling_period), # ring buffer the sums are rebuilt from at every new anchor
+            'previousPrice': math.nan,
+            'previousUpper': math.nan,
+            'previousLower': math.nan,
+            'lastSignal': 0}
+
+def UpdateStreamState(state, price):
+    """
+    Feed one new price to the streaming Bollinger Band engine.
+
+    The bands are computed with exactly the same floating point operations as
+    BollingerBandCore(), including the new anchor of the running sums every
+    BAND_ANCHOR_PERIOD prices, so replaying a history tick by tick gives the same
+    signals and positions as the batch backtest, bit for bit, and the bands keep
+    their precision however long the session runs.
+
+    Args:
+        state: state of the symbol, see NewStreamState()
+        price: new adjusted close price
+
+    Return:
+        signal: 1 if the price just crossed below the lower band (buy), -1 if it just
+            crossed above the upper band (sell), 0 otherwise
+        position: position held over this bar, i.e. the latest non zero signal before it
+    """
+
+    cumSums = state['cumSums']
+    cumSumSqs = state['cumSumSqs']
+
+    # new anchor: the running sums of the prices still inside the window are rebuilt from it
+    if state['bars'] % BAND_ANCHOR_PERIOD == 0:
+        state['anchor'] = price
+        cumSum = 0.0
+        cumSumSq = 0.0
+        cumSums.clear()
+        cumSumSqs.clear()
+        cumSums.append(cumSum)
+        cumSumSqs.append(cumSumSq)
+        for windowPrice in state['prices']:
+            deviation = windowPrice - price
+            cumSum = cumSum + deviation
+            cumSumSq = cumSumSq + deviation * deviation
+            cumSums.append(cumSum)
+            cumSumSqs.append(cumSumSq)
+        state['cumSum'] = cumSum
+        state['cumSumSq'] = cumSumSq
+    anchor = state['anchor']
+
+    deviation = price - anchor
+    cumSum = state['cumSum'] + deviation
+    cumSumSq = state['cumSumSq'] + deviation * deviation
+    state['cumSum'] = cumSum
+    state['cumSumSq'] = cumSumSq
+    cumSums.append(cumSum)
+    cumSumSqs.append(cumSumSq)
+    state['prices'].append(price)
+    state['bars'] += 1
+
+    position = state['lastSignal']
+    signal = 0
+    window = state['window']
+
+    # the bands exist once a full window of prices has been seen
+    if len(cumSums) > window:
+        windowSum = cumSum - cumSums[0]
+        windowSumSq = cumSumSq - cumSumSqs[0]
+        sma = anchor + windowSum / window
+        variance = (windowSumSq - windowSum * windowSum / window) / (window - 1)
+        std = math.sqrt(variance) if variance > 0 else 0.0
+        upper = sma + state['bandWidth'] * std
+        lower = sma - state['bandWidth'] * std
+
+        # comparisons with the missing bands of the previous price are False, as in the batch backtest
+        previousPrice = state['previousPrice']
+        if price > upper and previousPrice < state['previousUpper']:
+            signal = -1
+        elif price < lower and previousPrice > state['previousLower']:
+            signal = 1
+
+        state['previousUpper'] = upper
+        state['previousLower'] = lower
+        if signal != 0:
+            state['lastSignal'] = signal
+
+    state['previousPrice'] = price
+
+    return signal, position
+
+def OnTick(states, symbol, price, rolling_period = 20, bandWidth = 2):
+    """
+    Feed a new price of any symbol to the streaming engine, creating the symbol's state on its first tick.
+
+    Args:
+        states: dictionary of symbol -> state, shared by all calls
+        symbol: symbol the price belongs to
+        price: new adjusted close price
+        rolling_period: rolling period used for a new symbol
+        bandWidth: band width used for a new symbol
+
+    Return:
+        signal, position: as returned by UpdateStreamState()
+    """
+
+    state = states.get(symbol)
+    if state is None:
+        state = states[symbol] = NewStreamState(rolling_period, bandWidth)
+
+    return UpdateStreamState(state, price)
+
+def ReplayStream(prices, rolling_period, bandWidth = 2):
+    """
+    Replay a price history through the streaming engine.
+
+    Args:
+        prices: adjusted close prices in date order
+        rolling_period: rolling period of the bands
+        bandWidth: number of standard deviations between the moving average and the bands
+
+    Return:
+        signal, position: NumPy arrays with one value per price
+    """
+
+    state = NewStreamState(rolling_period, bandWidth)
+    signal = np.zeros(len(prices), dtype = np.int8)
+    position = np.zeros(len(prices), dtype = np.int8)
+
+    for i, price in enumerate(np.asarray(prices, dtype = np.float64).tolist()):
+        signal[i], position[i] = UpdateStreamState(state, price)
+
+    return signal, position
+
+#---------------end of functions for streaming Bollinger Band------------------
+
+#---------------start of functions for out-of-core backtest------------------
+
+def OpenStoredColumn(ticker, column, storeDir = PRICE_STORE_DIR):
+    """
+    Memory-map one column of a ticker in the price store without reading it into memory.
+
+    Args:
+        ticker: stock ticker.
+        column: column name, e.g. 'Adj Close' or 'Date'
+        storeDir: folder of the price store
+
+    Return:
+        read only NumPy memmap of the column
+    """
+
+    return np.load(os.path.join(storeDir, ticker, column + '.npy'), mmap_mode = 'r')
+
+def BacktestOutOfCore(ticker, rolling_period, bandWidth = 2, storeDir = PRICE_STORE_DIR, chunkSize = 1000000,
+                      outputDir = None, dtype = 'float64'):
+    """
+    Backtest the Bollinger Band strategy on a price history too long to hold in memory.
+
+    The 'Adj Close' column of the price store is memory-mapped and fed to
+    BollingerBandCore() chunk by chunk, passing its state from one chunk to the next, so
+    memory use depends on chunkSize only and the results are bit for bit those of one
+    in-memory run. The prices must not contain gaps (NaN).
+
+    Args:
+        ticker: stock ticker, as stored by WriteStoredPrices() or WriteSyntheticColumns()
+        rolling_period: rolling period of the bands
+        bandWidth: number of standard deviations between the moving average and the bands
+        storeDir: folder of the price store
+        chunkSize: number of prices read and backtested at a time
+        outputDir: folder to write every output of BollingerBandCore() to as a memory-mapped .npy column, not written if not given
+        dtype: 'float64' or 'float32' for the output columns
+
+    Return:
+        summary: dictionary with the number of 'bars' and the final 'bollingerReturn' and 'buyAndHoldReturn'
+    """
+
+    prices = OpenStoredColumn(ticker, 'Adj Close', storeDir)
+    outputColumns = None
+    state = None
+
+    for start in range(0, len(prices), chunkSize):
+        outputs, state = BollingerBandCore(prices[start:start + chunkSize], rolling_period, bandWidth, dtype, state)
+
+        if outputDir is not None:
+            if outputColumns is None:
+                os.makedirs(outputDir, exist_ok = True)
+                outputColumns = {}
+                for name, values in outputs.items():
+                    outputColumns[name] = np.lib.format.open_memmap(os.path.join(outputDir, name + '.npy'), mode = 'w+',
+                                                                    dtype = values.dtype, shape = (len(prices),))
+            for name, values in outputs.items():
+                outputColumns[name][start:start + len(values)] = values
+
+    if outputColumns is not None:
+        for column in outputColumns.values():
+            column.flush()
+
+    if state is None:
+        return {'bars': 0, 'bollingerReturn': 1.0, 'buyAndHoldReturn': 1.0}
+
+    return {'bars': state['bars'],
+            'bollingerReturn': state['bollingerEquity'],
+            'buyAndHoldReturn': state['buyAndHoldEquity']}
+
+def WriteSyntheticColumns(ticker, bars, storeDir = PRICE_STORE_DIR, chunkSize = 1000000, seed = 0):
+    """
+    Write a random walk of minute bars into the price store chunk by chunk, without holding it in memory.
+
+    Args:
+        ticker: name to store the prices under
+        bars: number of minute bars
+        storeDir: folder of the price store
+        chunkSize: number of bars generated at a time
+        seed: seed of the random generator
+    """
+
+    folder = os.path.join(storeDir, ticker)
+    os.makedirs(folder, exist_ok = True)
+    prices = np.lib.format.open_memmap(os.path.join(folder, 'Adj Close.npy'), mode = 'w+', dtype = np.float64, shape = (bars,))
+    dates = np.lib.format.open_memmap(os.path.join(folder, 'Date.npy'), mode = 'w+', dtype = 'datetime64[ns]', shape = (bars,))
+
+    generator = np.random.default_rng(seed)
+    firstDate = np.datetime64('2000-01-03T00:00', 'ns')
+    logPrice = np.log(100)
+    for start in range(0, bars, chunkSize):
+        count = min(chunkSize, bars - start)
+        logPrices = logPrice + np.cumsum(generator.normal(0, 0.001, count))
+        prices[start:start + count] = np.exp(logPrices)
+        dates[start:start + count] = firstDate + np.arange(start, start + count).astype('timedelta64[m]')
+        logPrice = logPrices[-1]
+    prices.flush()
+    dates.flush()
+
+    meta = {'columns': ['Adj Close'], 'start': str(pd.Timestamp(dates[0])), 'end': str(pd.Timestamp(dates[-1]) + pd.Timedelta(minutes = 1))}
+    with open(os.path.join(folder, 'meta.json'), 'w') as metaFile:
+        json.dump(meta, metaFile)
+
+#---------------end of functions for out-of-core backtest------------------
+
+#---------------start of functions for portfolio backtest------------------
+
+def LoadPortfolioPrices(tickers, startDate, endDate):
+    """
+    Align the price histories of several tickers into one table of dates by tickers.
+
+    Only the dates on which every ticker has a price are kept, so each row can be traded
+    across the whole portfolio.
+
+    Args:
+        tickers: stock tickers.
+        startDate: intended start date for the backtest
+        endDate: intended end date for the backtest
+
+    Return:
+        prices: dataframe of adjusted close prices indexed by date with one column per ticker
+
+    Raises:
+        ValueError: if a ticker has no price between the dates, or no date has a price of every ticker
+    """
+
+    columns = [LoadPriceHistory(ticker, startDate, endDate)['Adj Close'].dropna().rename(ticker) for ticker in tickers]
+
+    # one ticker without prices would leave no date to trade on
+    missing = [column.name for column in columns if len(column) == 0]
+    if missing:
+        raise ValueError('no prices between {} and {} for {}'.format(startDate, endDate, ', '.join(missing)))
+
+    prices = pd.concat(columns, axis = 1, join = 'inner')
+    if len(prices) == 0:
+        raise ValueError('no date between {} and {} has a price for every one of {}'.format(startDate, endDate, ', '.join(tickers)))
+
+    return prices
+
+def ComputePortfolioBacktest(prices, rolling_period, bandWidth = 2, weights = None):
+    """
+    Backtest the Bollinger Band strategy on every asset of a portfolio at once.
+
+    The prices form one matrix with the dates on axis 0 and the assets on axis 1, and the
+    bands, signals, positions and equity curves of all assets come from the same array
+    operations along axis 0, with the floating point steps of BollingerBandCore(). Each
+    asset starts with its weight of the capital and is never rebalanced, for the strategy
+    as for buy and hold.
+
+    Args:
+        prices: adjusted close prices, one row per date and one column per asset, without gaps
+        rolling_period: rolling period of the bands (at least 2)
+        bandWidth: number of standard deviations between the moving average and the bands
+        weights: share of the capital of every asset, equal weights if not given
+
+    Return:
+        A dictionary of NumPy arrays. 'signal', 'position', 'buyAndHoldEquity' and
+        'bollingerEquity' have one row per date and one column per asset,
+        'portfolioBuyAndHoldEquity' and 'portfolioBollingerEquity' one value per date,
+        'buyAndHoldReturn' and 'bollingerReturn' the final equity of every asset, 1 when
+        there are no prices. Fewer dates than rolling_period give no bands and no trades.
+
+    Raises:
+        ValueError: if rolling_period is smaller than 2 or the weights do not match the assets
+    """
+
+    if rolling_period < 2:
+        raise ValueError('rolling period must be at least 2')
+
+    prices = np.asarray(prices, dtype = np.float64)
+    days, assets = prices.shape
+    if weights is None:
+        weights = np.full(assets, 1 / assets)
+    else:
+        weights = np.asarray(weights, dtype = np.float64)
+        if weights.shape != (assets,) or weights.sum() <= 0:
+            raise ValueError('expected one positive weight per asset')
+        weights = weights / weights.sum()
+
+    # running sums measured from the first price of every asset, as BollingerBandCore() does over
+    # its first BAND_ANCHOR_PERIOD prices, which covers any daily history
+    anchor = prices[0] if days > 0 else np.zeros(assets)
+    deviation = prices - anchor
+    cumSum = np.zeros((days + 1, assets))
+    cumSumSq = np.zeros((days + 1, assets))
+    np.cumsum(deviation, axis = 0, out = cumSum[1:])
+    np.cumsum(deviation * deviation, axis = 0, out = cumSumSq[1:])
+
+    windowSum = np.full((days, assets), np.nan)
+    windowSumSq = np.full((days, assets), np.nan)
+    if days >= rolling_period:
+        windowSum[rolling_period - 1:] = cumSum[rolling_period:] - cumSum[:days + 1 - rolling_period]
+        windowSumSq[rolling_period - 1:] = cumSumSq[rolling_period:] - cumSumSq[:days + 1 - rolling_period]
+
+    sma = anchor + windowSum / rolling_period
+    variance = (windowSumSq - windowSum * windowSum / rolling_period) / (rolling_period - 1)
+    np.maximum(variance, 0, out = variance)
+    std = bandWidth * np.sqrt(variance)
+    upperBand = sma + std
+    lowerBand = sma - std
+
+    # buy and sell signals, comparisons against the missing bands of the first days are False
+    buy = (prices[1:] < lowerBand[1:]) & (prices[:-1] > lowerBand[:-1])
+    sell = (prices[1:] > upperBand[1:]) & (prices[:-1] < upperBand[:-1])
+    signal = np.zeros((days, assets), dtype = np.int8)
+    signal[1:] = np.where(sell, -1, np.where(buy, 1, 0))
+
+    # carry the latest signal forward along the dates and trade one day after it
+    latestSignalDay = np.maximum.accumulate(np.where(signal != 0, np.arange(days, dtype = np.int32)[:, np.newaxis], 0), axis = 0)
+    carried = np.take_along_axis(signal, latestSignalDay, axis = 0)
+    position = np.zeros((days, assets), dtype = np.int8)
+    position[1:] = carried[:-1]
+
+    # daily returns and equity of every asset, the first day has no return
+    dailyReturns = np.zeros((days, assets))
+    dailyReturns[1:] = prices[1:] / prices[:-1] - 1
+    buyAndHoldEquity = np.cumprod(1 + dailyReturns, axis = 0)
+    bollingerEquity = np.cumprod(1 + dailyReturns * position, axis = 0)
+
+    return {'signal': signal,
+            'position': position,
+            'buyAndHoldEquity': buyAndHoldEquity,
+            'bollingerEquity': bollingerEquity,
+            'portfolioBuyAndHoldEquity': buyAndHoldEquity @ weights,
+            'portfolioBollingerEquity': bollingerEquity @ weights,
+            'buyAndHoldReturn': buyAndHoldEquity[-1] if days > 0 else np.ones(assets),
+            'bollingerReturn': bollingerEquity[-1] if days > 0 else np.ones(assets)}
+
+def BacktestPortfolio(tickers, startDate, endDate, rolling_period, weights = None):
+    """
+    Run Bollinger Band strategy on a portfolio of tickers and compare with buy and hold returns.
+
+    Args:
+        tickers: stock tickers.
+        startDate: intended start date for the backtest
+        endDate: intended end date for the backtest
+        rolling_period: intended rolling parameter for Bollinger Band strategy backtest
+        weights: share of the capital of every ticker, equal weights if not given
+
+    Return:
+        results: table of the weight, strategy and buy and hold return of every ticker, with a last 'Portfolio' row
+        equity: dataframe indexed by date with the 'Buy & Hold Equity' and 'Bollinger Band Strategy Equity' of the portfolio
+    """
+
+    prices = LoadPortfolioPrices(tickers, startDate, endDate)
+    backtest = ComputePortfolioBacktest(prices.to_numpy(), rolling_period, weights = weights)
+
+    if weights is None:
+        weights = np.full(len(tickers), 1 / len(tickers))
+    weights = np.asarray(weights, dtype = np.float64) / np.sum(weights)
+
+    results = pd.DataFrame({'Weight': weights,
+                            'Bollinger Band Strategy Return': backtest['bollingerReturn'],
+                            'Buy and Hold Return': backtest['buyAndHoldReturn']},
+                           index = pd.Index(prices.columns, name = 'Ticker'))
+    results.loc['Portfolio'] = [1.0, backtest['portfolioBollingerEquity'][-1], backtest['portfolioBuyAndHoldEquity'][-1]]
+
+    equity = pd.DataFrame({'Buy & Hold Equity': backtest['portfolioBuyAndHoldEquity'],
+                           'Bollinger Band Strategy Equity': backtest['portfolioBollingerEquity']},
+                          index = prices.index)
+
+    return results, equity
+
+#---------------end of functions for portfolio backtest------------------
+
+#---------------start of functions for walk-forward analysis------------------
+
+def WalkForwardFolds(days, trainDays, testDays):
+    """
+    Split a price history into rolling train and test folds.
+
+    Every test fold starts where its train fold ends and the folds move forward by the
+    length of a test fold, so the test folds follow each other without overlap.
+
+    Args:
+        days: number of prices
+        trainDays: number of prices in every train fold
+        testDays: number of prices in every test fold, the last one may be shorter
+
+    Return:
+        folds: list of (trainStart, trainEnd, testEnd) positions, the test fold is trainEnd to testEnd
+    """
+
+    folds = []
+    for trainStart in range(0, max(days - trainDays, 0), testDays):
+        trainEnd = trainStart + trainDays
+        folds.append((trainStart, trainEnd, min(trainEnd + testDays, days)))
+
+    return folds
+
+def EvaluateWalkForwardFold(job):
+    """
+    Choose the best rolling period on a train fold and backtest it on the following test fold.
+
+    The rolling periods are compared with ComputeBollingerSweep() on the train prices. The
+    test backtest runs BollingerBandCore() over the last train prices first so that the
+    bands are complete on the first test day, then starts the test fold without a position.
+
+    Args:
+        job: (prices, trainDays, rollingPeriods, bandWidth) tuple, prices holding the train fold followed by the test fold
+
+    Return:
+        fold: dictionary with the chosen 'rollingPeriod', its 'inSampleReturn' and the daily
+            'bollingerReturns' and 'buyAndHoldReturns' of the test fold
+    """
+
+    prices, trainDays, rollingPeriods, bandWidth = job
+
+    sweep = ComputeBollingerSweep(prices[:trainDays], rollingPeriods, [bandWidth])
+    best = int(np.argmax(sweep['bollingerReturn'][:, 0]))
+    rolling_period = int(rollingPeriods[best])
+
+    state = BollingerBandCore(prices[trainDays - rolling_period:trainDays], rolling_period, bandWidth)[1]
+    state['lastSignal'] = 0
+    state['buyAndHoldEquity'] = 1.0
+    state['bollingerEquity'] = 1.0
+    outputs = BollingerBandCore(prices[trainDays:], rolling_period, bandWidth, state = state)[0]
+
+    return {'rollingPeriod': rolling_period,
+            'inSampleReturn': sweep['bollingerReturn'][best, 0],
+            'bollingerReturns': outputs['bollingerReturns'],
+            'buyAndHoldReturns': outputs['buyAndHoldReturns']}
+
+def WalkForwardAnalysis(prices, rollingPeriods, trainDays = 504, testDays = 126, bandWidth = 2, processes = None):
+    """
+    Walk-forward analysis of the rolling period of the Bollinger Band strategy.
+
+    The best rolling period of every train fold is backtested on the test fold after it,
+    and the test returns are chained into one out-of-sample equity curve, which does not
+    benefit from choosing the rolling period with hindsight. The folds are evaluated in
+    parallel over a process pool.
+
+    Args:
+        prices: adjusted close prices in date order
+        rollingPeriods: rolling periods to choose from (each at least 2 and at most trainDays)
+        trainDays: number of prices in every train fold
+        testDays: number of prices in every test fold
+        bandWidth: number of standard deviations between the moving average and the bands
+        processes: number of worker processes, defaults to the number of CPUs, 1 to evaluate the folds in this process
+
+    Return:
+        folds: table of every fold with its positions, chosen rolling period and in-sample and out-of-sample returns
+        equity: dictionary with the out-of-sample 'bollingerEquity' and 'buyAndHoldEquity' of every test day
+
+    Raises:
+        ValueError: if a rolling period does not fit in a train fold or there is no fold
+    """
+
+    prices = np.asarray(prices, dtype = np.float64)
+    rollingPeriods = np.asarray(rollingPeriods, dtype = np.int64)
+    if rollingPeriods.min() < 2 or rollingPeriods.max() > trainDays:
+        raise ValueError('rolling periods must be between 2 and the train fold length')
+
+    positions = WalkForwardFolds(len(prices), trainDays, testDays)
+    if len(positions) == 0:
+        raise ValueError('not enough prices for one train and test fold')
+    jobs = [(prices[trainStart:testEnd], trainDays, rollingPeriods, bandWidth) for trainStart, trainEnd, testEnd in positions]
+
+    if processes == 1:
+        results = [EvaluateWalkForwardFold(job) for job in jobs]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers = processes) as executor:
+            results = list(executor.map(EvaluateWalkForwardFold, jobs))
+
+    folds = pd.DataFrame({'Train Start': [fold[0] for fold in positions],
+                          'Test Start': [fold[1] for fold in positions],
+                          'Test End': [fold[2] for fold in positions],
+                          'Rolling Period': [result['rollingPeriod'] for result in results],
+                          'In-Sample Return': [result['inSampleReturn'] for result in results],
+                          'Out-of-Sample Return': [np.prod(1 + result['bollingerReturns']) for result in results],
+                          'Buy and Hold Return': [np.prod(1 + result['buyAndHoldReturns']) for result in results]})
+    folds.index = np.arange(1, len(folds) + 1) # fold number starts from 1
+
+    equity = {'bollingerEquity': np.cumprod(1 + np.concatenate([result['bollingerReturns'] for result in results])),
+              'buyAndHoldEquity': np.cumprod(1 + np.concatenate([result['buyAndHoldReturns'] for result in results]))}
+
+    return folds, equity
+
+def WalkForwardBollingerBand(ticker, startDate, endDate, rollingPeriods, trainDays = 504, testDays = 126, processes = None):
+    """
+    Walk-forward analysis of the rolling period of the Bollinger Band strategy on a ticker.
+
+    Args:
+        ticker: stock ticker.
+        startDate: intended start date for the analysis
+        endDate: intended end date for the analysis
+        rollingPeriods: rolling periods to choose from
+        trainDays: number of trading days in every train fold
+        testDays: number of trading days in every test fold
+        processes: number of worker processes, defaults to the number of CPUs
+
+    Return:
+        folds: table of every fold with its dates, chosen rolling period and in-sample and out-of-sample returns
+        equity: dataframe indexed by date with the out-of-sample 'Buy & Hold Equity' and 'Bollinger Band Strategy Equity'
+    """
+
+    prices = LoadPriceHistory(ticker, startDate, endDate)['Adj Close'].dropna()
+    folds, equity = WalkForwardAnalysis(prices.to_numpy(), rollingPeriods, trainDays, testDays, processes = processes)
+
+    dates = prices.index
+    for column in ['Train Start', 'Test Start']:
+        folds[column] = dates[folds[column]]
+    folds['Test End'] = dates[folds['Test End'] - 1] # last day of the test fold
+
+    equity = pd.DataFrame({'Buy & Hold Equity': equity['buyAndHoldEquity'],
+                           'Bollinger Band Strategy Equity': equity['bollingerEquity']},
+                          index = dates[trainDays:trainDays + len(equity['bollingerEquity'])])
+
+    return folds, equity
+
+#---------------end of functions for walk-forward analysis------------------
+
+#---------------start of functions for significance test------------------
+
+def BootstrapBatch(job):
+    """
+    Draw one batch of resamples for BootstrapSignificance().
+
+    Args:
+        job: (kind, dailyReturns, positions, count, blockSize, seed) tuple, kind is 'block' or 'entry'
+
+    Return:
+        outcomes: for 'block', the Bollinger Band minus buy and hold final return of every
+            block bootstrap resample; for 'entry', the Bollinger Band final return of every
+            random-entry shuffle
+    """
+
+    kind, dailyReturns, positions, count, blockSize, seed = job
+    generator = np.random.default_rng(seed)
+    n = len(dailyReturns)
+
+    if kind == 'block':
+        # days drawn in blocks of consecutive days, keeping the strategy and the market of a day together
+        blocks = -(-n // blockSize)
+        starts = generator.integers(0, n - blockSize + 1, size = (count, blocks, 1))
+        days = (starts + np.arange(blockSize)).reshape(count, -1)[:, :n]
+        marketReturns = dailyReturns[days]
+        bollingerReturn = np.prod(1 + marketReturns * positions[days], axis = 1)
+        buyAndHoldReturn = np.prod(1 + marketReturns, axis = 1)
+        return bollingerReturn - buyAndHoldReturn
+
+    # the positions shifted round by a random number of days, same trades at random entry dates
+    shifts = generator.integers(1, n, size = (count, 1))
+    days = (shifts + np.arange(n)) % n
+
+    return np.prod(1 + dailyReturns * positions[days], axis = 1)
+
+def BootstrapSignificance(dailyReturns, positions, resamples = 10000, blockSize = 20, confidence = 0.95,
+                          batchSize = 1000, processes = 1, seed = 0):
+    """
+    Test whether the Bollinger Band strategy beats buy and hold by more than luck.
+
+    Two Monte Carlo tests are run on the daily returns, each in batches of resamples drawn
+    with array operations:
+    - block bootstrap: blocks of consecutive days are resampled with replacement, giving the
+      distribution of the Bollinger Band minus buy and hold final return. Its confidence
+      interval and the p-value of no outperformance (from the distribution centred on zero)
+      are reported.
+    - random entry: the positions are shifted round to random entry dates, keeping the
+      holding periods but losing the timing of the signals. The p-value is the share of
+      shifts doing at least as well as the strategy.
+
+    Args:
+        dailyReturns: daily returns of the stock, e.g. the 'Buy & Hold Returns' column of BacktestBollingerBand()
+        positions: position held on every day, e.g. the 'position' column of BacktestBollingerBand()
+        resamples: number of resamples of each test
+        blockSize: number of consecutive days in a block of the block bootstrap
+        confidence: level of the confidence interval
+        batchSize: number of resamples drawn at a time, bounds the memory used
+        processes: number of worker processes, 1 to draw every batch in this process
+        seed: seed of the random generator
+
+    Return:
+        summary: dictionary with the actual 'excessReturn', its 'confidenceInterval', the
+            'blockPValue' and 'randomEntryPValue', and the resampled 'excessReturns' and
+            'randomEntryReturns'
+    """
+
+    dailyReturns = np.asarray(dailyReturns, dtype = np.float64)
+    positions = np.asarray(positions, dtype = np.float64)
+    blockSize = min(blockSize, len(dailyReturns))
+
+    bollingerReturn = np.prod(1 + dailyReturns * positions)
+    excessReturn = bollingerReturn - np.prod(1 + dailyReturns)
+
+    counts = [min(batchSize, resamples - start) for start in range(0, resamples, batchSize)]
+    seeds = np.random.SeedSequence(seed).spawn(2 * len(counts))
+    jobs = [(kind, dailyReturns, positions, count, blockSize, seeds[2 * i + j])
+            for j, kind in enumerate(['block', 'entry']) for i, count in enumerate(counts)]
+
+    if processes == 1:
+        outcomes = [BootstrapBatch(job) for job in jobs]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers = processes) as executor:
+            outcomes = list(executor.map(BootstrapBatch, jobs))
+
+    excessReturns = np.concatenate(outcomes[:len(counts)])
+    randomEntryReturns = np.concatenate(outcomes[len(counts):])
+
+    tail = (1 - confidence) / 2
+    confidenceInterval = tuple(np.quantile(excessReturns, [tail, 1 - tail]))
+    blockPValue = (1 + np.sum(excessReturns - excessReturn >= excessReturn)) / (resamples + 1)
+    randomEntryPValue = (1 + np.sum(randomEntryReturns >= bollingerReturn)) / (resamples + 1)
+
+    return {'excessReturn': excessReturn,
+            'confidenceInterval': confidenceInterval,
+            'blockPValue': blockPValue,
+            'randomEntryPValue': randomEntryPValue,
+            'excessReturns': excessReturns,
+            'randomEntryReturns': randomEntryReturns}
+
+def BootstrapBollingerBand(ticker, startDate, endDate, rolling_period, resamples = 10000, processes = 1):
+    """
+    Backtest the Bollinger Band strategy on a ticker and test its outperformance with BootstrapSignificance().
+
+    Args:
+        ticker: stock ticker.
+        startDate: intended start date for Bollinger Band strategy backtest
+        endDate: intended end date for Bollinger Band strategy backtest
+        rolling_period: intended rolling parameter for Bollinger Band strategy backtest
+        resamples: number of resamples of each test
+        processes: number of worker processes, 1 to draw every batch in this process
+
+    Return:
+        summary: dictionary returned by BootstrapSignificance()
+    """
+
+    df = LoadPriceHistory(ticker, startDate, endDate)
+    df = BacktestBollingerBand(df, rolling_period)[0]
+
+    return BootstrapSignificance(df['Buy & Hold Returns'].to_numpy(), df['position'].to_numpy(), resamples, processes = processes)
+
+#---------------end of functions for significance test------------------
+
+#---------------start of functions for financial ratios output------------------
+
+# Yahoo Finance address, can be pointed at a local server holding saved pages for offline testing
+YAHOO_BASE_URL = 'https://sg.finance.yahoo.com'
+
+# page name of each financial statement on Yahoo Finance
+STATEMENT_PAGES = {'balance sheet': 'balance-sheet',
+                   'income statement': 'financials',
+                   'cash flow': 'cash-flow'}
+
+# Define request headers to fetch the page by the browser.
+REQUEST_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3',
+    'Accept-Encoding': 'gzip, deflate', # not br, requests can only decode brotli when the brotli package is installed
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Cache-Control': 'max-age=0',
+    'Pragma': 'no-cache',
+    'Referrer': 'https://google.com',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/77.0.3865.120 Safari/537.36'
+}
+
+httpSession = None # shared session, created on first use by GetHttpSession()
+httpSessionLock = threading.Lock()
+fetchExecutor = concurrent.futures.ThreadPoolExecutor(max_workers = 8) # threads fetching statement pages
+
+def GetHttpSession():
+    """
+    Get the requests session shared by all page fetches.
+
+    The session keeps a pool of connections alive, so fetching several pages from
+    Yahoo Finance does not open a new connection for every page.
+
+    Return:
+        httpSession: the shared requests.Session
+    """
+
+    global httpSession
+
+    with httpSessionLock:
+        if httpSession is None:
+            httpSession = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections = 4, pool_maxsize = 16)
+            httpSession.mount('https://', adapter)
+            httpSession.mount('http://', adapter)
+            httpSession.headers.update(REQUEST_HEADERS)
+
+    return httpSession
+
+def StatementUrl(ticker, statement, baseUrl = None):
+    """
+    Build the Yahoo Finance link of a financial statement.
+
+    Args:
+        ticker: stock ticker.
+        statement: one of the keys of STATEMENT_PAGES
+        baseUrl: address of Yahoo Finance or of a local stand-in, YAHOO_BASE_URL if not given
+
+    Return:
+        url: link of the statement page
+    """
+
+    if baseUrl is None:
+        baseUrl = YAHOO_BASE_URL
+
+    return baseUrl + '/quote/' + ticker + '/' + STATEMENT_PAGES[statement] + '?p=' + ticker
+
+def FetchPage(url):
+    """
+    Fetch a page through the shared session.
+
+    Args:
+        url: a string of website to fetch
+
+    Return:
+        content: raw content of the page
+
+    Raises:
+        requests.HTTPError: if the server answers with an error status
+    """
+
+    page = GetHttpSession().get(url, timeout = 30)
+    page.raise_for_status()
+
+    return page.content
+
+# Scraping data from website and building a data frame
+def GetTable(url):
+    """
+    Fetch the page, parse it - splits the given sequence of characters or values (text) into smaller parts,
+    scrapes data from yahoo finance and build a data frame
+
+    Args:
+        url: a string of website where the data are extracted from
+
+    Return:
+        dfOrg: The Original Dataframe
+        dfRot: Transpose Dataframe
+    """
+
+    return ParseTable(FetchPage(url))
+
+def ParseTable(content):
+    """
+    Parse a financial statement page of yahoo finance and build a data frame
+
+    Args:
+        content: raw content of the page
+
+    Return:
+        dfOrg: The Original Dataframe
+        dfRot: Transpose Dataframe
+    """
+
+    # Parse the page with LXML, so that we can start doing some XPATH queries
+    # to extract the data that we want
+    tree = html.fromstring(content)
+
+    # Smoke test that we fetched the page by fetching and displaying the H1 element
+    tree.xpath("//h1/text()")
+    tableRows = tree.xpath("//div[contains(@class, 'D(tbr)')]")
+
+    # Ensure that some table rows are found; if none are found, then the layout of the website has been changed.
+    parsedRows = []
+    #Start of the loop - this will create the dataframe of the rows parsed  
+    for tableRow in tableRows:
+        parsedRow = []
+        el = tableRow.xpath("./div")
+        noneCount = 0
+        #Start of the loop where each value of a row is checked, if value found, 
+        #the cell value will be replaced with the value found
+        for rs in el:
+            try:
+                (text,) = rs.xpath('.//span/text()[1]')
+                parsedRow.append(text)
+            #If there is no value or there is error, for that particular element parsed, 
+            #it will be replaced with Nan 
+            except ValueError:
+                parsedRow.append(np.NaN)
+                noneCount += 1
+        #The loop would be continued for each instance end ensure it is less than 4 and form the rows
+        if (noneCount < 4):
+            parsedRows.append(parsedRow)
+            
+    # Create a DataFrame of the Parsed rows, set the index to the first column as Period ending
+    # Transpose the DataFrame, so that our header contains the account names
+    df = pd.DataFrame(parsedRows)
+    dfOrg = df
+    df = pd.DataFrame(parsedRows)
+    df = df.set_index(0) 
+    df = df.transpose() 
+
+    # Rename the "Breakdown" column to "Date"
+    cols = list(df.columns)
+    cols[0] = 'Date'
+    df = df.set_axis(cols, axis='columns')
+    dfRot = df
+    
+    return dfOrg, dfRot
+
+statementXPaths = {} # XPath expressions of ParseStatementTable(), compiled on first use
+
+def ParseStatementTable(content):
+    """
+    Parse a financial statement page of yahoo finance in a single pass into a typed data frame.
+
+    Does the same job as ParseTable() but walks the table rows once, gathering the texts
+    of all the cells of a row with one precompiled XPath expression, and converts every
+    figure ("1,234", "-1,234", "-") to a float while walking, so no string cleaning is
+    left for CalculateRatio(). A cell which is not
+    a number (e.g. "N/A") is left as NaN instead of failing the whole statement.
+
+    Args:
+        content: raw content of the page
+
+    Return:
+        df: one row per period (indexed from 1 like the Transpose Dataframe of ParseTable()),
+            a 'Date' column holding the period names and one float64 column per account
+
+    Raises:
+        ValueError: if no table is found on the page, e.g. for an invalid ticker
+    """
+
+    if not statementXPaths:
+        statementXPaths['rows'] = etree.XPath("//div[contains(@class, 'D(tbr)')]")
+        statementXPaths['texts'] = etree.XPath("./div//span/text()[1]")
+
+    rowsXPath = statementXPaths['rows']
+    textsXPath = statementXPaths['texts']
+
+    header = None
+    accounts = {}
+
+    for tableRow in rowsXPath(html.fromstring(content)):
+        # the texts of every cell of the row at once, each one given back to its cell by walking up to the row
+        cells = [child for child in tableRow if child.tag == 'div']
+        cellIndex = {cell: i for i, cell in enumerate(cells)}
+        cellTexts = [[] for cell in cells]
+        for text in textsXPath(tableRow):
+            element = text.getparent()
+            while element.getparent() is not tableRow:
+                element = element.getparent()
+            cellTexts[cellIndex[element]].append(text)
+
+        # same rule as ParseTable(): a cell counts only if it has exactly one text, rows with 4 or more empty cells are skipped
+        texts = [found[0] if len(found) == 1 else None for found in cellTexts]
+        if texts.count(None) >= 4:
+            continue
+
+        # the first row holds the period names
+        if header is None:
+            header = texts[1:]
+            continue
+
+        account = texts[0]
+        if account is None or account in accounts:
+            continue
+        values = np.full(len(header), np.nan)
+        for i, text in enumerate(texts[1:len(header) + 1]):
+            if text is not None and text != '-':
+                try:
+                    values[i] = float(text.replace(',', ''))
+                except ValueError:
+                    pass
+        accounts[account] = values
+
+    if header is None:
+        raise ValueError('no financial statement table found on the page')
+
+    df = pd.DataFrame(accounts, index = np.arange(1, len(header) + 1))
+    df.insert(0, 'Date', header)
+
+    return df
+
+FUNDAMENTALS_CACHE_TTL = 24 * 60 * 60 # seconds a parsed statement is used without asking the server again
+FUNDAMENTALS_CACHE_SIZE = 256 # statements kept, the least recently used one is dropped beyond this
+
+fundamentalsCache = collections.OrderedDict() # (url, key) -> cache entry, least recently used first
+fundamentalsCacheLock = threading.Lock()
+fundamentalsCacheStats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'evictions': 0}
+
+def GetStatement(ticker, statement, baseUrl = None):
+    """
+    Get one parsed financial statement of a ticker through the fundamentals cache.
+
+    Args:
+        ticker: stock ticker.
+        statement: one of the keys of STATEMENT_PAGES
+        baseUrl: address of Yahoo Finance or of a local stand-in, YAHOO_BASE_URL if not given
+
+    Return:
+        df: as returned by ParseStatementTable(), shared with other callers so it must not be modified
+
+    Raises:
+        requests.HTTPError: if the server answers with an error status
+    """
+
+    return GetCachedPage((ticker, statement), StatementUrl(ticker, statement, baseUrl), ParseStatementTable)
+
+def GetCachedPage(key, url, parse):
+    """
+    Get a parsed page through the fundamentals cache.
+
+    A page parsed less than FUNDAMENTALS_CACHE_TTL seconds ago is returned straight
+    from memory, skipping both the download and the parsing. An older one is revalidated
+    with If-None-Match / If-Modified-Since, and if the server answers 304 Not Modified the
+    parsed page is kept for another FUNDAMENTALS_CACHE_TTL seconds.
+
+    Pages are cached by url and key, so the same ticker fetched from another source, such
+    as a local stand-in, is never served from the cached page of the first one.
+
+    Args:
+        key: what is parsed from the page, e.g. (ticker, statement), several can come from one url
+        url: address of the page
+        parse: function turning the raw content of the page into what is cached and returned
+
+    Return:
+        what parse returned, shared with other callers so it must not be modified
+
+    Raises:
+        requests.HTTPError: if the server answers with an error status
+    """
+
+    key = (url, key)
+    with fundamentalsCacheLock:
+        entry = fundamentalsCache.get(key)
+        if entry is not None:
+            fundamentalsCache.move_to_end(key)
+            if time.time() - entry['fetchedAt'] < FUNDAMENTALS_CACHE_TTL:
+                fundamentalsCacheStats['hits'] += 1
+                CountEvent('statement cache hits')
+                return entry['df']
+
+    # expired entries are revalidated instead of downloaded again
+    headers = {}
+    if entry is not None:
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['lastModified']:
+            headers['If-Modified-Since'] = entry['lastModified']
+
+    with TimedStage('http fetch'):
+        page = GetHttpSession().get(url, headers = headers, timeout = 30)
+    CountEvent('http requests')
+
+    if entry is not None and page.status_code == 304:
+        with fundamentalsCacheLock:
+            entry['fetchedAt'] = time.time()
+            fundamentalsCacheStats['revalidated'] += 1
+        CountEvent('statements revalidated')
+        return entry['df']
+
+    page.raise_for_status()
+    CountEvent('bytes downloaded', len(page.content))
+    with TimedStage('parse statement'):
+        df = parse(page.content)
+
+    with fundamentalsCacheLock:
+        fundamentalsCacheStats['misses'] += 1
+        fundamentalsCache[key] = {'df': df,
+                                  'fetchedAt': time.time(),
+                                  'etag': page.headers.get('ETag'),
+                                  'lastModified': page.headers.get('Last-Modified')}
+        fundamentalsCache.move_to_end(key)
+        while len(fundamentalsCache) > FUNDAMENTALS_CACHE_SIZE:
+            fundamentalsCache.popitem(last = False)
+            fundamentalsCacheStats['evictions'] += 1
+
+    return df
+
+def GetFundamentalsCacheStats():
+    """
+    Get the counters of the fundamentals cache.
+
+    Return:
+        stats: copy of the hit, miss, revalidated and eviction counters plus the current number of entries
+    """
+
+    with fundamentalsCacheLock:
+        stats = dict(fundamentalsCacheStats)
+        stats['entries'] = len(fundamentalsCache)
+
+    return stats
+
+def ClearFundamentalsCache():
+    """drop every cached statement, the counters are kept"""
+
+    with fundamentalsCacheLock:
+        fundamentalsCache.clear()
+
+def FetchStatements(ticker, baseUrl = None):
+    """
+    Fetch and parse the balance sheet, income statement and cash flow pages of a ticker concurrently.
+
+    Args:
+        ticker: stock ticker.
+        baseUrl: address of Yahoo Finance or of a local stand-in, YAHOO_BASE_URL if not given
+
+    Return:
+        statements: dictionary mapping each key of STATEMENT_PAGES to its parsed statement,
+            see ParseStatementTable(), served from the fundamentals cache when possible
+
+    Raises:
+        Any error raised while fetching or parsing one of the pages, e.g. for an invalid ticker
+    """
+
+    # each fetch runs in the context of the caller, so that it is timed in the caller's trace
+    futures = {}
+    for statement in STATEMENT_PAGES:
+        futures[statement] = fetchExecutor.submit(contextvars.copy_context().run, GetStatement, ticker, statement, baseUrl)
+
+    statements = {}
+    for statement, future in futures.items():
+        statements[statement] = future.result()
+
+    return statements
+
+# where the statements are in the data embedded in the pages: (yearly list, quarterly list or None when there is no ttm column)
+EMBEDDED_STATEMENTS = {'balance sheet': (('balanceSheetHistory', 'balanceSheetStatements'), None),
+                       'income statement': (('incomeStatementHistory', 'incomeStatementHistory'),
+                                            ('incomeStatementHistoryQuarterly', 'incomeStatementHistory')),
+                       'cash flow': (('cashflowStatementHistory', 'cashflowStatements'),
+                                     ('cashflowStatementHistoryQuarterly', 'cashflowStatements'))}
+
+# names of the embedded fields as shown in the statement tables, other fields are named from their camel case
+EMBEDDED_ACCOUNT_NAMES = {'totalCurrentAssets': 'Total current assets',
+                          'totalCurrentLiabilities': 'Total current liabilities',
+                          'totalStockholderEquity': 'Total stockholders\' equity',
+                          'totalAssets': 'Total assets',
+                          'totalRevenue': 'Total revenue',
+                          'netIncome': 'Net income',
+                          'netIncomeApplicableToCommonShares': 'Net income available to common shareholders'}
+
+def ParseStatementJson(content):
+    """
+    Read every financial statement from the data embedded in a yahoo finance page.
+
+    The statement pages carry all their data as JSON in the "root.App.main = {...};"
+    script, so the three statements are read from any one page with json instead of
+    walking the HTML table. The tables are built like those of ParseStatementTable(): one
+    row per period, latest first, with 'ttm' (the sum of the last 4 quarters) first for
+    the income statement and cash flow, dates as dd/mm/yyyy and figures in thousands.
+
+    Args:
+        content: raw content of the page
+
+    Return:
+        statements: dictionary mapping each key of STATEMENT_PAGES to its table
+
+    Raises:
+        ValueError: if the page has no embedded data or no statements in it
+    """
+
+    text = content.decode('utf-8', 'replace') if isinstance(content, bytes) else content
+    start = text.find('root.App.main')
+    if start < 0:
+        raise ValueError('no data embedded in the page')
+    start = text.index('{', start)
+    data = json.JSONDecoder().raw_decode(text, start)[0]
+
+    try:
+        store = data['context']['dispatcher']['stores']['QuoteSummaryStore']
+    except (KeyError, TypeError):
+        raise ValueError('no financial statements in the data embedded in the page')
+
+    def Figure(field):
+        return field['raw'] / 1000 if isinstance(field, dict) and 'raw' in field else np.nan
+
+    def AccountName(key):
+        return EMBEDDED_ACCOUNT_NAMES.get(key) or re.sub('([A-Z])', r' \1', key).capitalize()
+
+    statements = {}
+    for statement, (yearly, quarterly) in EMBEDDED_STATEMENTS.items():
+        periods = store.get(yearly[0], {}).get(yearly[1], [])
+        if not periods:
+            raise ValueError('no {} in the data embedded in the page'.format(statement))
+
+        dates = [dt.datetime.fromtimestamp(period['endDate']['raw'], dt.timezone.utc).strftime('%d/%m/%Y') for period in periods]
+        keys = list(dict.fromkeys(key for period in periods for key in period if key not in ('maxAge', 'endDate')))
+        figures = np.array([[Figure(period.get(key)) for key in keys] for period in periods]).reshape(len(periods), len(keys))
+
+        # trailing twelve months, summed over the last 4 quarters when they are all there
+        if quarterly is not None:
+            quarters = store.get(quarterly[0], {}).get(quarterly[1], [])[:4]
+            ttm = np.full((1, len(keys)), np.nan)
+            if len(quarters) == 4:
+                ttm[0] = np.array([[Figure(quarter.get(key)) for key in keys] for quarter in quarters]).sum(axis = 0)
+            dates = ['ttm'] + dates
+            figures = np.vstack((ttm, figures))
+
+        df = pd.DataFrame(figures, columns = [AccountName(key) for key in keys], index = np.arange(1, len(dates) + 1))
+        df = df.loc[:, ~df.columns.duplicated()]
+        df.insert(0, 'Date', dates)
+        statements[statement] = df
+
+    return statements
+
+class FundamentalsProvider(abc.ABC):
+    """
+    Source of the financial statements the ratios are calculated from.
+
+    A provider returns every statement as a table like ParseStatementTable() does: one row
+    per period indexed from 1, a 'Date' column with the period names and one float column
+    per account. CalculateRatio() only uses this interface, so the statements can come
+    from the web or from a file.
+    """
+
+    @abc.abstractmethod
+    def GetStatement(self, ticker, statement):
+        """
+        Get one financial statement of a ticker.
+
+        Args:
+            ticker: stock ticker.
+            statement: one of the keys of STATEMENT_PAGES
+
+        Return:
+            df: the statement, shared with other callers so it must not be modified
+
+        Raises:
+            Any error when the statement cannot be had, e.g. for an invalid ticker
+        """
+
+    def GetStatements(self, ticker):
+        """get every statement of STATEMENT_PAGES for a ticker, as a dictionary keyed like STATEMENT_PAGES"""
+
+        return {statement: self.GetStatement(ticker, statement) for statement in STATEMENT_PAGES}
+
+class YahooHtmlProvider(FundamentalsProvider):
+    """statements parsed from the tables of the yahoo finance pages, one page per statement, see ParseStatementTable()"""
+
+    def __init__(self, baseUrl = None):
+        self.baseUrl = baseUrl
+
+    def GetStatement(self, ticker, statement):
+        return GetStatement(ticker, statement, self.baseUrl)
+
+    def GetStatements(self, ticker):
+        return FetchStatements(ticker, self.baseUrl)
+
+class YahooJsonProvider(FundamentalsProvider):
+    """
+    statements read from the data embedded in one yahoo finance page, see ParseStatementJson()
+
+    One page gives every statement, so a ticker costs one download and no HTML walking.
+    Tickers whose page has no embedded data are handed to the fallback provider.
+    """
+
+    def __init__(self, baseUrl = None, fallback = None):
+        self.baseUrl = baseUrl
+        self.fallback = fallback if fallback is not None else YahooHtmlProvider(baseUrl)
+        self.withoutJson = set() # tickers found to have no embedded data, straight to the fallback
+
+    def GetStatement(self, ticker, statement):
+        return self.GetStatements(ticker)[statement]
+
+    def GetStatements(self, ticker):
+        if ticker not in self.withoutJson:
+            try:
+                return GetCachedPage((ticker, 'embedded data'), StatementUrl(ticker, 'balance sheet', self.baseUrl), ParseStatementJson)
+            except ValueError:
+                self.withoutJson.add(ticker)
+
+        return self.fallback.GetStatements(ticker)
+
+class BulkFileProvider(FundamentalsProvider):
+    """
+    statements read from one bulk csv file, to work offline
+
+    The file has one row per figure with the columns Ticker, Statement, Period, Date,
+    Account and Value, Period numbering the columns of the statement from 1. It is read
+    once, on first use. WriteBulkFundamentals() writes such a file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.statements = None
+        self.lock = threading.Lock()
+
+    def Load(self):
+        """read the file into one table per (ticker, statement), once"""
+
+        with self.lock:
+            if self.statements is None:
+                figures = pd.read_csv(self.path, dtype = {'Ticker': str, 'Statement': str, 'Date': str, 'Account': str})
+                statements = {}
+                for (ticker, statement), rows in figures.groupby(['Ticker', 'Statement'], sort = False):
+                    df = rows.pivot(index = ['Period', 'Date'], columns = 'Account', values = 'Value')
+                    df = df.reindex(columns = rows['Account'].unique()).reset_index(level = 'Date')
+                    df.index.name = None
+                    df.columns.name = None
+                    statements[(ticker, statement)] = df
+                self.statements = statements
+
+        return self.statements
+
+    def GetStatement(self, ticker, statement):
+        try:
+            return self.Load()[(ticker, statement)]
+        except KeyError:
+            raise ValueError('no {} of {} in {}'.format(statement, ticker, self.path))
+
+def WriteBulkFundamentals(path, tickers, provider = None):
+    """
+    Write the statements of many tickers into one bulk file for BulkFileProvider().
+
+    Args:
+        path: csv file to write
+        tickers: list of stock tickers
+        provider: provider the statements are taken from, fundamentalsProvider if not given
+
+    Return:
+        failed: dictionary of ticker -> error message for the tickers left out
+    """
+
+    provider = provider if provider is not None else fundamentalsProvider
+    parts = []
+    failed = {}
+    for ticker in tickers:
+        try:
+            statements = provider.GetStatements(ticker)
+        except Exception as error:
+            failed[ticker] = '{}: {}'.format(type(error).__name__, error)
+            continue
+        for statement, df in statements.items():
+            part = df.rename_axis('Period').reset_index().melt(id_vars = ['Period', 'Date'], var_name = 'Account', value_name = 'Value')
+            part.insert(0, 'Statement', statement)
+            part.insert(0, 'Ticker', ticker)
+            parts.append(part)
+
+    pd.concat(parts).to_csv(path, index = False)
+
+    return failed
+
+fundamentalsProvider = YahooJsonProvider() # provider of the statements used by CalculateRatio() and the GUI, see --fundamentals
+
+bulkFileProviders = {} # path -> BulkFileProvider, so that a batch worker process reads a bulk file once for all its tickers
+
+def GetFundamentalsProvider(fundamentalsPath = None):
+    """
+    Get the provider of the statements in a process of its own, e.g. a batch worker.
+
+    Worker processes started with spawn or forkserver do not see a fundamentalsProvider
+    set in the main process, so the choice travels with the job instead.
+
+    Args:
+        fundamentalsPath: bulk file of the statements, see BulkFileProvider()
+
+    Return:
+        provider: the BulkFileProvider of the file, read once per process, or fundamentalsProvider if no file is given
+    """
+
+    if fundamentalsPath is None:
+        return fundamentalsProvider
+
+    if fundamentalsPath not in bulkFileProviders:
+        bulkFileProviders[fundamentalsPath] = BulkFileProvider(fundamentalsPath)
+
+    return bulkFileProviders[fundamentalsPath]
+
+# Calculate the ratios needed, and build 2 tables for Income Statement and Balance Sheet ratios separately
+def CalculateRatio(ticker, statements = None, provider = None):
+    """
+    Calculate the ratios needed from Balance Sheet and Income Statement
+
+    Args:
+        ticker: represents company user is searching for
+        statements: statements already returned by FundamentalsProvider.GetStatements(), taken from provider if not given
+        provider: FundamentalsProvider the statements come from, fundamentalsProvider if not given
+
+    Return:
+        Two table containing Income Statement and Balance Sheet Ratios and dates separately
+
+    """
+    
+    # get all statements at once unless the caller already has them
+    if statements is None:
+        statements = (provider if provider is not None else fundamentalsProvider).GetStatements(ticker)
+
+    # get Balance Sheet, the figures are already floats
+    bsTranspose = statements['balance sheet']
+
+    # get Income Statement
+    isTranspose = statements['income statement']
+
+    # copy columns of dataframe to do BS analysis
+    bsAnalysis = pd.DataFrame(bsTranspose['Date'])
+    year = bsTranspose['Date'].str.replace('/','').astype(int)%10000
+    bsAnalysis['Year'] = year
+    bsAnalysis
+
+    #calculation of Current Ratio
+    currentAssets = bsTranspose['Total current assets']
+    currentLiabilities = bsTranspose['Total current liabilities']
+    currentRatio = currentAssets / currentLiabilities
+    bsAnalysis['Current Ratio'] = currentRatio
+
+    # copy columns of dataframe to do income statement analysis
+    isAnalysis = pd.DataFrame(isTranspose['Date'])
+    year = (isTranspose['Date'].str.replace('/','')[1:]).astype(int)%10000
+    isAnalysis['Year'] = year
+    
+    #calculation of Net profit Ratio
+    revenue = isTranspose['Total revenue']
+    netIncome = isTranspose['Net income']
+    netProfitMargin = netIncome / revenue
+    isAnalysis['NPR'] = netProfitMargin
+
+    #calculation of Return on Equity
+    netProfit = isTranspose['Net income available to common shareholders']
+    averageShareholderEquityForThePeriod = bsTranspose['Total stockholders\' equity']
+    returnOnEquity = netProfit / averageShareholderEquityForThePeriod
+    isAnalysis['ROE'] = returnOnEquity
+
+    #calculation of Return on Assets
+    averageAssetsForThePeriod = bsTranspose['Total assets']
+    assetsTurnover = revenue / averageAssetsForThePeriod
+    isAnalysis['Asset Turnover'] = assetsTurnover
+    returnOnAssets = netProfitMargin / assetsTurnover
+    isAnalysis['ROA'] = returnOnAssets
+    isAnalysis.drop([1])
+
+    return isAnalysis,bsAnalysis
+
+# Function to print out the ratios as asked by the user or print error message if it is unavailable.
+def GetRatioOutput(symbol,bsAnalysis,isAnalysis,startYear,endYear):
+    """
+    Print out the ratios as asked by the user or print error message if it is unavailable.
+
+    Args:
+        symbol: represents company the user is searching for
+        bsAnalysis: table containing balance sheet ratios
+        isAnalysis: table containing income statement ratios
+        startYear: the year of input start date
+        endYear: the year of input end date
+
+    Return:
+        msg: the balance sheet ratios to be displayed to the users
+        printableIsDf: the income statement ratios to be displayed to the users
+    """ 
+
+    msg = "Company with symbol: {} are to be analysed.".format(symbol) +'\n'
+    userInput = [n for n in range(startYear,endYear+1)]
+    
+    unavailableYear = [] # build list to record year with unavailable data
+
+    # row label of each year in the balance sheet analysis, looked up once instead of searching the list every year
+    yearRow = {}
+    for (row, year) in zip(bsAnalysis.index, bsAnalysis['Year']):
+        yearRow.setdefault(year, row)
+
+    # for year in between user input start and end date
+    for year in userInput:
+        # if ratois for the year is avaliable
+        if year in yearRow:
+            # prepare output message for BS_analysis--current ratio
+            msg = msg + "The Current Ratio for year {} is {:.2f}".format(year,bsAnalysis.loc[yearRow[year], 'Current Ratio']) + '\n'
+        # if ratois for the year is not avaliable
+        else:
+            unavailableYear.append(year)
+            
+    # inform users which year's ratio is unavailable
+    if unavailableYear != []:
+        msg = msg + "Data needed to calculate current ratio for year{} is unavailable".format(unavailableYear) + '\n'
+
+    # Build a table for Income Statement Analysis from the years required by user which have balance sheet data
+    requiredYears = set(userInput) & set(yearRow)
+    isDf = isAnalysis[isAnalysis['Year'].isin(requiredYears)] # record data to be output
+    isDf = isDf.drop(isDf.columns[0],axis=1) # drop the date column to avoid redundancy
+    isDf['Year'] = isDf['Year'].astype(int) # convert existing 'float' data type in 'Year' column to 'int' type
+    printableIsDf = isDf # printable table
+    printableIsDf.index = np.arange(1, len(printableIsDf) + 1) # reset the index in such a way that when output to screen, the index shown starts from 1
+
+    return msg,printableIsDf
+
+# accounts needed by the ratio screener, taken from each statement
+RATIO_ACCOUNTS = {'balance sheet': ['Total current assets', 'Total current liabilities', 'Total stockholders\' equity', 'Total assets'],
+                  'income statement': ['Total revenue', 'Net income', 'Net income available to common shareholders']}
+
+def BuildFundamentalsPanel(tickers, getStatements = None, workers = 8):
+    """
+    Build one ticker x year table of the accounts needed for the ratios of many tickers.
+
+    Statements are fetched for several tickers at a time. Tickers whose statements cannot
+    be fetched or parsed are left out and reported, the panel is empty if none can.
+
+    Args:
+        tickers: list of stock tickers
+        getStatements: function returning the statements of a ticker, fundamentalsProvider.GetStatements if not given
+        workers: number of tickers fetched at the same time
+
+    Return:
+        panel: accounts indexed by (Ticker, Year), latest year first within each ticker
+        failed: dictionary of ticker -> error message for the tickers left out
+    """
+
+    if getStatements is None:
+        getStatements = fundamentalsProvider.GetStatements
+
+    def TickerAccounts(ticker):
+        statements = getStatements(ticker)
+        parts = []
+        for statement, accounts in RATIO_ACCOUNTS.items():
+            df = statements[statement]
+            # the period names end with the year ("31/12/2019"), "ttm" has no year and is dropped
+            year = pd.to_numeric(df['Date'].str[-4:], errors = 'coerce')
+            part = df.reindex(columns = accounts)
+            part.index = pd.Index(year, name = 'Year')
+            parts.append(part[part.index.notna()])
+        return pd.concat(parts, axis = 1, join = 'inner')
+
+    panels = {}
+    failed = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers = workers) as executor:
+        futures = {ticker: executor.submit(TickerAccounts, ticker) for ticker in tickers}
+        for ticker, future in futures.items():
+            try:
+                panels[ticker] = future.result()
+            except Exception as error:
+                failed[ticker] = '{}: {}'.format(type(error).__name__, error)
+
+    if not panels:
+        columns = [account for accounts in RATIO_ACCOUNTS.values() for account in accounts]
+        index = pd.MultiIndex.from_arrays([[], []], names = ['Ticker', 'Year'])
+        return pd.DataFrame(columns = columns, index = index, dtype = float), failed
+
+    panel = pd.concat(panels, names = ['Ticker', 'Year'])
+    panel.index = panel.index.set_levels(panel.index.levels[1].astype(int), level = 'Year')
+    panel = panel.sort_index(level = ['Ticker', 'Year'], ascending = [True, False])
+
+    return panel, failed
+
+SCREEN_RATIOS = ['Current Ratio', 'NPR', 'ROE', 'Asset Turnover', 'ROA'] # ratios calculated by ComputeRatioPanel()
+
+def ComputeRatioPanel(panel):
+    """
+    Calculate Current Ratio, NPR, ROE, Asset Turnover and ROA for every row of a fundamentals panel at once.
+
+    Uses the same formulas as CalculateRatio() but as whole column operations, with the
+    balance sheet and income statement of the same year side by side.
+
+    Args:
+        panel: accounts indexed by (Ticker, Year), see BuildFundamentalsPanel()
+
+    Return:
+        ratios: the five ratios with the same index as the panel
+    """
+
+    ratios = pd.DataFrame(index = panel.index)
+    ratios['Current Ratio'] = panel['Total current assets'] / panel['Total current liabilities']
+    ratios['NPR'] = panel['Net income'] / panel['Total revenue']
+    ratios['ROE'] = panel['Net income available to common shareholders'] / panel['Total stockholders\' equity']
+    ratios['Asset Turnover'] = panel['Total revenue'] / panel['Total assets']
+    ratios['ROA'] = ratios['NPR'] / ratios['Asset Turnover']
+
+    return ratios
+
+def ScreenRatios(ratios, filters = None, rankBy = 'ROE', ascending = False, year = None):
+    """
+    Filter and rank tickers on their ratios.
+
+    Args:
+        ratios: ratios indexed by (Ticker, Year), see ComputeRatioPanel()
+        filters: dictionary of ratio -> (minimum, maximum), None for an open side,
+            e.g. {'Current Ratio': (1.2, 2), 'ROE': (0.15, None)}
+        rankBy: ratio the remaining tickers are ranked on
+        ascending: rank the lowest value first instead of the highest
+        year: year to screen, the latest year of each ticker if not given
+
+    Return:
+        screened: one row per ticker passing every filter, best first, with a 'Rank' column starting from 1
+    """
+
+    # one row per ticker
+    if year is None:
+        screened = ratios.groupby(level = 'Ticker').head(1) # the panel lists the latest year first
+    else:
+        screened = ratios[ratios.index.get_level_values('Year') == year]
+    screened = screened.reset_index(level = 'Year')
+
+    # every filter is a vectorized comparison on a whole column
+    keep = np.ones(len(screened), dtype = bool)
+    for ratio, (minimum, maximum) in (filters or {}).items():
+        if minimum is not None:
+            keep &= (screened[ratio] >= minimum).to_numpy()
+        if maximum is not None:
+            keep &= (screened[ratio] <= maximum).to_numpy()
+    screened = screened[keep]
+
+    screened = screened.sort_values(rankBy, ascending = ascending, na_position = 'last', kind = 'stable')
+    screened.insert(0, 'Rank', np.arange(1, len(screened) + 1))
+
+    return screened
+
+def ParseScreenFilter(text):
+    """
+    Read one ratio condition of the command line, e.g. 'ROE>=0.15' or 'Current Ratio<=2'.
+
+    Return:
+        ratio, minimum, maximum: minimum or maximum is None for the open side
+
+    Raises:
+        ValueError: if the condition is not RATIO>=VALUE or RATIO<=VALUE with a known ratio
+    """
+
+    match = re.fullmatch(r'\s*(.+?)\s*(>=|<=)\s*(\S+)\s*', text)
+    if match is None or match.group(1) not in SCREEN_RATIOS:
+        raise ValueError('expected RATIO>=VALUE or RATIO<=VALUE with RATIO one of {}'.format(', '.join(SCREEN_RATIOS)))
+    ratio, operator, value = match.group(1), match.group(2), float(match.group(3))
+
+    return (ratio, value, None) if operator == '>=' else (ratio, None, value)
+
+def ScreenWatchlist(tickers, conditions = (), rankBy = 'ROE', year = None):
+    """
+    Screen and rank a watchlist on its ratios without the GUI.
+
+    Args:
+        tickers: list of stock tickers
+        conditions: ratio conditions as read by ParseScreenFilter(), all must hold
+        rankBy: ratio the tickers are ranked on, highest first
+        year: year to screen, the latest year of each ticker if not given
+
+    Return:
+        screened: as returned by ScreenRatios()
+        failed: dictionary of ticker -> error message for the tickers left out
+    """
+
+    # several conditions on the same ratio narrow its range
+    filters = {}
+    for ratio, minimum, maximum in conditions:
+        (low, high) = filters.get(ratio, (None, None))
+        filters[ratio] = (minimum if minimum is not None else low, maximum if maximum is not None else high)
+
+    panel, failed = BuildFundamentalsPanel(tickers)
+    screened = ScreenRatios(ComputeRatioPanel(panel), filters, rankBy, year = year)
+
+    return screened, failed
+
+#---------------end of functions for financial ratios output------------------
+
+#---------------start of functions for batch backtest------------------
+
+def ReadTickerList(path):
+    """
+    Read a watchlist file with one ticker per line, blank lines and lines starting with # are skipped.
+
+    Args:
+        path: path of the watchlist file
+
+    Return:
+        tickers: list of tickers without duplicates, in file order
+    """
+
+    tickers = []
+    with open(path) as watchlist:
+        for line in watchlist:
+            ticker = line.strip()
+            if ticker and not ticker.startswith('#') and ticker not in tickers:
+                tickers.append(ticker)
+
+    return tickers
+
+# columns of the batch results table, also when no ticker gets that far
+BATCH_COLUMNS = ['Ticker', 'Bollinger Band Strategy Return', 'Buy and Hold Return', 'Ratio Year', 'Current Ratio',
+                 'NPR', 'ROE', 'Asset Turnover', 'ROA', 'Error', 'Seconds']
+
+def BacktestTicker(job):
+    """
+    Run the Bollinger Band backtest and ratio analysis of one ticker for RunBatchBacktest().
+
+    Any error is caught and recorded so that one bad ticker does not stop the batch.
+
+    Args:
+        job: (ticker, startDate, endDate, rolling_period, fundamentalsPath) tuple, see GetFundamentalsProvider()
+            for fundamentalsPath
+
+    Return:
+        record: dictionary holding one row of the consolidated results table
+    """
+
+    ticker, startDate, endDate, rolling_period, fundamentalsPath = job
+    record = {'Ticker': ticker}
+    errors = []
+    started = time.perf_counter()
+
+    try:
+        df = LoadPriceHistory(ticker, startDate, endDate)
+        df, bollingerReturn, buyAndHoldReturn = BacktestBollingerBand(df, rolling_period)
+        record['Bollinger Band Strategy Return'] = bollingerReturn
+        record['Buy and Hold Return'] = buyAndHoldReturn
+    except Exception as error:
+        errors.append('backtest failed: {}: {}'.format(type(error).__name__, error))
+
+    try:
+        (isAnalysis,bsAnalysis) = CalculateRatio(ticker, provider = GetFundamentalsProvider(fundamentalsPath))
+
+        # keep the ratios of the latest year reported in the balance sheet
+        latestYear = bsAnalysis['Year'].iloc[0]
+        latestIs = isAnalysis[isAnalysis['Year'] == latestYear]
+        record['Ratio Year'] = int(latestYear)
+        record['Current Ratio'] = bsAnalysis['Current Ratio'].iloc[0]
+        for column in ['NPR', 'ROE', 'Asset Turnover', 'ROA']:
+            record[column] = latestIs[column].iloc[0] if len(latestIs) > 0 else np.nan
+    except Exception as error:
+        errors.append('ratio analysis failed: {}: {}'.format(type(error).__name__, error))
+
+    record['Error'] = '; '.join(errors)
+    record['Seconds'] = time.perf_counter() - started
+
+    return record
+
+def RunBatchBacktest(tickers, startDate, endDate, rolling_period, processes = None, outputPath = 'batch_results.csv',
+                     fundamentalsPath = None):
+    """
+    Backtest and analyse a list of tickers without the GUI, spreading the work over a process pool.
+
+    Args:
+        tickers: list of stock tickers
+        startDate: intended start date for Bollinger Band strategy backtest
+        endDate: intended end date for Bollinger Band strategy backtest
+        rolling_period: intended rolling parameter for Bollinger Band strategy backtest
+        processes: number of worker processes, defaults to the number of CPUs
+        outputPath: csv file the consolidated results table is written to
+        fundamentalsPath: bulk file of the statements, the one of fundamentalsProvider if it is a
+            BulkFileProvider, else the workers use their default provider
+
+    Return:
+        results: consolidated results table, one row per ticker
+    """
+
+    if fundamentalsPath is None and isinstance(fundamentalsProvider, BulkFileProvider):
+        fundamentalsPath = fundamentalsProvider.path
+
+    jobs = [(ticker, startDate, endDate, rolling_period, fundamentalsPath) for ticker in tickers]
+    started = time.perf_counter()
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers = processes) as executor:
+        records = list(executor.map(BacktestTicker, jobs))
+
+    elapsed = time.perf_counter() - started
+
+    results = pd.DataFrame(records, columns = BATCH_COLUMNS)
+    results.index = np.arange(1, len(results) + 1)
+    results.to_csv(outputPath, index_label = 'No.')
+
+    failed = (results['Error'] != '').sum()
+    print('Analysed {} tickers in {:.1f}s ({:.2f} tickers per second), {} with errors. Results written to {}'.format(
+        len(results), elapsed, len(results) / elapsed, failed, outputPath))
+
+    return results
+
+#---------------end of functions for batch backtest------------------
+
+#---------------start of functions for precomputed results store------------------
+
+PRECOMPUTE_DB_PATH = 'precomputed.sqlite' # results of the nightly precompute job, read by the GUI
+PRECOMPUTE_ROLLING_PERIODS = (10, 20, 50) # rolling periods precomputed for every ticker of the watchlist
+PRECOMPUTE_RANGES_YEARS = (1, 3, 5) # backtests precomputed over the last 1, 3 and 5 years up to the day of the job
+PRECOMPUTE_MAX_AGE = 26 * 60 * 60 # seconds a precomputed result is used, a nightly job always leaves a fresh one
+PRECOMPUTE_CLOSE_HOUR = 18 # local hour from which the bar of a trading day is taken as final
+
+def OpenPrecomputedStore(path = PRECOMPUTE_DB_PATH):
+    """
+    Open the store of precomputed results, creating its tables if needed.
+
+    Backtests are kept one row per (ticker, start, end, rolling period) with their dates
+    and equity curves as raw int64 / float64 columns, ratios one row per ticker as JSON.
+
+    Return:
+        connection: sqlite3 connection, to be closed by the caller
+    """
+
+    connection = sqlite3.connect(path)
+    connection.execute("""CREATE TABLE IF NOT EXISTS backtests (
+                              ticker TEXT, start TEXT, end TEXT, rolling_period INTEGER, computed_at REAL,
+                              bollinger_return REAL, buy_and_hold_return REAL,
+                              dates BLOB, buy_and_hold_equity BLOB, bollinger_equity BLOB,
+                              PRIMARY KEY (ticker, start, end, rolling_period))""")
+    connection.execute("""CREATE TABLE IF NOT EXISTS ratios (
+                              ticker TEXT PRIMARY KEY, computed_at REAL, balance_sheet TEXT, income_statement TEXT)""")
+
+    return connection
+
+def SavePrecomputedBacktest(connection, ticker, startDate, endDate, rolling_period, df, bollingerReturn, buyAndHoldReturn):
+    """store a backtest returned by BacktestBollingerBand(), only its dates and equity curves are kept"""
+
+    # tickers are stored upper-case, as typed in any case they name the same stock
+    connection.execute('INSERT OR REPLACE INTO backtests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                       (ticker.upper(), startDate.isoformat(), endDate.isoformat(), rolling_period, time.time(),
+                        float(bollingerReturn), float(buyAndHoldReturn),
+                        df.index.to_numpy(dtype = 'datetime64[ns]').view(np.int64).tobytes(),
+                        df['Buy & Hold Equity'].to_numpy(dtype = np.float64).tobytes(),
+                        df['Bollinger Band Strategy Equity'].to_numpy(dtype = np.float64).tobytes()))
+
+def SavePrecomputedRatios(connection, ticker, isAnalysis, bsAnalysis):
+    """store the ratio tables returned by CalculateRatio(), as json of their index, columns and rows"""
+
+    connection.execute('INSERT OR REPLACE INTO ratios VALUES (?, ?, ?, ?)',
+                       (ticker.upper(), time.time(), json.dumps(bsAnalysis.to_dict('split')), json.dumps(isAnalysis.to_dict('split'))))
+
+def ReadPrecomputedBacktest(ticker, startDate, endDate, rolling_period, path = PRECOMPUTE_DB_PATH, maxAge = PRECOMPUTE_MAX_AGE):
+    """
+    Read a fresh precomputed backtest.
+
+    Args:
+        ticker: stock ticker.
+        startDate: start date of the backtest
+        endDate: end date of the backtest
+        rolling_period: rolling period of the backtest
+        path: file of the store
+        maxAge: most seconds since the backtest was computed
+
+    Return:
+        (df, bollingerReturn, buyAndHoldReturn) like BacktestBollingerBand(), df only holding
+        the two equity curves, or None if there is no fresh entry
+    """
+
+    if not os.path.exists(path):
+        return None
+
+    connection = OpenPrecomputedStore(path)
+    try:
+        row = connection.execute("""SELECT bollinger_return, buy_and_hold_return, dates, buy_and_hold_equity, bollinger_equity
+                                    FROM backtests WHERE ticker = ? AND start = ? AND end = ? AND rolling_period = ? AND computed_at > ?""",
+                                 (ticker.upper(), startDate.isoformat(), endDate.isoformat(), rolling_period, time.time() - maxAge)).fetchone()
+    finally:
+        connection.close()
+
+    if row is None:
+        return None
+
+    (bollingerReturn, buyAndHoldReturn, dates, buyAndHoldEquity, bollingerEquity) = row
+    df = pd.DataFrame({'Buy & Hold Equity': np.frombuffer(buyAndHoldEquity, dtype = np.float64),
+                       'Bollinger Band Strategy Equity': np.frombuffer(bollingerEquity, dtype = np.float64)},
+                      index = pd.DatetimeIndex(np.frombuffer(dates, dtype = np.int64).view('datetime64[ns]'), name = 'Date'))
+
+    return df, bollingerReturn, buyAndHoldReturn
+
+def ReadPrecomputedRatios(ticker, path = PRECOMPUTE_DB_PATH, maxAge = PRECOMPUTE_MAX_AGE):
+    """
+    Read fresh precomputed ratios.
+
+    Return:
+        (isAnalysis, bsAnalysis) like CalculateRatio(), or None if there is no fresh entry
+    """
+
+    if not os.path.exists(path):
+        return None
+
+    connection = OpenPrecomputedStore(path)
+    try:
+        row = connection.execute('SELECT balance_sheet, income_statement FROM ratios WHERE ticker = ? AND computed_at > ?',
+                                 (ticker.upper(), time.time() - maxAge)).fetchone()
+    finally:
+        connection.close()
+
+    if row is None:
+        return None
+
+    # json keeps every float exactly, unlike DataFrame.to_json()
+    bsAnalysis = pd.DataFrame(**json.loads(row[0]))
+    isAnalysis = pd.DataFrame(**json.loads(row[1]))
+
+    return isAnalysis, bsAnalysis
+
+def YearsBefore(day, years):
+    """the same day years earlier, 29 February becoming 28 February like pd.DateOffset"""
+
+    try:
+        return day.replace(year = day.year - years)
+    except ValueError:
+        return day.replace(year = day.year - years, day = 28)
+
+def PrecomputeEndDate(now = None):
+    """
+    End date of the precomputed ranges, the day after the last completed trading day.
+
+    A trading day is completed from PRECOMPUTE_CLOSE_HOUR, weekends are skipped (holidays
+    are not known), so a nightly job and the GUI on the next day use the same ranges. The
+    end date is exclusive like the one of LoadPriceHistory().
+
+    Args:
+        now: local date and time, now if not given
+
+    Return:
+        end: date after the last completed trading day
+    """
+
+    now = now if now is not None else dt.datetime.now()
+    day = now.date() if now.hour >= PRECOMPUTE_CLOSE_HOUR else now.date() - dt.timedelta(days = 1)
+    while day.weekday() >= 5:
+        day -= dt.timedelta(days = 1)
+
+    return day + dt.timedelta(days = 1)
+
+def PrecomputeRanges(today, rangesYears = PRECOMPUTE_RANGES_YEARS):
+    """(start, end) dates of the precomputed backtests, the last rangesYears years up to today, see PrecomputeEndDate()"""
+
+    # plain datetime, so the GUI can prefill its entries without importing pandas
+    return [(YearsBefore(today, years), today) for years in rangesYears]
+
+def RunPrecompute(tickers, rollingPeriods = PRECOMPUTE_ROLLING_PERIODS, rangesYears = PRECOMPUTE_RANGES_YEARS,
+                  path = PRECOMPUTE_DB_PATH, today = None, storeDir = PRICE_STORE_DIR, getStatements = None):
+    """
+    Precompute the backtests and ratios of a watchlist into the store, e.g. every night.
+
+    For every ticker the prices of the longest range are loaded once, every (range,
+    rolling period) pair is backtested and the ratios are calculated. A ticker which fails
+    is reported and skipped, its older results are left as they are.
+
+    Args:
+        tickers: list of stock tickers
+        rollingPeriods: rolling periods to backtest
+        rangesYears: lengths in years of the ranges to backtest, all ending on the same day
+        path: file of the store
+        today: end date of the ranges (exclusive), PrecomputeEndDate() if not given
+        storeDir: folder of the price store
+        getStatements: function returning the statements of a ticker, fundamentalsProvider.GetStatements if not given
+
+    Return:
+        failed: dictionary of ticker -> error message for the tickers which failed
+    """
+
+    today = today if today is not None else PrecomputeEndDate()
+    getStatements = getStatements if getStatements is not None else fundamentalsProvider.GetStatements
+    ranges = PrecomputeRanges(today, rangesYears)
+    firstDate = min(startDate for startDate, endDate in ranges)
+    failed = {}
+    started = time.perf_counter()
+
+    connection = OpenPrecomputedStore(path)
+    try:
+        for ticker in [ticker.upper() for ticker in tickers]:
+            try:
+                prices = LoadPriceHistory(ticker, firstDate, today, storeDir)
+                if len(prices) == 0:
+                    raise ValueError('no prices downloaded')
+                with connection:
+                    for startDate, endDate in ranges:
+                        # same slice as LoadPriceHistory(ticker, startDate, endDate), the end is exclusive
+                        df = prices[(prices.index >= pd.Timestamp(startDate)) & (prices.index < pd.Timestamp(endDate))]
+                        for rolling_period in rollingPeriods:
+                            backtest = BacktestBollingerBand(df, rolling_period)
+                            SavePrecomputedBacktest(connection, ticker, startDate, endDate, rolling_period, *backtest)
+                    (isAnalysis,bsAnalysis) = CalculateRatio(ticker, getStatements(ticker))
+                    SavePrecomputedRatios(connection, ticker, isAnalysis, bsAnalysis)
+            except Exception as error:
+                failed[ticker] = '{}: {}'.format(type(error).__name__, error)
+    finally:
+        connection.close()
+
+    print('Precomputed {} of {} tickers in {:.1f}s into {}'.format(len(tickers) - len(failed), len(tickers), time.perf_counter() - started, path))
+    for ticker, error in failed.items():
+        print('  {}: {}'.format(ticker, error))
+
+    return failed
+
+#---------------end of functions for precomputed results store------------------
+
+#---------------start of functions for analysis service------------------
+
+SERVICE_CACHE_SIZE = 256 # results kept by the analysis service, the least recently used one is dropped beyond this
+SERVICE_CACHE_TTL = 60 * 60 # seconds a result of the service is served from its cache, so that newer prices are picked up
+SERVICE_WORKERS = 4 # threads running the blocking backtests and ratio analyses of the service
+SERVICE_CURVE_POINTS = 500 # equity curves returned by /backtest are decimated to about this many points
+
+def BacktestSummary(ticker, startDate, endDate, rolling_period, storeDir = PRICE_STORE_DIR):
+    """
+    Backtest the Bollinger Band strategy on a ticker and summarise it for the analysis service.
+
+    Args:
+        ticker: stock ticker.
+        startDate: intended start date for Bollinger Band strategy backtest
+        endDate: intended end date for Bollinger Band strategy backtest
+        rolling_period: intended rolling parameter for Bollinger Band strategy backtest
+        storeDir: folder of the price store
+
+    Return:
+        summary: dictionary of plain values, ready for json.dumps()
+    """
+
+    df = LoadPriceHistory(ticker, startDate, endDate, storeDir)
+    df, bollingerReturn, buyAndHoldReturn = BacktestBollingerBand(df, rolling_period, ticker = ticker)
+
+    positions = DecimateMinMax(df['Bollinger Band Strategy Equity'].to_numpy(), SERVICE_CURVE_POINTS // 2)
+
+    return {'ticker': ticker,
+            'start': startDate.isoformat(),
+            'end': endDate.isoformat(),
+            'rolling_period': rolling_period,
+            'days': len(df),
+            'bollingerReturn': float(bollingerReturn),
+            'buyAndHoldReturn': float(buyAndHoldReturn),
+            'equity': {'dates': [date.strftime('%Y-%m-%d') for date in df.index[positions]],
+                       'bollinger': df['Bollinger Band Strategy Equity'].to_numpy()[positions].tolist(),
+                       'buyAndHold': df['Buy & Hold Equity'].to_numpy()[positions].tolist()}}
+
+def RatioSummary(ticker):
+    """
+    Calculate the financial ratios of a ticker and summarise them for the analysis service.
+
+    Return:
+        summary: dictionary with the 'balanceSheet' and 'incomeStatement' ratios, one record per year
+    """
+
+    (isAnalysis,bsAnalysis) = CalculateRatio(ticker)
+
+    return {'ticker': ticker,
+            'balanceSheet': json.loads(bsAnalysis.drop(columns = 'Date').to_json(orient = 'records')),
+            'incomeStatement': json.loads(isAnalysis.drop(columns = 'Date').to_json(orient = 'records'))}
+
+def NewServiceState(cacheSize = SERVICE_CACHE_SIZE, workers = SERVICE_WORKERS, storeDir = PRICE_STORE_DIR, cacheTtl = SERVICE_CACHE_TTL):
+    """
+    Create the state shared by the connections of the analysis service.
+
+    Return:
+        service: dictionary with the result cache, the computations in flight, the worker pool and counters
+    """
+
+    return {'cache': collections.OrderedDict(), # key -> (time computed, result)
+            'cacheSize': cacheSize,
+            'cacheTtl': cacheTtl,
+            'inflight': {},
+            'executor': concurrent.futures.ThreadPoolExecutor(max_workers = workers),
+            'storeDir': storeDir,
+            'symbolListPath': SYMBOL_LIST_PATH,
+            'symbolIndexPath': SYMBOL_INDEX_PATH,
+            'stats': collections.Counter()}
+
+def StoreServiceResult(service, key, future):
+    """done callback of a computation of the service, caches its result unless it failed"""
+
+    del service['inflight'][key]
+    if future.cancelled() or future.exception() is not None:
+        return
+
+    cache = service['cache']
+    cache[key] = (time.monotonic(), future.result())
+    cache.move_to_end(key)
+    while len(cache) > service['cacheSize']:
+        cache.popitem(last = False)
+        service['stats']['evictions'] += 1
+
+async def GetServiceResult(service, key, function, *args):
+    """
+    Get a result of the service from its cache, from the identical computation already running, or compute it.
+
+    Concurrent identical requests share one computation, which runs on the worker pool so
+    the event loop keeps serving other connections meanwhile. A cached result older than
+    the cacheTtl of the service is computed again, from the price store as it is then.
+
+    Args:
+        service: state returned by NewServiceState()
+        key: tuple identifying the request, e.g. ('backtest', ticker, start, end, rolling_period)
+        function: blocking function computing the result, a dictionary ready for json.dumps()
+        args: arguments of function
+
+    Return:
+        the result of function encoded as JSON, so a cached result is sent without encoding it again
+    """
+
+    cache = service['cache']
+    if key in cache:
+        (computedAt, result) = cache[key]
+        if time.monotonic() - computedAt < service['cacheTtl']:
+            cache.move_to_end(key)
+            service['stats']['cache hits'] += 1
+            return result
+        del cache[key]
+        service['stats']['expirations'] += 1
+
+    future = service['inflight'].get(key)
+    if future is None:
+        future = asyncio.get_running_loop().run_in_executor(service['executor'], lambda: json.dumps(function(*args)).encode())
+        service['inflight'][key] = future
+        future.add_done_callback(lambda done: StoreServiceResult(service, key, done))
+        service['stats']['computations'] += 1
+    else:
+        service['stats']['coalesced'] += 1
+
+    # a client hanging up must not cancel the computation shared with the others
+    return await asyncio.shield(future)
+
+async def HandleServiceRequest(service, path):
+    """
+    Answer one request of the analysis service.
+
+    Routes:
+        /backtest?ticker=D05.SI&start=2018-01-02&end=2019-05-01&rolling=20
+        /ratios?ticker=D05.SI
+        /stats
+
+    Return:
+        (status, content): HTTP status code and JSON body
+    """
+
+    url = urllib.parse.urlsplit(path)
+    query = dict(urllib.parse.parse_qsl(url.query))
+
+    if url.path == '/stats':
+        return 200, json.dumps(dict(service['stats'], cached = len(service['cache']), inflight = len(service['inflight']))).encode()
+
+    try:
+        ticker = query['ticker'].upper()
+        index = symbolIndexes.get(service['symbolIndexPath'])
+        if service['symbolIndexPath'] not in symbolIndexes:
+            # the first request may have to build the index, which must not block the event loop
+            index = await asyncio.get_running_loop().run_in_executor(service['executor'], GetSymbolIndex, service['symbolListPath'], service['symbolIndexPath'])
+        if index is not None and not IsKnownSymbol(index, ticker):
+            raise ValueError('unknown ticker {}'.format(ticker))
+        if url.path == '/backtest':
+            startDate = ConvertToDatetime(query['start'])
+            endDate = ConvertToDatetime(query['end'])
+            rolling_period = int(query.get('rolling', 20))
+            if startDate > endDate or rolling_period < 2:
+                raise ValueError('start must be before end and rolling at least 2')
+            key = ('backtest', ticker, startDate, endDate, rolling_period)
+            call = (BacktestSummary, ticker, startDate, endDate, rolling_period, service['storeDir'])
+        elif url.path == '/ratios':
+            key = ('ratios', ticker)
+            call = (RatioSummary, ticker)
+        else:
+            return 404, json.dumps({'error': 'unknown path {}'.format(url.path)}).encode()
+    except (KeyError, ValueError, IndexError) as error:
+        return 400, json.dumps({'error': 'invalid query: {}: {}'.format(type(error).__name__, error)}).encode()
+
+    try:
+        return 200, await GetServiceResult(service, key, *call)
+    except Exception as error:
+        return 500, json.dumps({'error': '{}: {}'.format(type(error).__name__, error)}).encode()
+
+async def HandleServiceConnection(service, reader, writer):
+    """read one HTTP GET request from a connection, answer it as JSON and close the connection"""
+
+    try:
+        requestLine = (await reader.readline()).decode('latin-1').split()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''): # headers are not needed
+            pass
+
+        if len(requestLine) < 2 or requestLine[0] != 'GET':
+            status, content = 405, json.dumps({'error': 'only GET is supported'}).encode()
+        else:
+            status, content = await HandleServiceRequest(service, requestLine[1])
+        service['stats']['requests'] += 1
+
+        writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: close\r\n\r\n'.format(
+            status, 'OK' if status == 200 else 'Error', len(content)).encode('latin-1') + content)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def StartService(host = '127.0.0.1', port = 8888, service = None):
+    """
+    Start the analysis service on the running event loop.
+
+    Return:
+        server: the asyncio server, port 0 picks a free port, see server.sockets[0].getsockname()
+        service: state of the service
+    """
+
+    if service is None:
+        service = NewServiceState()
+    server = await asyncio.start_server(lambda reader, writer: HandleServiceConnection(service, reader, writer), host, port)
+
+    return server, service
+
+def RunService(host = '127.0.0.1', port = 8888):
+    """serve backtests and financial ratios as JSON over HTTP until interrupted"""
+
+    async def Serve():
+        server, service = await StartService(host, port)
+        print('Serving on http://{}:{}/ (e.g. /backtest?ticker=D05.SI&start=2018-01-02&end=2019-05-01&rolling=20)'.format(host, port))
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(Serve())
+    except KeyboardInterrupt:
+        pass
+
+async def FetchServicePath(host, port, path):
+    """send one GET request to the analysis service, return its status and the seconds it took"""
+
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write('GET {} HTTP/1.1\r\nHost: {}\r\n\r\n'.format(path, host).encode('latin-1'))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    await reader.read()
+    writer.close()
+
+    return status, time.perf_counter() - started
+
+async def LoadTestService(host, port, paths, requests = 1000, concurrency = 50):
+    """
+    Send requests to the analysis service from concurrent clients and report the latency.
+
+    Args:
+        host: host of the service
+        port: port of the service
+        paths: request paths, used in turn
+        requests: total number of requests
+        concurrency: number of requests in flight at any time
+
+    Return:
+        summary: dictionary with the 'p50', 'p99' and 'max' latency in seconds, 'requestsPerSecond' and 'errors'
+    """
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def Fetch(path):
+        async with semaphore:
+            return await FetchServicePath(host, port, path)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[Fetch(paths[i % len(paths)]) for i in range(requests)])
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array([seconds for status, seconds in results])
+    summary = {'p50': np.percentile(latencies, 50),
+               'p99': np.percentile(latencies, 99),
+               'max': latencies.max(),
+               'requestsPerSecond': requests / elapsed,
+               'errors': sum(status != 200 for status, seconds in results)}
+    print('{:,} requests, {} at a time: p50 {:.1f} ms, p99 {:.1f} ms, max {:.1f} ms, {:.0f} requests per second, {} errors'.format(
+        requests, concurrency, 1000 * summary['p50'], 1000 * summary['p99'], 1000 * summary['max'],
+        summary['requestsPerSecond'], summary['errors']))
+
+    return summary
+
+#---------------end of functions for analysis service------------------
+
+#---------------start of functions for benchmarks------------------
+
+def SyntheticPriceHistory(days, seed = 0, frequency = 'B'):
+    """
+    Build a random walk price history shaped like a yahoo finance download, for benchmarks.
+
+    Args:
+        days: number of bars
+        seed: seed of the random generator
+        frequency: pandas frequency of the bars, business days by default ('min' for minute bars)
+
+    Return:
+        df: dataframe with an 'Adj Close' column indexed by date
+    """
+
+    generator = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(generator.normal(0, 0.01, days)))
+    dates = pd.date_range('2000-01-03', periods = days, freq = frequency, name = 'Date')
+
+    return pd.DataFrame({'Adj Close': prices}, index = dates)
+
+def TwoPassRollingBands(prices, rolling_period, bandWidth = 2, blockSize = 65536):
+    """
+    Rolling mean and bands computed the slow exact way, mean first then squared deviations from it, to check the running sums against.
+
+    Args:
+        prices: adjusted close prices in date order
+        rolling_period: rolling period of the bands
+        bandWidth: number of standard deviations between the moving average and the bands
+        blockSize: number of windows computed at a time
+
+    Return:
+        sma, upper, lower: NumPy arrays with one value per price, NaN before the first full window
+    """
+
+    prices = np.asarray(prices, dtype = np.float64)
+    sma = np.full(len(prices), np.nan)
+    std = np.full(len(prices), np.nan)
+    for start in range(rolling_period - 1, len(prices), blockSize):
+        stop = min(start + blockSize, len(prices))
+        windows = np.lib.stride_tricks.sliding_window_view(prices[start - rolling_period + 1:stop], rolling_period)
+        mean = windows.mean(axis = 1)
+        sma[start:stop] = mean
+        std[start:stop] = np.sqrt(((windows - mean[:, np.newaxis]) ** 2).sum(axis = 1) / (rolling_period - 1))
+
+    return sma, sma + bandWidth * std, sma - bandWidth * std
+
+def CompareWithTwoPassBands(prices, outputs, rolling_period, bandWidth = 2):
+    """
+    Compare the bands and signals of BollingerBandCore() outputs with TwoPassRollingBands() on the same prices.
+
+    Return:
+        medianError, maxError: relative error of the band width, median and largest
+        differingSignals: number of signals differing from those of the exact bands
+    """
+
+    prices = np.asarray(prices, dtype = np.float64)
+    sma, upper, lower = TwoPassRollingBands(prices, rolling_period, bandWidth)
+    exact = upper - sma
+    error = np.abs((outputs['upper'] - outputs['sma']) - exact)[rolling_period - 1:] / exact[rolling_period - 1:]
+
+    # signals of the exact bands with the rules of BollingerBandCore(), from the first price with bands on both days
+    buy = (prices[1:] < lower[1:]) & (prices[:-1] > lower[:-1])
+    sell = (prices[1:] > upper[1:]) & (prices[:-1] < upper[:-1])
+    signal = np.where(sell, -1, np.where(buy, 1, 0))
+    differingSignals = int((signal[rolling_period - 1:] != outputs['signal'][rolling_period:]).sum())
+
+    return float(np.median(error)), float(error.max()), differingSignals
+
+def SyntheticStatements(years = 4, lastYear = 2019, seed = 0):
+    """
+    Build random statements shaped like FundamentalsProvider.GetStatements(), for benchmarks.
+
+    Args:
+        years: number of yearly columns of every statement
+        lastYear: year of the latest column
+        seed: seed of the random generator
+
+    Return:
+        statements: dictionary of statement name -> dataframe, only holding the accounts of RATIO_ACCOUNTS
+    """
+
+    generator = np.random.default_rng(seed)
+    dates = ['31/12/{}'.format(year) for year in range(lastYear, lastYear - years, -1)]
+    statements = {}
+    for statement, accounts in RATIO_ACCOUNTS.items():
+        # like yahoo finance, the income statement starts with the trailing twelve months
+        periods = ['ttm'] + dates if statement == 'income statement' else dates
+        df = pd.DataFrame({'Date': periods}, index = range(1, len(periods) + 1))
+        for account in accounts:
+            df[account] = generator.uniform(1000, 100000, len(periods)).round()
+        statements[statement] = df
+
+    return statements
+
+def StatementPageHtml(rows, embedded = None):
+    """
+    html of a statement page laid out like yahoo finance, one div per row and one span per cell, None for an empty cell
+
+    embedded, if given, is put in the page as the JSON of its "root.App.main = {...};" script.
+    """
+
+    lines = ['<html><body><div>']
+    for row in rows:
+        cells = ''.join("<div class='D(tbc)'>{}</div>".format('<span>{}</span>'.format(cell) if cell is not None else '') for cell in row)
+        lines.append("<div class='D(tbr) fi-row'>{}</div>".format(cells))
+    lines.append('</div>')
+    if embedded is not None:
+        lines.append('<script>root.App.main = {};\n}}(this));</script>'.format(json.dumps(embedded)))
+    lines.append('</body></html>')
+
+    return '\n'.join(lines)
+
+def WriteStatementFixtures(folder, tickers = ('AAA', 'BBB', 'CCC'), years = 4, extraAccounts = 40, seed = 0):
+    """
+    Write random statement pages shaped like yahoo finance ones, for the benchmarks which need saved pages.
+
+    Every ticker gets its three statement pages, named like '<ticker>-<page>.html' (e.g.
+    'AAA-balance-sheet.html'), with the accounts of RATIO_ACCOUNTS followed by extraAccounts
+    more, as real pages have. The income statement and cash flow start with a 'ttm' column,
+    the sum of 4 quarters. Like real pages, each one also embeds all three statements as
+    the data read by ParseStatementJson(), holding the same figures as the tables.
+
+    Args:
+        folder: folder to write the pages to, created if needed
+        tickers: tickers to write pages for
+        years: number of yearly columns
+        extraAccounts: number of accounts added after the ones needed for the ratios
+        seed: seed of the random generator
+    """
+
+    generator = np.random.default_rng(seed)
+    os.makedirs(folder, exist_ok = True)
+    yearEnds = [dt.datetime(2019 - i, 12, 31, tzinfo = dt.timezone.utc) for i in range(years)]
+    dates = [yearEnd.strftime('%d/%m/%Y') for yearEnd in yearEnds]
+    accountKeys = {name: key for key, name in EMBEDDED_ACCOUNT_NAMES.items()}
+
+    def Periods(keys, ends):
+        # embedded figures are in units, the tables show thousands
+        figures = generator.integers(-900000, 900000, (len(ends), len(keys)))
+        periods = [dict({'maxAge': 1, 'endDate': {'raw': int(end.timestamp()), 'fmt': end.strftime('%Y-%m-%d')}},
+                        **{key: {'raw': int(value) * 1000, 'fmt': '{:,}'.format(value)} for key, value in zip(keys, row)})
+                   for end, row in zip(ends, figures)]
+        return periods, figures
+
+    for ticker in tickers:
+        store = {}
+        tables = {}
+        for statement, (yearly, quarterly) in EMBEDDED_STATEMENTS.items():
+            names = RATIO_ACCOUNTS.get(statement, []) + ['Other item{}'.format(i) for i in range(extraAccounts)]
+            keys = [accountKeys[name] for name in RATIO_ACCOUNTS.get(statement, [])] + ['otherItem{}'.format(i) for i in range(extraAccounts)]
+            periods, figures = Periods(keys, yearEnds)
+            store[yearly[0]] = {yearly[1]: periods}
+            columns = dates
+            if quarterly is not None:
+                quarters, quarterFigures = Periods(keys, [yearEnds[0]] * 4)
+                store[quarterly[0]] = {quarterly[1]: quarters}
+                figures = np.vstack((quarterFigures.sum(axis = 0), figures))
+                columns = ['ttm'] + dates
+            tables[statement] = [['Breakdown'] + columns] + [[name] + ['{:,}'.format(value) for value in figures[:, i]]
+                                                             for i, name in enumerate(names)]
+
+        embedded = {'context': {'dispatcher': {'stores': {'QuoteSummaryStore': store}}}}
+        for statement, page in STATEMENT_PAGES.items():
+            with open(os.path.join(folder, '{}-{}.html'.format(ticker, page)), 'w') as pageFile:
+                pageFile.write(StatementPageHtml(tables[statement], embedded))
+
+def CheckBenchmark(failures, passed, check):
+    """record a check of a benchmark which did not pass, --benchmark exits with an error when a benchmark returns failures"""
+
+    if not passed:
+        print('  CHECK FAILED: ' + check)
+        failures.append(check)
+
+def BenchmarkChartRendering(runs = 100):
+    """
+    Redraw the equity curve chart many times and check that figure count and memory stay flat.
+
+    Render times are printed but not checked, they depend too much on what else runs on the machine.
+
+    Args:
+        runs: number of consecutive redraws
+
+    Return:
+        failures: the checks which did not pass
+    """
+
+    prices = SyntheticPriceHistory(2520)
+    backtests = [BacktestBollingerBand(prices.copy(), 10 + run % 40) for run in range(runs)]
+
+    figure = mplFigure.Figure(figsize = (6,4))
+    canvas = backendAgg.FigureCanvasAgg(figure)
+
+    # render times, without tracemalloc slowing the drawing down
+    renderTimes = []
+    for (df, bollingerReturn, buyAndHoldReturn) in backtests:
+        started = time.perf_counter()
+        DrawEquityCurves(figure, df, bollingerReturn, buyAndHoldReturn)
+        canvas.draw()
+        renderTimes.append(time.perf_counter() - started)
+
+    # memory still held after each run, once unreachable objects are collected
+    tracedMemory = []
+    tracemalloc.start()
+    for (df, bollingerReturn, buyAndHoldReturn) in backtests:
+        DrawEquityCurves(figure, df, bollingerReturn, buyAndHoldReturn)
+        canvas.draw()
+        gc.collect()
+        tracedMemory.append(tracemalloc.get_traced_memory()[0])
+    tracemalloc.stop()
+
+    liveFigures = sum(isinstance(item, mplFigure.Figure) for item in gc.get_objects())
+
+    print('Chart rendering over {} consecutive runs'.format(runs))
+    print('  render time, first 10 runs: {:.1f} ms per run'.format(1000 * np.mean(renderTimes[:10])))
+    print('  render time, last 10 runs:  {:.1f} ms per run'.format(1000 * np.mean(renderTimes[-10:])))
+    print('  memory held after run 10:   {:.2f} MB'.format(tracedMemory[9] / 1e6))
+    print('  memory held after run {}:  {:.2f} MB'.format(runs, tracedMemory[-1] / 1e6))
+    print('  live matplotlib figures:    {}'.format(liveFigures))
+
+    failures = []
+    CheckBenchmark(failures, liveFigures <= 1, 'one figure is reused for every run')
+    CheckBenchmark(failures, tracedMemory[-1] <= tracedMemory[9] + 1e6, 'memory held stays flat')
+
+    return failures
+
+def BenchmarkChartDecimation(sizes = (1000, 100000, 10000000), fullLimit = 1000000):
+    """
+    Compare the time to draw the equity curve chart with and without decimation for growing histories, best of 3 runs.
+
+    Args:
+        sizes: numbers of points of the equity curves
+        fullLimit: longest history also drawn with every point, drawing more is very slow
+    """
+
+    # first drawing loads the fonts and caches of matplotlib
+    figure = mplFigure.Figure(figsize = (6,4))
+    DrawEquityCurves(figure, SyntheticPriceHistory(10).assign(**{'Buy & Hold Equity': 1.0, 'Bollinger Band Strategy Equity': 1.0}), 1.0, 1.0)
+    backendAgg.FigureCanvasAgg(figure).draw()
+
+    print('{:>12} {:>18} {:>18} {:>14}'.format('points', 'decimated (ms)', 'every point (ms)', 'points drawn'))
+    for size in sizes:
+        generator = np.random.default_rng(0)
+        equity = np.exp(np.cumsum(generator.normal(0, 0.001, (size, 2)), axis = 0))
+        df = pd.DataFrame({'Buy & Hold Equity': equity[:, 0], 'Bollinger Band Strategy Equity': equity[:, 1]},
+                          index = pd.date_range('2000-01-03', periods = size, freq = 'min', name = 'Date'))
+
+        times = []
+        for decimate in [True, False]:
+            if not decimate and size > fullLimit:
+                times.append(np.nan)
+                continue
+            runTimes = []
+            for run in range(3):
+                figure = mplFigure.Figure(figsize = (6,4))
+                canvas = backendAgg.FigureCanvasAgg(figure)
+                started = time.perf_counter()
+                DrawEquityCurves(figure, df, 1.0, 1.0, decimate)
+                canvas.draw()
+                runTimes.append(time.perf_counter() - started)
+            times.append(min(runTimes))
+            if decimate:
+                pointsDrawn = len(figure.axes[0].lines[0].get_xdata())
+
+        print('{:12,} {:18.1f} {:18.1f} {:14,}'.format(size, 1000 * times[0], 1000 * times[1], pointsDrawn))
+
+def BenchmarkStartup(reportPath = 'startup_report.txt'):
+    """
+    Measure the time to first window of the GUI and write an import time report.
+
+    The script is started again with -X importtime and --startup-probe, which shows the
+    window once and exits. The time until the window is shown and the slowest imports on
+    the way there are written to the report, together with the import time of the heavy
+    modules which are deferred until the first analysis.
+
+    Args:
+        reportPath: text file the report is written to
+    """
+
+    def SlowestImports(importTimeOutput, count = 15):
+        # lines look like "import time:      1234 |      5678 |   package"
+        imports = []
+        for line in importTimeOutput.splitlines():
+            fields = line.split('|')
+            if line.startswith('import time:') and len(fields) == 3 and fields[1].strip().isdigit():
+                imports.append((int(fields[1]), fields[2].rstrip()))
+        imports.sort(reverse = True)
+        return imports[:count]
+
+    started = time.perf_counter()
+    probe = subprocess.Popen([sys.executable, '-X', 'importtime', os.path.abspath(__file__), '--startup-probe'],
+                             stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True)
+    shown = probe.stdout.readline().strip() == 'window shown'
+    timeToWindow = time.perf_counter() - started
+    probeErrors = probe.communicate()[1]
+
+    deferredModules = [globals()[name].moduleName for name in HEAVY_MODULES if isinstance(globals()[name], LazyModule)]
+    started = time.perf_counter()
+    deferred = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + ', '.join(deferredModules)],
+                              stderr = subprocess.PIPE, universal_newlines = True)
+    timeToImportDeferred = time.perf_counter() - started
+
+    lines = ['888 Financial Advisor start up report, {}'.format(dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))]
+    if shown:
+        lines.append('time to first window: {:.3f} s'.format(timeToWindow))
+    else:
+        lines.append('the window could not be shown (no display?), probe output:')
+        lines.append(probeErrors.strip().splitlines()[-1] if probeErrors.strip() else '')
+    lines.append('')
+    lines.append('slowest imports before the window, cumulative ms:')
+    for (microseconds, name) in SlowestImports(probeErrors):
+        lines.append('{:10.1f}  {}'.format(microseconds / 1000, name))
+    lines.append('')
+    lines.append('deferred modules ({}) take {:.3f} s to start and import:'.format(', '.join(deferredModules), timeToImportDeferred))
+    for (microseconds, name) in SlowestImports(deferred.stderr):
+        lines.append('{:10.1f}  {}'.format(microseconds / 1000, name))
+
+    report = '\n'.join(lines) + '\n'
+    with open(reportPath, 'w') as reportFile:
+        reportFile.write(report)
+    print(report)
+
+def BenchmarkStatementParsers(fixtureDir = None, repeats = 20):
+    """
+    Compare ParseStatementTable() with the original ParseTable() on a corpus of saved statement pages.
+
+    The original parser is timed together with the comma stripping and number conversion
+    that CalculateRatio() used to do, so both sides end with the same float figures,
+    which are also checked to be equal.
+
+    Args:
+        fixtureDir: folder of statement pages saved from yahoo finance, every file is used,
+            pages written by WriteStatementFixtures() into a temporary folder if not given
+        repeats: number of times each page is parsed by each parser
+
+    Return:
+        failures: the checks which did not pass
+    """
+
+    if fixtureDir is None:
+        with tempfile.TemporaryDirectory() as fixtureDir:
+            WriteStatementFixtures(fixtureDir)
+            return BenchmarkStatementParsers(fixtureDir, repeats)
+
+    failures = []
+
+    def ParseTableAndConvert(content):
+        dfOrg, dfRot = ParseTable(content)
+        return dfRot.iloc[:, 1:].apply(lambda column: pd.to_numeric(column.str.replace(',', ''), errors = 'coerce'))
+
+    names = sorted(os.listdir(fixtureDir))
+    print('Statement parsing over {} saved pages in {}, best of {} runs'.format(len(names), fixtureDir, repeats))
+    print('{:40} {:>12} {:>12} {:>8}'.format('page', 'xpath (ms)', 'single (ms)', 'speedup'))
+
+    totals = [0.0, 0.0]
+    for name in names:
+        with open(os.path.join(fixtureDir, name), 'rb') as page:
+            content = page.read()
+
+        timings = []
+        for parser in [ParseTableAndConvert, ParseStatementTable]:
+            best = float('inf')
+            for repeat in range(repeats):
+                started = time.perf_counter()
+                parsed = parser(content)
+                best = min(best, time.perf_counter() - started)
+            timings.append(best)
+
+            if parser is ParseTableAndConvert:
+                expected = parsed.loc[:, ~parsed.columns.duplicated()]
+            else:
+                same = np.allclose(parsed[expected.columns].to_numpy(float), expected.to_numpy(float), equal_nan = True)
+                CheckBenchmark(failures, same, '{}: both parsers give the same figures'.format(name))
+
+        totals[0] += timings[0]
+        totals[1] += timings[1]
+        print('{:40} {:12.2f} {:12.2f} {:7.1f}x'.format(name[:40], 1000 * timings[0], 1000 * timings[1], timings[0] / timings[1]))
+
+    if names:
+        print('{:40} {:12.2f} {:12.2f} {:7.1f}x'.format('total', 1000 * totals[0], 1000 * totals[1], totals[0] / totals[1]))
+
+    return failures
+
+def BenchmarkFundamentalsProviders(fixtureDir = None, repeats = 20):
+    """
+    Compare the parse time per statement of the embedded data path with the XPath path on saved statement pages.
+
+    ParseStatementTable() reads one statement per page while ParseStatementJson() reads
+    the three statements from any one page, so its time per statement is a third of its
+    time per page. Where the file name tells which statement the page shows (e.g.
+    'D05.SI-balance-sheet.html'), both tables are also checked to hold the same figures.
+
+    Args:
+        fixtureDir: folder of statement pages saved from yahoo finance, every file is used,
+            pages written by WriteStatementFixtures() into a temporary folder if not given
+        repeats: number of times each page is parsed by each parser
+
+    Return:
+        failures: the checks which did not pass
+    """
+
+    if fixtureDir is None:
+        with tempfile.TemporaryDirectory() as fixtureDir:
+            WriteStatementFixtures(fixtureDir)
+            return BenchmarkFundamentalsProviders(fixtureDir, repeats)
+
+    failures = []
+
+    def Best(parser, content):
+        best = float('inf')
+        for repeat in range(repeats):
+            started = time.perf_counter()
+            parsed = parser(content)
+            best = min(best, time.perf_counter() - started)
+        return best, parsed
+
+    names = sorted(os.listdir(fixtureDir))
+    print('Parse time per statement over {} saved pages in {}, best of {} runs'.format(len(names), fixtureDir, repeats))
+    print('{:40} {:>12} {:>12} {:>8} {:>6}'.format('page', 'xpath (ms)', 'json (ms)', 'speedup', 'same'))
+
+    totals = [0.0, 0.0]
+    for name in names:
+        with open(os.path.join(fixtureDir, name), 'rb') as page:
+            content = page.read()
+
+        xpathTime, table = Best(ParseStatementTable, content)
+        try:
+            jsonTime, statements = Best(ParseStatementJson, content)
+        except ValueError:
+            print('{:40} {:12.2f} {:>12}'.format(name[:40], 1000 * xpathTime, 'no data'))
+            continue
+        jsonTime = jsonTime / len(statements)
+
+        # the statement shown by the page, from the file name
+        same = ''
+        for statement, pageName in STATEMENT_PAGES.items():
+            if os.path.splitext(name)[0].endswith(pageName):
+                columns = table.columns.intersection(statements[statement].columns)
+                same = 'yes' if (len(table) == len(statements[statement]) and table['Date'].equals(statements[statement]['Date'])
+                                 and np.allclose(table[columns[1:]].to_numpy(float), statements[statement][columns[1:]].to_numpy(float),
+                                                 equal_nan = True)) else 'no'
+                CheckBenchmark(failures, same == 'yes', '{}: the table and the embedded data hold the same figures'.format(name))
+
+        totals[0] += xpathTime
+        totals[1] += jsonTime
+        print('{:40} {:12.2f} {:12.2f} {:7.1f}x {:>6}'.format(name[:40], 1000 * xpathTime, 1000 * jsonTime, xpathTime / jsonTime, same))
+
+    if totals[1] > 0:
+        print('{:40} {:12.2f} {:12.2f} {:7.1f}x'.format('total', 1000 * totals[0], 1000 * totals[1], totals[0] / totals[1]))
+
+    return failures
+
+def BenchmarkStreaming(ticks = 1000000, symbols = 100, rolling_period = 20):
+    """
+    Check the streaming engine against the batch backtest and measure its updates per second.
+
+    Args:
+        ticks: number of prices fed to the engine for the throughput measurement
+        symbols: number of symbols the prices are spread over
+        rolling_period: rolling period of the bands
+
+    Return:
+        failures: the checks which did not pass
+    """
+
+    # replay a history long enough to move the anchor of the running sums a few times and compare with the batch backtests
+    prices = SyntheticPriceHistory(3 * BAND_ANCHOR_PERIOD + 1000)
+    signal, position = ReplayStream(prices['Adj Close'], rolling_period)
+    outputs = BollingerBandCore(prices['Adj Close'].to_numpy(), rolling_period)[0]
+    print('Replay of {} prices against the batch backtests'.format(len(prices)))
+    identical = np.array_equal(signal, outputs['signal']) and np.array_equal(position, outputs['position'])
+    print('  identical to BollingerBandCore(): signals {}, positions {}'.format(
+        np.array_equal(signal, outputs['signal']), np.array_equal(position, outputs['position'])))
+    pandasDf, bollingerReturn, buyAndHoldReturn = BacktestBollingerBandPandas(prices.copy(), rolling_period)
+    print('  signals differing from the pandas backtest: {}'.format(int((signal != pandasDf['signal'].to_numpy()).sum())))
+
+    # throughput over many symbols
+    generator = np.random.default_rng(0)
+    tickPrices = (100 + np.cumsum(generator.normal(0, 0.1, ticks))).tolist()
+    tickSymbols = ['S{}'.format(i % symbols) for i in range(ticks)]
+    states = {}
+
+    started = time.perf_counter()
+    for symbol, price in zip(tickSymbols, tickPrices):
+        OnTick(states, symbol, price, rolling_period)
+    elapsed = time.perf_counter() - started
+
+    print('{} updates over {} symbols in {:.2f}s: {:,.0f} updates per second'.format(ticks, symbols, elapsed, ticks / elapsed))
+
+    failures = []
+    CheckBenchmark(failures, identical, 'the replayed stream is identical to BollingerBandCore()')
+
+    return failures
+
+def BenchmarkBacktestCore(bars = 1000000, rolling_period = 20):
+    """
+    Compare time and peak memory of the pandas backtest with BollingerBandCore() in float64 and float32.
+
+    Args:
+        bars: number of prices backtested
+        rolling_period: rolling period of the bands
+    """
+
+    prices = SyntheticPriceHistory(bars, frequency = 'min')
+
+    def RunPandas():
+        BacktestBollingerBandPandas(prices.copy(), rolling_period)
+
+    def RunCore64():
+        BollingerBandCore(prices['Adj Close'].to_numpy(), rolling_period, dtype = 'float64')
+
+    def RunCore32():
+        BollingerBandCore(prices['Adj Close'].to_numpy(), rolling_period, dtype = 'float32')
+
+    print('Backtest of {:,} prices, figures per million prices'.format(bars))
+    print('{:28} {:>10} {:>16}'.format('path', 'time (ms)', 'peak memory (MB)'))
+    for name, run in [('pandas columns', RunPandas), ('array core, float64', RunCore64), ('array core, float32', RunCore32)]:
+        run() # warm up
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print('{:28} {:10.1f} {:16.1f}'.format(name, 1000 * elapsed * 1e6 / bars, peak / 1e6 * 1e6 / bars))
+
+def BenchmarkSweep(days = 2520, rollingPeriods = range(5, 255, 5), bandWidths = (1.5, 2, 2.5, 3)):
+    """
+    Compare the parameter sweep with backtesting every rolling period in a loop, and check both give the same results.
+
+    The loop runs BacktestBollingerBandPandas(), the way the strategy was first written,
+    which only has bands 2 standard deviations wide, so it is timed and checked against
+    the sweep over those grid points. The whole grid is timed too.
+
+    Args:
+        days: number of daily prices
+        rollingPeriods: rolling periods of the grid
+        bandWidths: band widths of the grid, 2 among them
+
+    Return:
+        failures: the checks which did not pass
+    """
+
+    prices = SyntheticPriceHistory(days)
+    values = prices['Adj Close'].to_numpy()
+
+    started = time.perf_counter()
+    loop = [BacktestBollingerBandPandas(prices.copy(), rolling_period)[0] for rolling_period in rollingPeriods]
+    loopTime = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sweep = ComputeBollingerSweep(values, rollingPeriods, (2,))
+    sweepTime = time.perf_counter() - started
+
+    started = time.perf_counter()
+    ComputeBollingerSweep(values, rollingPeriods, bandWidths)
+    gridTime = time.perf_counter() - started
+
+    # the pandas backtest has no position before its first signal
+    differingPositions = sum(int((sweep['position'][i] != df['position'].fillna(0).to_numpy()).sum()) for i, df in enumerate(loop))
+    loopReturns = np.array([(1 + df['Bollinger Band Strategy Returns'].fillna(0)).prod() for df in loop])
+    sameReturns = np.allclose(sweep['bollingerReturn'][:, 0], loopReturns, rtol = 1e-9)
+
+    print('Sweep of {} rolling periods over {:,} days'.format(len(rollingPeriods), days))
+    print('  pandas backtest in a loop {:.1f} ms, sweep {:.1f} ms: {:.0f}x faster'.format(1000 * loopTime, 1000 * sweepTime, loopTime / sweepTime))
+    print('  whole grid of {} band widths {:.1f} ms'.format(len(bandWidths), 1000 * gridTime))
+    print('  positions differing from the loop: {}, same final returns: {}'.format(differingPositions, sameReturns))
+
+    failures = []
+    CheckBenchmark(failures, differingPositions == 0, 'the sweep takes the positions of the pandas backtest')
+    CheckBenchmark(failures, sameReturns, 'the sweep gives the returns of the pandas backtest')
+
+    return failures
+
+def BenchmarkOutOfCore(bars = 20000000, verifyBars = 2000000, chunkSize = 1000000, rolling_period = 20, checkedBars = 100000):
+    """
+    Check the out-of-core backtest against an in-memory run and exact bands, and show its memory stays bounded.
+
+    A history small enough for memory is backtested both ways and every output compared
+    bit for bit. A much longer one is then backtested out of core only, tracing the peak
+    memory allocated, which should stay near the size of one chunk whatever the length.
+    The bands of both are checked against TwoPassRollingBands(), the long one over its
+    last checkedBars prices where running sums lose the most precision.
+
+    Args:
+        bars: number of minute bars of the long history
+        verifyBars: number of minute bars of the history checked against the in-memory run
+        chunkSize: number of prices backtested at a time
+        rolling_period: rolling period of the bands
+        checkedBars: number of last bars of the long history checked against the exact bands
+
+    Return:
+        failures: the checks which did not pass
+    """
+
+    failures = []
+
+    def LoadOutputs(folder, first = 0):
+        return {name: np.load(os.path.join(folder, name + '.npy'), mmap_mode = 'r')[first:] for name in ['sma', 'upper', 'signal']}
+
+    with tempfile.TemporaryDirectory() as storeDir:
+        # bit for bit check against one in-memory run
+        WriteSyntheticColumns('VERIFY', verifyBars, storeDir, chunkSize)
+        summary = BacktestOutOfCore('VERIFY', rolling_period, storeDir = storeDir, chunkSize = chunkSize,
+                                    outputDir = os.path.join(storeDir, 'VERIFY-outputs'))
+        prices = OpenStoredColumn('VERIFY', 'Adj Close', storeDir)
+        outputs, state = BollingerBandCore(prices, rolling_period)
+        identical = all(np.array_equal(np.load(os.path.join(storeDir, 'VERIFY-outputs', name + '.npy')), values, equal_nan = True)
+                        for name, values in outputs.items())
+        medianError, maxError, differingSignals = CompareWithTwoPassBands(prices, outputs, rolling_period)
+        print('Out-of-core against in-memory backtest of {:,} bars in chunks of {:,}'.format(verifyBars, chunkSize))
+        print('  every output identical: {}, final returns {:.6f} / {:.6f}'.format(
+            identical, summary['bollingerReturn'], state['bollingerEquity']))
+        print('  band width against exact bands: median relative error {:.1e}, largest {:.1e}, signals differing {:,}'.format(
+            medianError, maxError, differingSignals))
+        CheckBenchmark(failures, identical, 'the out-of-core outputs are identical to the in-memory ones')
+        CheckBenchmark(failures, maxError < 1e-6, 'the bands stay within 1e-6 of the exact ones')
+        del outputs
+
+        # long history, out of core only
+        WriteSyntheticColumns('LONG', bars, storeDir, chunkSize)
+        tracemalloc.start()
+        started = time.perf_counter()
+        summary = BacktestOutOfCore('LONG', rolling_period, storeDir = storeDir, chunkSize = chunkSize,
+                                    outputDir = os.path.join(storeDir, 'LONG-outputs'))
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('Out-of-core backtest of {:,} bars ({:.0f} MB of prices on disk), outputs written to disk'.format(bars, bars * 8 / 1e6))
+        print('  {:.1f}s, peak memory allocated {:.1f} MB, Bollinger Band return {:.4f}, buy and hold return {:.4f}'.format(
+            elapsed, peak / 1e6, summary['bollingerReturn'], summary['buyAndHoldReturn']))
+
+        # the first checked bar has a full window of prices before it
+        first = bars - checkedBars - rolling_period + 1
+        prices = np.array(OpenStoredColumn('LONG', 'Adj Close', storeDir)[first:])
+        medianError, maxError, differingSignals = CompareWithTwoPassBands(prices, LoadOutputs(os.path.join(storeDir, 'LONG-outputs'), first),
+                                                                          rolling_period)
+        print('  last {:,} bars against exact bands: median relative error {:.1e}, largest {:.1e}, signals differing {:,}'.format(
+            checkedBars, medianError, maxError, differingSignals))
+        CheckBenchmark(failures, maxError < 1e-6, 'the bands of the long history stay within 1e-6 of the exact ones')
+
+    return failures
+
+def BenchmarkPortfolio(days = 2520, assetCounts = (10, 100, 1000), rolling_period = 20):
+    """
+    Time the portfolio backtest for a growing number of assets and check it against BollingerBandCore().
 
-    # for year in between user input start and end date
-    for year in userInput:
-        # if ratois for the year is avaliable
-        if year in list(bsAnalysis['Year']):
-            # prepare output message for BS_analysis--current ratio
-            dateNumber = list(bsAnalysis['Year']).index(year) + 1
-            msg = msg + "The Current Ratio for year {} is {:.2f}".format(year,bsAnalysis['Current Ratio'][dateNumber]) + '\n'
-        # if ratois for the year is not avaliable
-        else:
-            unavailableYear.append(year)
-            
-    # inform users which year's ratio is unavailable
-    if unavailableYear == []:
-        print()
-    else:
-        msg = msg + "Data needed to calculate current ratio for year{} is unavailable".format(unavailableYear) + '\n'
+    Args:
+        days: number of daily prices of every asset
+        assetCounts: numbers of assets to time
+        rolling_period: rolling period of the bands
 
-    # Build a table for Income Statement Analysis
-    IS = list() # build list to record output
-    i = 0 # initiate i for building dataframe
-    printableIsDf = pd.DataFrame(IS) # store initial income statement analysis into printable form
+    Return:
+        failures: the checks which did not pass
+    """
 
-    # check each year with available data in analysis
-    for year in list(bsAnalysis['Year']):
-        i=i+1
-        # check whether that year is required by user, create output data frame
-        if year in userInput:
-            pd.DataFrame(isAnalysis.iloc[int(i),:]) 
-            IS.append(isAnalysis.iloc[int(i),:]) 
+    generator = np.random.default_rng(0)
+    allPrices = 100 * np.exp(np.cumsum(generator.normal(0, 0.01, (days, max(assetCounts))), axis = 0))
 
-    isDf = pd.DataFrame(IS) # record data to be output
-    isDf = isDf.drop(isDf.columns[0],axis=1) # drop the date column to avoid redundancy
-    isDf['Year'] = isDf['Year'].astype(int) # convert existing 'float' data type in 'Year' column to 'int' type
-    printableIsDf = printableIsDf.append(isDf) # transform into printable table
-    printableIsDf.index = np.arange(1, len(printableIsDf) + 1) # reset the index in such a way that when output to screen, the index shown starts from 1
+    backtest = ComputePortfolioBacktest(allPrices[:, :10], rolling_period)
+    identical = True
+    for asset in range(10):
+        outputs = BollingerBandCore(allPrices[:, asset], rolling_period)[0]
+        identical = identical and np.array_equal(outputs['position'], backtest['position'][:, asset]) \
+            and np.array_equal(outputs['bollingerEquity'], backtest['bollingerEquity'][:, asset])
+    print('Portfolio backtest of {:,} days, identical to BollingerBandCore() asset by asset: {}'.format(days, identical))
 
-    return msg,printableIsDf
+    print('{:>8} {:>10} {:>20}'.format('assets', 'time (ms)', 'time per asset (ms)'))
+    for assets in assetCounts:
+        prices = np.ascontiguousarray(allPrices[:, :assets])
+        ComputePortfolioBacktest(prices, rolling_period) # warm up
+        runs = max(1, 1000 // assets)
+        started = time.perf_counter()
+        for run in range(runs):
+            ComputePortfolioBacktest(prices, rolling_period)
+        elapsed = (time.perf_counter() - started) / runs
+        print('{:8} {:10.2f} {:20.4f}'.format(assets, 1000 * elapsed, 1000 * elapsed / assets))
 
-#---------------end of functions for financial ratios output------------------
+    failures = []
+    CheckBenchmark(failures, identical, 'the portfolio backtest is identical to BollingerBandCore() asset by asset')
+
+    return failures
+
+def BenchmarkWalkForward(days = 2520, rollingPeriods = range(5, 255, 5), processes = None):
+    """
+    Time a walk-forward analysis of 10 years of daily prices over 50 rolling periods.
+
+    Args:
+        days: number of daily prices
+        rollingPeriods: rolling periods to choose from
+        processes: number of worker processes, defaults to the number of CPUs
+
+    Return:
+        failures: the checks which did not pass
+    """
+
+    prices = SyntheticPriceHistory(days)['Adj Close'].to_numpy()
+
+    started = time.perf_counter()
+    folds, equity = WalkForwardAnalysis(prices, rollingPeriods, processes = processes)
+    elapsed = time.perf_counter() - started
+
+    serialStarted = time.perf_counter()
+    serialFolds, serialEquity = WalkForwardAnalysis(prices, rollingPeriods, processes = 1)
+    serialElapsed = time.perf_counter() - serialStarted
+
+    print(folds.to_string())
+    print('Walk-forward analysis of {:,} days over {} rolling periods, {} folds: {:.2f}s on a process pool, {:.2f}s in one process'.format(
+        days, len(rollingPeriods), len(folds), elapsed, serialElapsed))
+    identical = np.array_equal(equity['bollingerEquity'], serialEquity['bollingerEquity'])
+    print('Out-of-sample Bollinger Band return {:.4f}, buy and hold return {:.4f}, identical in one process: {}'.format(
+        equity['bollingerEquity'][-1], equity['buyAndHoldEquity'][-1], identical))
+
+    failures = []
+    CheckBenchmark(failures, identical, 'the process pool gives the same equity as one process')
+
+    return failures
+
+def BenchmarkBootstrap(days = 2520, resamples = 10000, rolling_period = 20):
+    """
+    Time the significance tests with 10k resamples of 10 years of daily prices, in one process and on a process pool.
+
+    Args:
+        days: number of daily prices
+        resamples: number of resamples of each test
+        rolling_period: rolling period of the bands
+    """
+
+    df = BacktestBollingerBand(SyntheticPriceHistory(days), rolling_period)[0]
+    dailyReturns = df['Buy & Hold Returns'].to_numpy()
+    positions = df['position'].to_numpy()
+
+    for name, processes in [('one process', 1), ('process pool', None)]:
+        started = time.perf_counter()
+        summary = BootstrapSignificance(dailyReturns, positions, resamples, processes = processes)
+        elapsed = time.perf_counter() - started
+        print('{:12} {:.2f}s for {:,} resamples of {:,} days in each test'.format(name, elapsed, resamples, days))
+
+    print('Bollinger Band minus buy and hold return {:.4f}, 95% interval {:.4f} to {:.4f}'.format(
+        summary['excessReturn'], *summary['confidenceInterval']))
+    print('p-value block bootstrap {:.4f}, random entry {:.4f}'.format(summary['blockPValue'], summary['randomEntryPValue']))
+
+def BenchmarkService(tickers = 20, requests = 2000, concurrency = 50):
+    """
+    Load test the analysis service on synthetic price histories, first with an empty cache then a warm one.
+
+    Args:
+        tickers: number of synthetic tickers, every one backtested for 3 rolling periods
+        requests: number of requests of each load test
+        concurrency: number of requests in flight at any time
+    """
+
+    with tempfile.TemporaryDirectory() as storeDir:
+        for i in range(tickers):
+            df = SyntheticPriceHistory(2520, seed = i)
+            WriteStoredPrices('T{}'.format(i), df, (df.index[0], df.index[-1] + pd.Timedelta(days = 1)), storeDir)
+        end = df.index[-1].strftime('%Y-%m-%d') # the whole range is stored, nothing is downloaded
+        paths = ['/backtest?ticker=T{}&start=2000-01-03&end={}&rolling={}'.format(i, end, rolling)
+                 for i in range(tickers) for rolling in (10, 20, 50)]
+
+        async def Run():
+            service = NewServiceState(storeDir = storeDir)
+            service['symbolIndexPath'] = os.path.join(storeDir, 'symbol_index.npy') # no index, the synthetic tickers are not checked
+            service['symbolListPath'] = os.path.join(storeDir, 'symbols.txt')
+            server, service = await StartService('127.0.0.1', 0, service)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                print('Cold cache, {} distinct requests:'.format(len(paths)))
+                await LoadTestService('127.0.0.1', port, paths, requests, concurrency)
+                print('Warm cache:')
+                await LoadTestService('127.0.0.1', port, paths, requests, concurrency)
+            print('Computations: {computations}, coalesced: {coalesced}, cache hits: {cache hits}'.format(**service['stats']))
+
+        asyncio.run(Run())
+
+def BenchmarkSymbolIndex(symbols = 100000, lookups = 100000):
+    """
+    Time building and loading the ticker index, validating tickers and finding autocompletion candidates.
+
+    Args:
+        symbols: number of synthetic tickers in the index
+        lookups: number of validations and prefix searches timed
+    """
+
+    generator = np.random.default_rng(0)
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    tickers = [''.join(generator.choice(letters, generator.integers(1, 6))) + ('.SI' if i % 3 == 0 else '') for i in range(symbols)]
+
+    with tempfile.TemporaryDirectory() as folder:
+        listPath = os.path.join(folder, 'symbols.txt')
+        indexPath = os.path.join(folder, 'symbol_index.npy')
+        with open(listPath, 'w') as listFile:
+            listFile.write('\n'.join(tickers))
+
+        started = time.perf_counter()
+        BuildSymbolIndex(listPath, indexPath)
+        built = time.perf_counter() - started
+
+        started = time.perf_counter()
+        index = np.load(indexPath, mmap_mode = 'r')
+        loaded = time.perf_counter() - started
+
+        queries = [tickers[i] if i % 2 == 0 else tickers[i] + 'Q' for i in range(min(lookups, symbols))]
+        started = time.perf_counter()
+        known = sum(IsKnownSymbol(index, query) for query in queries)
+        validated = (time.perf_counter() - started) / len(queries)
+
+        started = time.perf_counter()
+        for query in queries:
+            SymbolsWithPrefix(index, query[:2])
+        completed = (time.perf_counter() - started) / len(queries)
+
+    print('Ticker index of {:,} tickers ({:,} distinct)'.format(symbols, len(index)))
+    print('  build {:.1f} ms, load {:.3f} ms'.format(1000 * built, 1000 * loaded))
+    print('  validation {:.1f} us per ticker ({:,} of {:,} known), autocompletion {:.1f} us per prefix'.format(
+        1e6 * validated, known, len(queries), 1e6 * completed))
+
+def BenchmarkIncrementalBacktest(bars = 2000000, extensions = 10, newBars = 1000, rolling_period = 20):
+    """
+    Time extending a backtest by a few bars against recomputing it, and check both give the same outputs.
+
+    Args:
+        bars: number of prices of the first backtest
+        extensions: number of times the end date is moved later
+        newBars: number of prices added by every extension
+        rolling_period: rolling period of the bands
+
+    Return:
+        failures: the checks which did not pass
+    """
+
+    prices = SyntheticPriceHistory(bars + extensions * newBars, frequency = 'min')['Adj Close']
+    backtestCache.clear()
+
+    started = time.perf_counter()
+    IncrementalBollingerBandCore('SYNTHETIC', prices.iloc[:bars], rolling_period)
+    first = time.perf_counter() - started
+
+    extendTimes = []
+    fullTimes = []
+    identical = True
+    for extension in range(1, extensions + 1):
+        extended = prices.iloc[:bars + extension * newBars]
+
+        started = time.perf_counter()
+        outputs, state = IncrementalBollingerBandCore('SYNTHETIC', extended, rolling_period)
+        extendTimes.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        fullOutputs, fullState = BollingerBandCore(extended.to_numpy(), rolling_period)
+        fullTimes.append(time.perf_counter() - started)
+
+        identical = identical and state['bollingerEquity'] == fullState['bollingerEquity'] and all(
+            np.array_equal(outputs[name], fullOutputs[name], equal_nan = True) for name in fullOutputs)
+
+    print('Backtest of {:,} prices extended {} times by {:,} prices'.format(bars, extensions, newBars))
+    print('  first backtest {:.1f} ms, extension {:.3f} ms, full recompute {:.1f} ms'.format(
+        1000 * first, 1000 * np.median(extendTimes), 1000 * np.median(fullTimes)))
+    print('  outputs identical to a full recompute: {}'.format(identical))
+
+    failures = []
+    CheckBenchmark(failures, identical, 'extended backtests are identical to a full recompute')
+
+    return failures
+
+def BenchmarkPrecomputedStore(tickers = 20, lookups = 100):
+    """
+    Time the precompute job on synthetic tickers, then reading its results against computing them live.
+
+    The live path times only the price store read, the backtest and the ratios, the
+    statements being already in memory; a real GUI run also waits for yahoo finance.
+
+    Args:
+        tickers: number of synthetic tickers of the watchlist
+        lookups: number of GUI queries timed on each path
+
+    Return:
+        failures: the checks which did not pass
+    """
+
+    with tempfile.TemporaryDirectory() as folder:
+        storeDir = os.path.join(folder, 'prices')
+        path = os.path.join(folder, 'precomputed.sqlite')
+        names = ['T{}'.format(i) for i in range(tickers)]
+        statements = {ticker: SyntheticStatements(seed = i) for i, ticker in enumerate(names)}
+        for i, ticker in enumerate(names):
+            df = SyntheticPriceHistory(2520, seed = i)
+            WriteStoredPrices(ticker, df, (df.index[0], df.index[-1] + pd.Timedelta(days = 1)), storeDir)
+        today = (df.index[-1] + pd.Timedelta(days = 1)).date() # the whole range is stored, nothing is downloaded
+
+        started = time.perf_counter()
+        RunPrecompute(names, today = today, path = path, storeDir = storeDir, getStatements = statements.get)
+        job = time.perf_counter() - started
+
+        queries = [(names[i % tickers], PrecomputeRanges(today)[i % len(PRECOMPUTE_RANGES_YEARS)],
+                    PRECOMPUTE_ROLLING_PERIODS[i % len(PRECOMPUTE_ROLLING_PERIODS)]) for i in range(lookups)]
+
+        readTimes = []
+        liveTimes = []
+        identical = True
+        for ticker, (startDate, endDate), rolling_period in queries:
+            started = time.perf_counter()
+            (df, bollingerReturn, buyAndHoldReturn) = ReadPrecomputedBacktest(ticker, startDate, endDate, rolling_period, path)
+            (isAnalysis, bsAnalysis) = ReadPrecomputedRatios(ticker, path)
+            readTimes.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            prices = LoadPriceHistory(ticker, startDate, endDate, storeDir)
+            (liveDf, liveBollingerReturn, liveBuyAndHoldReturn) = BacktestBollingerBand(prices, rolling_period)
+            (liveIsAnalysis, liveBsAnalysis) = CalculateRatio(ticker, statements[ticker])
+            liveTimes.append(time.perf_counter() - started)
+
+            identical = (identical and bollingerReturn == liveBollingerReturn and buyAndHoldReturn == liveBuyAndHoldReturn
+                         and df.equals(liveDf[df.columns]) and isAnalysis.equals(liveIsAnalysis) and bsAnalysis.equals(liveBsAnalysis))
+
+    print('Precomputed {} tickers x {} ranges x {} rolling periods in {:.2f}s'.format(
+        tickers, len(PRECOMPUTE_RANGES_YEARS), len(PRECOMPUTE_ROLLING_PERIODS), job))
+    print('  GUI query over {} lookups: precomputed {:.2f} ms, live {:.2f} ms'.format(
+        lookups, 1000 * np.median(readTimes), 1000 * np.median(liveTimes)))
+    print('  precomputed results identical to live ones: {}'.format(identical))
+
+    failures = []
+    CheckBenchmark(failures, identical, 'precomputed results are identical to live ones')
+
+    return failures
+
+def CheckOfflinePriceStore(days = 600):
+    """
+    Check the price store offline, against a csv file served by CsvPriceProvider().
+
+    A middle range is loaded first, then a wider one and then one inside what is stored:
+    every load must give the prices of the file, and the provider must only be asked for
+    the dates not stored yet.
+
+    Args:
+        days: number of daily prices in the file
+
+    Return:
+        failures: the checks which did not pass
+    """
+
+    failures = []
+    with tempfile.TemporaryDirectory() as folder:
+        SyntheticPriceHistory(days).to_csv(os.path.join(folder, 'SYN.csv'))
+        readCsv = CsvPriceProvider(folder)
+        dates = readCsv('SYN', '1900-01-01', '2100-01-01').index
+        fetched = []
+
+        def Provider(ticker, startDate, endDate):
+            fetched.append((pd.Timestamp(startDate), pd.Timestamp(endDate)))
+            return readCsv(ticker, startDate, endDate)
+
+        storeDir = os.path.join(folder, 'prices')
+        for first, last in [(200, 400), (100, 500), (150, 450)]:
+            fetchedBefore = len(fetched)
+            df = LoadPriceHistory('SYN', dates[first], dates[last], storeDir, Provider)
+            expected = readCsv('SYN', dates[first], dates[last])
+            CheckBenchmark(failures, df.index.equals(expected.index) and np.array_equal(df[expected.columns].to_numpy(), expected.to_numpy()),
+                           'the prices of bars {} to {} are the ones of the file'.format(first, last))
+            newFetches = fetched[fetchedBefore:]
+            if (first, last) == (100, 500):
+                CheckBenchmark(failures, len(newFetches) == 2 and all(end <= dates[200] or start >= dates[400] for start, end in newFetches),
+                               'only the missing leading and trailing dates are fetched')
+            if (first, last) == (150, 450):
+                CheckBenchmark(failures, len(newFetches) == 0, 'a stored range is served without fetching')
+
+    print('Price store against CsvPriceProvider(): {}'.format('failed' if failures else 'ok'))
+
+    return failures
+
+def CheckStatementStandIn(tickers = ('AAA', 'BBB')):
+    """
+    Check statement fetching against a local HTTP stand-in of yahoo finance serving pages written by WriteStatementFixtures().
+
+    Both web providers must give the figures of the saved pages, and an unknown ticker
+    must raise requests.HTTPError. The stand-in answers with an ETag and Last-Modified, and
+    with 304 Not Modified when asked for a page it has not changed, so that the
+    fundamentals cache is checked too, see CheckFundamentalsCache().
+
+    Args:
+        tickers: tickers served by the stand-in
+
+    Return:
+        failures: the checks which did not pass
+    """
+
+    failures = []
+    with tempfile.TemporaryDirectory() as folder:
+        WriteStatementFixtures(folder, tickers)
+
+        class StandInHandler(httpServer.BaseHTTPRequestHandler):
+            # /quote/<ticker>/<page> is answered with <ticker>-<page>.html
+            def do_GET(self):
+                parts = urllib.parse.urlsplit(self.path).path.split('/')
+                pagePath = os.path.join(folder, '{}-{}.html'.format(parts[2], parts[3])) if len(parts) == 4 else ''
+                if not os.path.exists(pagePath):
+                    self.send_error(404)
+                    return
+                etag = '"{}"'.format(os.stat(pagePath).st_mtime_ns)
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                with open(pagePath, 'rb') as page:
+                    content = page.read()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(content)))
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', self.date_time_string(os.path.getmtime(pagePath)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = httpServer.ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        threading.Thread(target = server.serve_forever, daemon = True).start()
+        try:
+            baseUrl = 'http://127.0.0.1:{}'.format(server.server_address[1])
+            ClearFundamentalsCache()
+            for ticker in tickers:
+                tables = YahooHtmlProvider(baseUrl).GetStatements(ticker)
+                embedded = YahooJsonProvider(baseUrl).GetStatements(ticker)
+                for statement, pageName in STATEMENT_PAGES.items():
+                    with open(os.path.join(folder, '{}-{}.html'.format(ticker, pageName)), 'rb') as page:
+                        expected = ParseStatementTable(page.read())
+                    CheckBenchmark(failures, tables[statement].equals(expected), '{} {} is fetched as saved'.format(ticker, statement))
+                    columns = expected.columns.intersection(embedded[statement].columns)
+                    CheckBenchmark(failures, expected['Date'].equals(embedded[statement]['Date']) and np.allclose(
+                                       expected[columns[1:]].to_numpy(float), embedded[statement][columns[1:]].to_numpy(float), equal_nan = True),
+                                   '{} {} is read from the embedded data as saved'.format(ticker, statement))
+
+            try:
+                YahooHtmlProvider(baseUrl).GetStatements('UNKNOWN')
+                unknownRejected = False
+            except requests.HTTPError:
+                unknownRejected = True
+            CheckBenchmark(failures, unknownRejected, 'an unknown ticker raises requests.HTTPError')
+
+            failures += CheckFundamentalsCache(baseUrl, 'http://localhost:{}'.format(server.server_address[1]), tickers)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print('Statements from a local stand-in of yahoo finance: {}'.format('failed' if failures else 'ok'))
+
+    return failures
+
+def CheckFundamentalsCache(baseUrl, otherBaseUrl, tickers):
+    """
+    Check the hit, miss, revalidated and eviction counters of the fundamentals cache against a stand-in of yahoo finance.
+
+    Args:
+        baseUrl: address of a stand-in answering with an ETag, and with 304 Not Modified to
+            a request for a page it has not changed, as the one of CheckStatementStandIn()
+        otherBaseUrl: another address of the same stand-in
+        tickers: two tickers served by the stand-in
+
+    Return:
+        failures: the checks which did not pass
+    """
+
+    global FUNDAMENTALS_CACHE_SIZE
+
+    failures = []
+    pages = len(STATEMENT_PAGES)
+    ClearFundamentalsCache()
+
+    def Fetch(ticker, url = baseUrl):
+        # changes of the counters while the statements of a ticker are fetched
+        before = GetFundamentalsCacheStats()
+        YahooHtmlProvider(url).GetStatements(ticker)
+        after = GetFundamentalsCacheStats()
+        return {name: after[name] - before[name] for name in after}
+
+    CheckBenchmark(failures, Fetch(tickers[0])['misses'] == pages, 'a first fetch misses the cache')
+    CheckBenchmark(failures, Fetch(tickers[0])['hits'] == pages, 'a second fetch is served from the cache')
+
+    # pages fetched longer than FUNDAMENTALS_CACHE_TTL ago
+    with fundamentalsCacheLock:
+        for entry in fundamentalsCache.values():
+            entry['fetchedAt'] -= FUNDAMENTALS_CACHE_TTL
+    CheckBenchmark(failures, Fetch(tickers[0])['revalidated'] == pages, 'an expired page is revalidated with a 304')
+    CheckBenchmark(failures, Fetch(tickers[0])['hits'] == pages, 'a revalidated page is fresh again')
+    CheckBenchmark(failures, Fetch(tickers[0], otherBaseUrl)['misses'] == pages, 'pages of another address are not served from the cache')
+
+    # a cache of one ticker's pages drops the two tickers' worth of pages already in it
+    size = FUNDAMENTALS_CACHE_SIZE
+    FUNDAMENTALS_CACHE_SIZE = pages
+    try:
+        evicted = Fetch(tickers[1])['evictions']
+        kept = Fetch(tickers[1])['hits']
+    finally:
+        FUNDAMENTALS_CACHE_SIZE = size
+    CheckBenchmark(failures, evicted == 2 * pages and kept == pages, 'the least recently used pages are evicted')
+
+    ClearFundamentalsCache()
+
+    return failures
+
+def BenchmarkChecks():
+    """
+    Run the offline checks and the checks of the benchmarks on small inputs, a quick way to test a change.
+
+    Return:
+        failures: the checks which did not pass
+    """
+
+    failures = []
+    failures += BenchmarkChartRendering()
+    failures += CheckOfflinePriceStore()
+    failures += CheckStatementStandIn()
+    failures += BenchmarkStatementParsers(repeats = 1)
+    failures += BenchmarkFundamentalsProviders(repeats = 1)
+    failures += BenchmarkSweep(rollingPeriods = range(5, 105, 5))
+    failures += BenchmarkStreaming(ticks = 10000)
+    failures += BenchmarkOutOfCore(bars = 1000000, verifyBars = 200000, chunkSize = 100000)
+    failures += BenchmarkPortfolio(assetCounts = (10,))
+    failures += BenchmarkWalkForward(rollingPeriods = range(5, 55, 5), processes = 2)
+    failures += BenchmarkIncrementalBacktest(bars = 100000, extensions = 3)
+    failures += BenchmarkPrecomputedStore(tickers = 3, lookups = 9)
+
+    if not failures:
+        print('All checks passed')
+
+    return failures
+
+# benchmarks which can be run with --benchmark NAME
+BENCHMARKS = {'render': BenchmarkChartRendering,
+              'decimation': BenchmarkChartDecimation,
+              'startup': BenchmarkStartup,
+              'parser': BenchmarkStatementParsers,
+              'providers': BenchmarkFundamentalsProviders,
+              'streaming': BenchmarkStreaming,
+              'core': BenchmarkBacktestCore,
+              'sweep': BenchmarkSweep,
+              'outofcore': BenchmarkOutOfCore,
+              'portfolio': BenchmarkPortfolio,
+              'walkforward': BenchmarkWalkForward,
+              'bootstrap': BenchmarkBootstrap,
+              'service': BenchmarkService,
+              'symbols': BenchmarkSymbolIndex,
+              'incremental': BenchmarkIncrementalBacktest,
+              'precomputed': BenchmarkPrecomputedStore,
+              'checks': BenchmarkChecks}
+
+#---------------end of functions for benchmarks------------------
 
 #---------------start of main program function------------------
 
@@ -410,12 +4624,222 @@ def ClearResultLabels():
     """clear all outputs on the GUI"""
 
     # clear all output labels on GUI
-    imageOutput.pack_forget() # it is declared global in CheckStock() to access it from here
+    if chartCanvas is not None:
+        chartCanvas.get_tk_widget().pack_forget()
     ratioAnalysisLabel_1.pack_forget()
     ratioAnalysisLabel_2.pack_forget()
+    timingLabel.pack_forget()
     
+class AnalysisCancelled(Exception):
+    """raised inside the analysis worker when its run has been cancelled or superseded"""
+
+analysisQueue = queue.Queue() # messages posted by the analysis worker, read on the Tk main thread
+analysisExecutor = concurrent.futures.ThreadPoolExecutor(max_workers = 2) # a superseded run may still be finishing its current stage
+currentRunId = 0 # id of the run whose results are shown, older runs are ignored
+currentCancelEvent = None # set to cancel the current run
+
+def AnalyseStock(runId, cancelEvent, ticker, startDate, endDate, rolling_period):
+    """
+    Run the whole analysis of CheckStock() in a worker thread.
+
+    Nothing here touches Tk: progress, errors and results are put on analysisQueue and
+    picked up by PollAnalysisQueue() on the main thread. The run stops at the next stage
+    once cancelEvent is set.
+
+    Args:
+        runId: id of this run
+        cancelEvent: threading.Event set when the run is cancelled or superseded
+        ticker: stock ticker.
+        startDate: intended start date for Bollinger Band strategy backtest
+        endDate: intended end date for Bollinger Band strategy backtest
+        rolling_period: intended rolling parameter for Bollinger Band strategy backtest
+    """
+
+    def ReportProgress(stage, percent):
+        if cancelEvent.is_set():
+            raise AnalysisCancelled()
+        analysisQueue.put(('progress', runId, (stage, percent)))
+
+    # time every stage of this run, the trace is written to TIMING_LOG_PATH once the run ends
+    trace = NewTrace(run = runId, ticker = ticker, rolling_period = rolling_period)
+    currentTrace.set(trace)
+    status = 'error'
+    profiler = None
+
+    try:
+        # a run overlapping the one being profiled is not profiled, Python allows one active profiler only
+        if profilePath and profileLock.acquire(blocking = False):
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        # results of the nightly precompute job are used as they are, only what is missing is computed live
+        with TimedStage('read precomputed'):
+            ratios = ReadPrecomputedRatios(ticker)
+            backtest = ReadPrecomputedBacktest(ticker, startDate, endDate, rolling_period)
+
+        # check if ticker is valid by fetching its yahoo finance statements, which are kept for the ratio analysis,
+        # a ticker with precomputed ratios is known to be valid
+        if ratios is None:
+            ReportProgress('fetching financial statements', 0)
+            try:
+                with TimedStage('fetch statements'):
+                    statements = fundamentalsProvider.GetStatements(ticker) # if the ticker is not valid, exception will be raised here
+            except Exception:
+                analysisQueue.put(('error', runId, 'please enter a valid ticker'))
+                return
+
+        # Bollinger Band strategy calculation starts
+        if backtest is None:
+            ReportProgress('downloading prices', 30)
+            with TimedStage('load prices'):
+                df = LoadPriceHistory(ticker, startDate, endDate)
+            ReportProgress('running Bollinger Band backtest', 60)
+            with TimedStage('backtest'):
+                backtest = BacktestBollingerBand(df, rolling_period, ticker = ticker)
+        (df, bollingerReturn, buyAndHoldReturn) = backtest
+
+        # Financial ratios calculation starts
+        ReportProgress('calculating financial ratios', 80)
+        with TimedStage('calculate ratios'):
+            (isAnalysis,bsAnalysis) = ratios if ratios is not None else CalculateRatio(ticker, statements)
+            (msg,printableIsDf) = GetRatioOutput(ticker,bsAnalysis,isAnalysis,startDate.year,endDate.year)
+
+        # the trace goes with the results, plotting on the main thread is its last stage
+        ReportProgress('plotting', 95)
+        analysisQueue.put(('done', runId, (df, bollingerReturn, buyAndHoldReturn, msg, printableIsDf, trace)))
+        status = 'done'
+
+    except AnalysisCancelled:
+        analysisQueue.put(('cancelled', runId, None))
+        status = 'cancelled'
+
+    except Exception as error:
+        analysisQueue.put(('error', runId, 'analysis failed: {}'.format(error)))
+
+    finally:
+        if profiler is not None:
+            DumpProfile(profiler, RunProfilePath(profilePath, runId))
+            profileLock.release()
+        if status != 'done':
+            WriteTrace(trace, status)
+
+def PollAnalysisQueue():
+    """handle the messages of the analysis worker on the Tk main thread, then check again shortly"""
+
+    while True:
+        try:
+            (kind, runId, payload) = analysisQueue.get_nowait()
+        except queue.Empty:
+            break
+
+        # results of a cancelled or superseded run are dropped
+        if runId != currentRunId:
+            if kind == 'done':
+                WriteTrace(payload[-1], 'superseded')
+            continue
+
+        if kind == 'progress':
+            (stage, percent) = payload
+            progressLabel.configure(text = stage + '...')
+            progressBar['value'] = percent
+        elif kind == 'done':
+            (*results, trace) = payload
+            token = currentTrace.set(trace)
+            try:
+                ShowResults(*results)
+            finally:
+                currentTrace.reset(token)
+            WriteTrace(trace, 'done')
+            ShowTimings(trace)
+            FinishRun('done')
+        elif kind == 'error':
+            FinishRun('')
+            tkinter.messagebox.showinfo('ERROR',payload)
+        elif kind == 'cancelled':
+            FinishRun('cancelled')
+
+    root.after(100, PollAnalysisQueue)
+
+def FinishRun(status):
+    """reset the progress indicator once a run has ended"""
+
+    global currentCancelEvent
+
+    currentCancelEvent = None
+    progressLabel.configure(text = status)
+    progressBar['value'] = 0
+    cancelBtn.configure(state = tk.DISABLED)
+
+def CancelAnalysis():
+    """cancel the running analysis, it stops at its next stage and its results are never shown"""
+
+    if currentCancelEvent is not None:
+        currentCancelEvent.set()
+        progressLabel.configure(text = 'cancelling...')
+
+def ShowResults(df, bollingerReturn, buyAndHoldReturn, msg, printableIsDf):
+    """show the results of a finished analysis, called on the Tk main thread"""
+
+    global chartFigure, chartCanvas
+
+    # one figure is reused for every run
+    if chartCanvas is None:
+        chartFigure = mplFigure.Figure(figsize = (6,4))
+        chartCanvas = backendTkAgg.FigureCanvasTkAgg(chartFigure, master = root)
+
+    # redraw the chart embedded in the window, Tk widgets are only touched on the main thread
+    with TimedStage('plot'):
+        DrawEquityCurves(chartFigure, df, bollingerReturn, buyAndHoldReturn)
+        chartCanvas.draw()
+    chartCanvas.get_tk_widget().pack(side=tk.LEFT)
+
+    # Display message of Balance Sheet Ratio
+    ratioAnalysisLabel_1.configure(text = msg)
+    ratioAnalysisLabel_1.pack()
+
+    # Display table of Income Statement Ratio
+    ratioAnalysisLabel_2.configure(text = printableIsDf)
+    ratioAnalysisLabel_2.pack()
+
+def ShowTimings(trace):
+    """show the time spent in every stage of a finished run, when 'show timings' is ticked"""
+
+    if showTimings.get():
+        timingLabel.configure(text = SummariseTrace(trace))
+        timingLabel.pack()
+    else:
+        timingLabel.pack_forget()
+
+def UpdateSuggestions(event = None):
+    """list the tickers of the index starting with what is typed in the stock entry box"""
+
+    index = GetSymbolIndex()
+    suggestions = SymbolsWithPrefix(index, stock.get()) if index is not None else []
+
+    # nothing to suggest, or the ticker is already complete
+    if suggestions == [] or suggestions == [stock.get().strip().upper()]:
+        suggestionList.pack_forget()
+        return
+
+    suggestionList.delete(0, tk.END)
+    for symbol in suggestions:
+        suggestionList.insert(tk.END, symbol)
+    suggestionList.configure(height = len(suggestions))
+    suggestionList.pack(after = stock)
+
+def ChooseSuggestion(event = None):
+    """put the ticker chosen in the suggestion list into the stock entry box"""
+
+    selection = suggestionList.curselection()
+    if selection:
+        stock.delete(0, tk.END)
+        stock.insert(0, suggestionList.get(selection[0]))
+    suggestionList.pack_forget()
+
 def CheckStock():
 
+    global currentRunId, currentCancelEvent
+
     # clear exsiting labels
     
     # at the start of this function, clear all exisitng output labels
@@ -427,20 +4851,14 @@ def CheckStock():
     except:
         pass
 
-    # check for ticker validity
-    
     ticker = stock.get() # get stock ticker from GUI entry box
 
     errorMessage = '' # create an empty string for error message
 
-    # check if ticker is valid through yahoo finance's balance sheet URL for that particular ticker
-    try:
-        test_url = 'https://sg.finance.yahoo.com/quote/' + ticker + '/balance-sheet?p=' + ticker
-        response = GetTable(test_url) # if the ticker is not valid, exception will be raised here
-
-    # if ticker is not valid, output error message through GUI
-    except:
-        errorMessage= 'please enter a valid ticker'
+    # unknown tickers are rejected from the local ticker index, before any download
+    index = GetSymbolIndex()
+    if index is not None and not IsKnownSymbol(index, ticker):
+        errorMessage = 'please enter a valid ticker'
         tkinter.messagebox.showinfo('ERROR',errorMessage)
         return # function stops here
 
@@ -488,91 +4906,266 @@ def CheckStock():
         tkinter.messagebox.showinfo('ERROR',errorMessage)
         return # function stops here
 
-    # Bollinger Band strategy calculation starts
-    ExecuteBollingerBandStrategy(ticker, startDate, endDate, rolling_period)
+    # a new request supersedes the one still running
+    if currentCancelEvent is not None:
+        currentCancelEvent.set()
 
-    # Financial ratios calculation starts
-    (isAnalysis,bsAnalysis)=CalculateRatio(ticker) 
+    # ticker validation, download, backtest and ratio analysis run in the background,
+    # results come back through PollAnalysisQueue()
+    currentRunId = currentRunId + 1
+    currentCancelEvent = threading.Event()
+    cancelBtn.configure(state = tk.NORMAL)
+    progressLabel.configure(text = 'starting...')
+    progressBar['value'] = 0
+    analysisExecutor.submit(AnalyseStock, currentRunId, currentCancelEvent, ticker, startDate, endDate, rolling_period)
+    
+def ParseArguments():
+    """read command line options, without any option the GUI is started"""
 
-    #----------------start to show result-----------------------------------
+    parser = argparse.ArgumentParser(description = '888 Financial Advisor')
+    parser.add_argument('--batch', metavar = 'WATCHLIST', help = 'analyse the tickers listed in this file without the GUI')
+    parser.add_argument('--start', help = 'start date of the batch backtest (e.g. 2018-01-02)')
+    parser.add_argument('--end', help = 'end date of the batch backtest (e.g. 2019-05-01)')
+    parser.add_argument('--rolling', type = int, default = 20, help = 'rolling period of the batch backtest')
+    parser.add_argument('--processes', type = int, help = 'number of worker processes for the batch, defaults to the number of CPUs')
+    parser.add_argument('--output', default = 'batch_results.csv', help = 'csv file the batch results are written to')
+    parser.add_argument('--portfolio', action = 'store_true', help = 'backtest the tickers of --batch as one portfolio')
+    parser.add_argument('--weights', help = 'comma separated weights of the portfolio tickers, equal weights by default')
+    parser.add_argument('--sweep', metavar = 'TICKER', help = 'rank every rolling period and band width of the Bollinger Band strategy on a ticker without the GUI')
+    parser.add_argument('--band-widths', default = '1.5,2,2.5,3', help = 'comma separated band widths of the sweep, in standard deviations')
+    parser.add_argument('--walk-forward', metavar = 'TICKER', help = 'choose the rolling period of a ticker by walk-forward analysis without the GUI')
+    parser.add_argument('--screen', metavar = 'WATCHLIST', help = 'screen and rank the tickers listed in this file on their financial ratios without the GUI')
+    parser.add_argument('--where', metavar = 'CONDITION', action = 'append', default = [],
+                        help = "ratio condition of the screen, e.g. 'ROE>=0.15' or 'Current Ratio<=2', can be repeated")
+    parser.add_argument('--rank-by', choices = SCREEN_RATIOS, default = 'ROE', help = 'ratio the screened tickers are ranked on, highest first')
+    parser.add_argument('--year', type = int, help = 'year screened, the latest year of each ticker by default')
+    parser.add_argument('--bootstrap', metavar = 'TICKER', help = 'test the Bollinger Band strategy of a ticker against luck without the GUI')
+    parser.add_argument('--profile', metavar = 'PATH', help = 'write cProfile statistics to this file, of the whole headless run, or of each GUI analysis with -run<N> added to the name')
+    parser.add_argument('--serve', metavar = 'PORT', type = int, help = 'serve backtests and ratios as JSON over HTTP on this port without the GUI')
+    parser.add_argument('--load-test', metavar = 'URL', help = 'load test a running service with this request URL, e.g. http://127.0.0.1:8888/backtest?...')
+    parser.add_argument('--requests', type = int, default = 1000, help = 'number of requests of the load test')
+    parser.add_argument('--concurrency', type = int, default = 50, help = 'number of requests of the load test in flight at any time')
+    parser.add_argument('--precompute', metavar = 'WATCHLIST', help = 'precompute the backtests and ratios of the tickers listed in this file for the GUI, e.g. every night')
+    parser.add_argument('--fundamentals', metavar = 'FILE', help = 'take the financial statements from this bulk file instead of yahoo finance')
+    parser.add_argument('--benchmark', choices = sorted(BENCHMARKS), help = 'run one of the benchmarks without the GUI')
+    parser.add_argument('--fixtures', help = 'folder of saved pages used by the benchmarks which need one')
+    parser.add_argument('--startup-probe', action = 'store_true', help = argparse.SUPPRESS)
+    args = parser.parse_args()
 
-    global imageOutput # declare global such that ClearResultLabels() able to access
+    if args.batch and not (args.start and args.end):
+        parser.error('--batch needs --start and --end')
+    if args.sweep and not (args.start and args.end):
+        parser.error('--sweep needs --start and --end')
+    if args.walk_forward and not (args.start and args.end):
+        parser.error('--walk-forward needs --start and --end')
+    if args.bootstrap and not (args.start and args.end):
+        parser.error('--bootstrap needs --start and --end')
+    if args.portfolio and not args.batch:
+        parser.error('--portfolio needs --batch')
+    try:
+        args.where = [ParseScreenFilter(condition) for condition in args.where]
+    except ValueError as error:
+        parser.error('--where: {}'.format(error))
 
-    #add a image
-    imageStored = tk.PhotoImage(file='rolling.png')
-    imageOutput = tk.Label(root, image=imageStored)
-    imageOutput.pack(side=tk.LEFT)
+    return args
 
-    # Get required output from ratio analysis
-    (msg,printableIsDf) = GetRatioOutput(ticker,bsAnalysis,isAnalysis,startDate.year,endDate.year)
+#---------------end of main program function------------------
 
-    # Display message of Balance Sheet Ratio
-    ratioAnalysisLabel_1.configure(text = msg)
-    ratioAnalysisLabel_1.pack()
+#---------------main body of code------------------
 
-    # Display table of Income Statement Ratio
-    ratioAnalysisLabel_2.configure(text = printableIsDf)
-    ratioAnalysisLabel_2.pack()    
+if __name__ == '__main__':
 
-    root.mainloop()
-    
-#---------------end of main program function------------------
+    args = ParseArguments()
 
-#---------------main body of code------------------
+    # offline financial statements
+    if args.fundamentals:
+        fundamentalsProvider = BulkFileProvider(args.fundamentals)
 
-#create a GUI window.
-root = tk.Tk()
-
-#set the title
-root.title("888 Financial Advisor v1.0")
-
-#set the size
-root.geometry("1500x800")
-
-#add a label for the start text.
-welcomeLabel_1 = tk.Label(root, text = '888 Financial Advisor',  fg = 'green', relief = tk.RAISED, borderwidth = 3,font = ('Courier',15,'bold'))
-welcomeLabel_1.pack()
-
-#user guide button
-welcomeLabel_2 = tk.Label(root, text="If this is the first time you use our app, make sure to check user guide", font=('Helvetica', 12))
-welcomeLabel_2.pack()
-guideBtn = tk.Button(root,text = "check user guide",command=UserGuide)
-guideBtn.pack()
-startLabel = tk.Label(root, text="\n Enter the stock you want to check", font=('Helvetica', 12))
-startLabel.pack()
-
-#add entry box
-stock = tk.Entry()
-stock.pack()
-
-#start date, end date, rolling period entry box
-startDateLabel = tk.Label(root, text="\n Please input start date (e.g. 2018-01-02)", font=('Helvetica', 12))
-startDateLabel.pack()
-startDateEntry = tk.Entry()
-startDateEntry.pack()
-endDateLabel = tk.Label(root, text="\n Please input end date (e.g. 2019-05-01)", font=('Helvetica', 12))
-endDateLabel.pack()
-endDateEntry = tk.Entry()
-endDateEntry.pack()
-rollingLabel = tk.Label(root, text="\n Enter rolling period(e.g. 20)", font=('Helvetica', 12))
-rollingLabel.pack()
-rollingPeriodEntry = tk.Entry()
-rollingPeriodEntry.pack()
-
-#add check button
-ckeckBtn = tk.Button(root,text = "check now",command=CheckStock)
-ckeckBtn.pack()
-
-#add clear button
-clearBtn = tk.Button(root,text = "clear",command=ClearResultLabels)
-clearBtn.pack()
-
-#add Result Explanation button
-explainBtn = tk.Button(root,text = "explain",command=ResultExplanation)
-explainBtn.pack()
-
-#result labels
-ratioAnalysisLabel_1 = tk.Label(root)
-ratioAnalysisLabel_2 = tk.Label(root)
-
-root.mainloop()
+    # headless runs are profiled as a whole, in the GUI each analysis run is profiled in its worker thread
+    profilePath = args.profile
+    if profilePath and (args.batch or args.sweep or args.walk_forward or args.screen or args.bootstrap or args.precompute or args.benchmark):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        atexit.register(DumpProfile, profiler, profilePath)
+
+    # headless portfolio run
+    if args.portfolio:
+        weights = [float(weight) for weight in args.weights.split(',')] if args.weights else None
+        try:
+            results, equity = BacktestPortfolio(ReadTickerList(args.batch), ConvertToDatetime(args.start), ConvertToDatetime(args.end),
+                                                args.rolling, weights)
+        except ValueError as error:
+            sys.exit('error: {}'.format(error))
+        results.to_csv(args.output)
+        print(results.to_string())
+        sys.exit()
+
+    # headless parameter sweep, rolling periods from 5 to 250 days
+    if args.sweep:
+        bandWidths = [float(bandWidth) for bandWidth in args.band_widths.split(',')]
+        results = SweepBollingerBandStrategy(args.sweep, ConvertToDatetime(args.start), ConvertToDatetime(args.end),
+                                             range(5, 255, 5), bandWidths)
+        results.to_csv(args.output, index_label = 'Rank')
+        print(results.head(20).to_string())
+        sys.exit()
+
+    # headless walk-forward analysis, rolling periods from 5 to 250 days
+    if args.walk_forward:
+        folds, equity = WalkForwardBollingerBand(args.walk_forward, ConvertToDatetime(args.start), ConvertToDatetime(args.end),
+                                                 range(5, 255, 5), processes = args.processes)
+        print(folds.to_string())
+        print('Out-of-sample Bollinger Band Strategy Return: {:.2f}, Buy and Hold Return: {:.2f}'.format(
+            equity['Bollinger Band Strategy Equity'].iloc[-1], equity['Buy & Hold Equity'].iloc[-1]))
+        sys.exit()
+
+    # headless ratio screen
+    if args.screen:
+        screened, failed = ScreenWatchlist(ReadTickerList(args.screen), args.where, args.rank_by, args.year)
+        screened.to_csv(args.output)
+        print(screened.to_string())
+        for ticker, error in failed.items():
+            print('  {}: {}'.format(ticker, error))
+        sys.exit()
+
+    # headless significance test
+    if args.bootstrap:
+        summary = BootstrapBollingerBand(args.bootstrap, ConvertToDatetime(args.start), ConvertToDatetime(args.end),
+                                         args.rolling, processes = args.processes)
+        print('Bollinger Band minus Buy and Hold Return: {:.2f}, 95% confidence interval {:.2f} to {:.2f}'.format(
+            summary['excessReturn'], *summary['confidenceInterval']))
+        print('p-value block bootstrap: {:.4f}, random entry: {:.4f}'.format(summary['blockPValue'], summary['randomEntryPValue']))
+        sys.exit()
+
+    # local analysis service
+    if args.serve:
+        RunService(port = args.serve)
+        sys.exit()
+
+    # load test of a running analysis service
+    if args.load_test:
+        url = urllib.parse.urlsplit(args.load_test)
+        path = url.path + ('?' + url.query if url.query else '')
+        asyncio.run(LoadTestService(url.hostname, url.port or 80, [path], args.requests, args.concurrency))
+        sys.exit()
+
+    # nightly precompute job
+    if args.precompute:
+        RunPrecompute(ReadTickerList(args.precompute))
+        sys.exit()
+
+    # headless batch run
+    if args.batch:
+        RunBatchBacktest(ReadTickerList(args.batch), ConvertToDatetime(args.start), ConvertToDatetime(args.end),
+                         args.rolling, args.processes, args.output, args.fundamentals)
+        sys.exit()
+
+    # benchmark run
+    if args.benchmark:
+        if args.fixtures:
+            failures = BENCHMARKS[args.benchmark](args.fixtures)
+        else:
+            failures = BENCHMARKS[args.benchmark]()
+        # benchmarks with checks return the ones which failed
+        if failures:
+            print('{} check(s) failed:\n  {}'.format(len(failures), '\n  '.join(failures)))
+            sys.exit(1)
+        sys.exit()
+
+    #create a GUI window.
+    root = tk.Tk()
+
+    #set the title
+    root.title("888 Financial Advisor v1.0")
+
+    #set the size
+    root.geometry("1500x800")
+
+    #add a label for the start text.
+    welcomeLabel_1 = tk.Label(root, text = '888 Financial Advisor',  fg = 'green', relief = tk.RAISED, borderwidth = 3,font = ('Courier',15,'bold'))
+    welcomeLabel_1.pack()
+
+    #user guide button
+    welcomeLabel_2 = tk.Label(root, text="If this is the first time you use our app, make sure to check user guide", font=('Helvetica', 12))
+    welcomeLabel_2.pack()
+    guideBtn = tk.Button(root,text = "check user guide",command=UserGuide)
+    guideBtn.pack()
+    startLabel = tk.Label(root, text="\n Enter the stock you want to check", font=('Helvetica', 12))
+    startLabel.pack()
+
+    #add entry box
+    stock = tk.Entry()
+    stock.pack()
+
+    #tickers of the local ticker index starting with what is typed, shown under the entry box
+    suggestionList = tk.Listbox(root, height = 0, exportselection = False)
+    stock.bind('<KeyRelease>', UpdateSuggestions)
+    suggestionList.bind('<<ListboxSelect>>', ChooseSuggestion)
+
+    #start date, end date, rolling period entry box
+    startDateLabel = tk.Label(root, text="\n Please input start date (e.g. 2018-01-02)", font=('Helvetica', 12))
+    startDateLabel.pack()
+    startDateEntry = tk.Entry()
+    startDateEntry.pack()
+    endDateLabel = tk.Label(root, text="\n Please input end date (e.g. 2019-05-01)", font=('Helvetica', 12))
+    endDateLabel.pack()
+    endDateEntry = tk.Entry()
+    endDateEntry.pack()
+    rollingLabel = tk.Label(root, text="\n Enter rolling period(e.g. 20)", font=('Helvetica', 12))
+    rollingLabel.pack()
+    rollingPeriodEntry = tk.Entry()
+    rollingPeriodEntry.pack()
+
+    #prefill the shortest precomputed range and a precomputed rolling period, which are read from the store instead of computed
+    (defaultStart, defaultEnd) = PrecomputeRanges(PrecomputeEndDate())[0]
+    startDateEntry.insert(0, defaultStart.isoformat())
+    endDateEntry.insert(0, defaultEnd.isoformat())
+    rollingPeriodEntry.insert(0, str(PRECOMPUTE_ROLLING_PERIODS[1]))
+
+    #add check button
+    ckeckBtn = tk.Button(root,text = "check now",command=CheckStock)
+    ckeckBtn.pack()
+
+    #add cancel button, progress bar and progress text
+    cancelBtn = tk.Button(root,text = "cancel",command=CancelAnalysis,state = tk.DISABLED)
+    cancelBtn.pack()
+    progressBar = tkinter.ttk.Progressbar(root, orient = tk.HORIZONTAL, length = 200, mode = 'determinate', maximum = 100)
+    progressBar.pack()
+    progressLabel = tk.Label(root, text = '', font=('Helvetica', 10))
+    progressLabel.pack()
+
+    #add option to show the time spent in every stage of the analysis
+    showTimings = tk.BooleanVar(root, value = False)
+    timingsBtn = tk.Checkbutton(root, text = "show timings", variable = showTimings)
+    timingsBtn.pack()
+
+    #add clear button
+    clearBtn = tk.Button(root,text = "clear",command=ClearResultLabels)
+    clearBtn.pack()
+
+    #add Result Explanation button
+    explainBtn = tk.Button(root,text = "explain",command=ResultExplanation)
+    explainBtn.pack()
+
+    #chart of the equity curves, created with the first result so matplotlib is not needed before that
+    chartFigure = None
+    chartCanvas = None
+
+    #result labels
+    ratioAnalysisLabel_1 = tk.Label(root)
+    ratioAnalysisLabel_2 = tk.Label(root)
+    timingLabel = tk.Label(root, justify = tk.LEFT, font=('Courier', 9))
+
+    # only used by --benchmark startup to time how long the window takes to appear
+    if args.startup_probe:
+        root.update()
+        print('window shown', flush = True)
+        root.destroy()
+        sys.exit()
+
+    # pick up the results of the analysis worker
+    root.after(100, PollAnalysisQueue)
+
+    # import the heavy modules in the background once the window is up, so the first analysis does not wait for them
+    root.after(200, lambda: threading.Thread(target = WarmUpImports, daemon = True).start())
+
+    root.mainloop()